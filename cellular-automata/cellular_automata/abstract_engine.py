@@ -0,0 +1,116 @@
+# Copyright (c) 2017, Enthought, Inc.
+# All rights reserved.
+#
+# This software is provided without warranty under the terms of the BSD
+# license included in LICENSE.txt and may be redistributed only
+# under the conditions described in the aforementioned license.  The license
+# is also available online at http://www.enthought.com/licenses/BSD.txt
+#
+# Thanks for using Enthought open source!
+"""
+This module provides the abstract base class for engines, which control how
+a cellular automaton applies its list of rules to its states each tick.
+"""
+
+import numpy as np
+from traits.api import ABCHasStrictTraits
+
+
+class AbstractEngine(ABCHasStrictTraits):
+    """ Abstract base class for cellular automata step engines. """
+
+    # ------------------------------------------------------------------------
+    # AbstractEngine interface
+    # ------------------------------------------------------------------------
+
+    def allocate(self, shape, dtype):
+        """ Allocate an uninitialized states array for use with the engine.
+
+        Automata use this to create the states arrays which are passed to
+        the engine.  The default implementation returns an ordinary array.
+
+        Parameters
+        ----------
+        shape : tuple of int
+            The shape of the array.
+        dtype : dtype
+            The dtype of the array.
+
+        Returns
+        -------
+        states : array
+            The new array.
+        """
+        return np.empty(shape, dtype=dtype)
+
+    def step(self, rules, states, out):
+        """ Apply each of the rules in turn for a single tick.
+
+        The default implementation applies each rule to a copy of the states
+        held in the output array.
+
+        Parameters
+        ----------
+        rules : list of AbstractRule
+            The rules to apply, in order.
+        states : array
+            An array holding the current states of the automaton.  This must
+            not be modified.
+        out : array
+            An array of the same shape and dtype as states which may be used
+            to hold the new states.
+
+        Returns
+        -------
+        states : array
+            The new states of the automaton.  This is usually the output
+            array.
+        """
+        np.copyto(out, states)
+        for rule in rules:
+            result = rule.step(out)
+            if result is not out:
+                np.copyto(out, result)
+        return out
+
+    def advance(self, rules, states, n_ticks, out):
+        """ Apply the rules for several ticks.
+
+        The default implementation calls :py:meth:`step` repeatedly,
+        alternating between the output array and a scratch array.  Engines
+        which keep the states in a different representation can override
+        this to avoid converting the states on every tick.
+
+        Parameters
+        ----------
+        rules : list of AbstractRule
+            The rules to apply, in order, each tick.
+        states : array
+            An array holding the current states of the automaton.  This must
+            not be modified.
+        n_ticks : int
+            The number of ticks to advance.
+        out : array
+            An array of the same shape and dtype as states which may be used
+            to hold the new states.
+
+        Returns
+        -------
+        states : array
+            The new states of the automaton.
+        """
+        if n_ticks == 0:
+            np.copyto(out, states)
+            return out
+
+        scratch = None
+        current = states
+        for i in range(n_ticks):
+            if current is out:
+                if scratch is None:
+                    scratch = self.allocate(states.shape, states.dtype)
+                target = scratch
+            else:
+                target = out
+            current = self.step(rules, current, target)
+        return current
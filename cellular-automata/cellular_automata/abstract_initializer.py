@@ -8,12 +8,18 @@
 #
 # Thanks for using Enthought open source!
 
-from traits.api import HasStrictTraits
+import numpy as np
+from traits.api import HasStrictTraits, Instance
 
 
 class AbstractInitializer(HasStrictTraits):
     """ Abstract base class for states intializers. """
 
+    #: The random number generator used for any random choices.  Automata
+    #: give each of their initializers a separate stream derived from the
+    #: automaton's seed.
+    generator = Instance(np.random.Generator)
+
     def initialize(self, states):
         """ Modify the provided states to their initial state.
 
@@ -30,3 +36,12 @@ class AbstractInitializer(HasStrictTraits):
             The states after having been modified by the initializer.
         """
         return states
+
+    # ------------------------------------------------------------------------
+    # Private interface
+    # ------------------------------------------------------------------------
+
+    # Trait defaults ---------------------------------------------------------
+
+    def _generator_default(self):
+        return np.random.default_rng()
@@ -13,12 +13,40 @@ rules.  Rules must have a step function that transforms the old states array
 to a new states array.
 """
 
-from traits.api import ABCHasStrictTraits
+import numpy as np
+from traits.api import ABCHasStrictTraits, Bool, Instance, List, Property
 
 
 class AbstractRule(ABCHasStrictTraits):
     """ Abstract bace class for cellular automata rules. """
 
+    # AbstractRule Traits ----------------------------------------------------
+
+    #: Whether the :py:meth:`step` method modifies the array it is passed and
+    #: returns it.  Rules which do this can be applied directly to a scratch
+    #: buffer without first copying the states into a new array.
+    in_place = Bool(False)
+
+    #: The number of cells on each side of a cell which the rule reads to
+    #: compute the new state of the cell, or None if the rule is not local.
+    #: Local rules can be applied to separate regions of the states, as long
+    #: as each region is padded by a halo of this many cells.
+    halo = Property
+
+    #: Whether the rule makes random choices when it is applied.
+    stochastic = Property(Bool)
+
+    #: The random number generator used for the rule's random choices.
+    #: Automata give each of their rules a separate stream derived from the
+    #: automaton's seed.  A rule used on its own gets a generator seeded
+    #: from fresh entropy.
+    generator = Instance(np.random.Generator)
+
+    # Private Traits ---------------------------------------------------------
+
+    #: Streams spawned from the generator for replicas or tiles.
+    _child_generators = List
+
     # ------------------------------------------------------------------------
     # AbstractRule interface
     # ------------------------------------------------------------------------
@@ -41,6 +69,175 @@ class AbstractRule(ABCHasStrictTraits):
         self.check_states(states)
         return states
 
+    def step_into(self, states, out):
+        """ Apply the rule for a single step, writing the result into out.
+
+        The input states are not modified.  The default implementation copies
+        the states into the output array and then calls :py:meth:`step` on it,
+        which means that any rule which implements :py:meth:`step` works with
+        double-buffered automata.  Rules which can compute their result
+        directly into the output should override this method.
+
+        Parameters
+        ----------
+        states : array
+            An array holding the current states of the automaton.
+        out : array
+            An array of the same shape and dtype as states which will hold
+            the new states.
+
+        Returns
+        -------
+        out : array
+            The output array holding the new states of the automaton.
+        """
+        np.copyto(out, states)
+        result = self.step(out)
+        if result is not out:
+            np.copyto(out, result)
+        return out
+
+    def step_cached(self, states, cache):
+        """ Apply the rule for a single step, sharing derived arrays.
+
+        Rules which compare the states with state values, or count
+        neighbours, can take the masks and counts from the cache rather
+        than computing them, and must tell the cache which state values
+        they change.  The default implementation calls :py:meth:`step` and
+        then discards everything in the cache.
+
+        Parameters
+        ----------
+        states : array
+            An array holding the current states of the automaton.
+        cache : StatesCache
+            The cache of arrays derived from the states.
+
+        Returns
+        -------
+        states : array
+            The new states of the automaton after the rule has been applied.
+        """
+        states = self.step(states)
+        cache.invalidate()
+        return states
+
+    def step_ensemble(self, states):
+        """ Apply the rule for a single step to an ensemble of replicas.
+
+        The states of the replicas are stacked along the first axis, and the
+        array is modified in place.  The default implementation applies
+        :py:meth:`step` to each replica in turn.  Rules which can handle all
+        replicas in a single vectorized operation should override this.
+
+        Parameters
+        ----------
+        states : array
+            An array of shape ``(n_replicas,) + replica_shape`` holding the
+            current states of each replica.
+
+        Returns
+        -------
+        states : array
+            The same array, holding the new states of each replica.
+        """
+        self.check_ensemble_states(states)
+        for replica in states:
+            result = self.step(replica)
+            if result is not replica:
+                replica[...] = result
+        return states
+
+    def child_generators(self, n):
+        """ Independent random streams spawned from the rule's generator.
+
+        The same streams are returned each time until the generator is
+        replaced, so that each replica of an ensemble, or each tile of the
+        states, always draws from its own stream.  This makes the random
+        choices for a replica independent of the number of replicas, and
+        allows tiles to draw random numbers concurrently.
+
+        Parameters
+        ----------
+        n : int
+            The number of streams.
+
+        Returns
+        -------
+        generators : list of Generator
+            The streams.
+        """
+        children = self._child_generators
+        if len(children) < n:
+            children.extend(self.generator.spawn(n - len(children)))
+        return children[:n]
+
+    def clone_with_generator(self, generator):
+        """ A copy of the rule which draws from a different generator.
+
+        This allows a stochastic rule to be applied to several tiles of the
+        states at once, with each tile drawing from its own stream.
+
+        Parameters
+        ----------
+        generator : Generator
+            The generator for the copy.
+
+        Returns
+        -------
+        rule : AbstractRule
+            A copy of the rule with the same parameters.
+        """
+        names = [
+            name for name in self.copyable_trait_names()
+            if name not in {'generator', '_child_generators'}
+        ]
+        rule = self.clone_traits(traits=names)
+        rule.generator = generator
+        return rule
+
+    def pointwise_transition(self):
+        """ The rule as a table of new states, if it is pointwise.
+
+        A pointwise rule changes each cell based only on that cell's state,
+        either always or independently at random with some probability.
+        Automata fuse runs of consecutive pointwise rules into a single
+        lookup table pass over the states.  Whether a rule is pointwise
+        should not depend on its parameters.  The default implementation
+        returns None.
+
+        Returns
+        -------
+        transition : tuple or None
+            None if the rule is not pointwise.  Otherwise, a tuple of a
+            256-entry uint8 array holding the new value for each state, and
+            the probability (possibly per-replica) of applying the table to
+            each cell.  The random choices must be the same as those made by
+            :py:func:`~cellular_automata.sampling.bernoulli_positions` with
+            the rule's generator, or its child generators for an ensemble.
+        """
+        return None
+
+    def check_ensemble_states(self, states):
+        """ Check that the ensemble states match what the rule expects.
+
+        The default implementation checks the first replica using
+        :py:meth:`check_states`.
+
+        Parameters
+        ----------
+        states : array
+            An array holding the current states of each replica.
+
+        Raises
+        ------
+        ValueError
+            If the states are not compatible with the rule.
+        """
+        if states.ndim == 0 or len(states) == 0:
+            raise ValueError("Ensemble states must have at least one replica.")
+        self.check_states(states[0])
+
     def check_states(self, states):
         """ Check that the state matches what the rule expects as input.
 
@@ -58,3 +255,86 @@ class AbstractRule(ABCHasStrictTraits):
             If the states are not compatible with the rule.
         """
         pass
+
+    # ------------------------------------------------------------------------
+    # Private interface
+    # ------------------------------------------------------------------------
+
+    # Trait change handlers --------------------------------------------------
+
+    def _generator_changed(self):
+        self._child_generators = []
+
+    # Trait defaults ---------------------------------------------------------
+
+    def _generator_default(self):
+        return np.random.default_rng()
+
+    # Trait properties -------------------------------------------------------
+
+    def _get_halo(self):
+        return None
+
+    def _get_stochastic(self):
+        return False
+
+
+def is_random(probability):
+    """ Whether a (possibly per-replica) probability gives random outcomes.
+
+    Parameters
+    ----------
+    probability : float or array
+        The probability to test.
+
+    Returns
+    -------
+    random : bool
+        True if any of the probabilities is strictly between 0 and 1.
+    """
+    probability = np.asarray(probability)
+    return bool(np.any((probability > 0.0) & (probability < 1.0)))
+
+
+def scalar_parameter(value):
+    """ Check that a rule parameter has a single value.
+
+    Per-replica parameter arrays only make sense when a rule is applied to an
+    ensemble of replicas.
+
+    Raises
+    ------
+    ValueError
+        If the value is an array rather than a scalar.
+    """
+    if np.ndim(value) != 0:
+        msg = "Per-replica parameters can only be used with an ensemble."
+        raise ValueError(msg)
+    return value
+
+
+def replica_parameter(value, states):
+    """ Reshape a per-replica parameter to broadcast against ensemble states.
+
+    Parameters
+    ----------
+    value : scalar or array
+        Either a single value, or a 1D array with one value per replica.
+    states : array
+        The ensemble states, with replicas stacked along the first axis.
+
+    Returns
+    -------
+    value : array
+        An array which broadcasts against the states.
+
+    Raises
+    ------
+    ValueError
+        If the number of values does not match the number of replicas.
+    """
+    value = np.asarray(value)
+    if value.ndim > 1 or value.size not in (1, len(states)):
+        msg = "Expected a scalar or {} per-replica values, but got shape {}."
+        raise ValueError(msg.format(len(states), value.shape))
+    return value.reshape((-1,) + (1,) * (states.ndim - 1))
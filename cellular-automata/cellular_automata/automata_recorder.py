@@ -94,6 +94,9 @@ class AutomataRecorder(HasStrictTraits):
             return
         if self.transform is not None:
             value = self.transform(self.automaton)
+        elif self.automaton.double_buffered:
+            # the automaton will reuse this array, so keep a copy
+            value = self.automaton.states.copy()
         else:
             value = self.automaton.states
 
@@ -140,6 +143,29 @@ def count_states(automaton):
     return full_counts
 
 
+def count_replica_states(automaton):
+    """ A function that counts the states of each replica of an ensemble.
+
+    This is suitable for use as the :py:attr:`transform` of an
+    :py:class:`AutomataRecorder` of an :py:class:`EnsembleAutomaton`.
+
+    Parameters
+    ----------
+    automaton : EnsembleAutomaton
+        The ensemble of cellular automata being analyzed.
+
+    Returns
+    -------
+    counts : array
+        A 2D array of shape (n_replicas, 256) containing the counts of each
+        value in each replica.
+    """
+    states = automaton.states.reshape(len(automaton.states), -1)
+    offsets = 256 * np.arange(len(states))[:, np.newaxis]
+    counts = np.bincount((states + offsets).ravel(), minlength=256*len(states))
+    return counts.reshape(len(states), 256)
+
+
 def call_if(test):
     """ Decorator factory that records automaton state only if test is True.
 
@@ -12,10 +12,46 @@
 This module provides standard trait definitions for cellular automata classes.
 """
 
-from traits.api import Range
+import numpy as np
+from traits.api import Array, Either, Range
 
 #: A trait that holds a valid state value.
 StateValue = Range(0, 255)
 
 #: A trait that holds a valid probability.
 Probability = Range(0.0, 1.0)
+
+
+class ProbabilityArray(Array):
+    """ A trait that holds a 1D array of probabilities. """
+
+    info_text = 'a 1D array of probabilities between 0 and 1'
+
+    def __init__(self, **metadata):
+        super(ProbabilityArray, self).__init__(
+            dtype=float, shape=(None,), **metadata
+        )
+
+    def validate(self, object, name, value):
+        value = super(ProbabilityArray, self).validate(object, name, value)
+        if not np.all((value >= 0.0) & (value <= 1.0)):
+            self.error(object, name, value)
+        return value
+
+
+def ReplicaProbability(default_value):
+    """ A trait that holds a probability, or one probability per replica.
+
+    Arrays of probabilities are only valid for rules which are being applied
+    to an ensemble of replicas, and should have one value for each replica.
+
+    Parameters
+    ----------
+    default_value : float
+        The default probability.
+    """
+    return Either(
+        Range(0.0, 1.0, default_value),
+        ProbabilityArray(),
+        default=default_value,
+    )
@@ -0,0 +1,191 @@
+# Copyright (c) 2017, Enthought, Inc.
+# All rights reserved.
+#
+# This software is provided without warranty under the terms of the BSD
+# license included in LICENSE.txt and may be redistributed only
+# under the conditions described in the aforementioned license.  The license
+# is also available online at http://www.enthought.com/licenses/BSD.txt
+#
+# Thanks for using Enthought open source!
+"""
+This module provides routines for working with boolean cell masks packed 64
+cells to a uint64 word along the last axis, so that word-wide bitwise
+operations act on 64 cells at once.
+
+Bit ``i`` of word ``j`` holds cell ``64*j + i``.  Bits past the end of the
+last axis are padding, and their values are unspecified unless otherwise
+noted.
+"""
+
+import numpy as np
+
+#: The number of cells packed into each word.
+WORD_BITS = 64
+
+#: A word with every bit set.
+ALL_ONES = np.uint64(0xFFFFFFFFFFFFFFFF)
+
+
+def n_words(n_cells):
+    """ The number of words needed to hold a number of cells. """
+    return -(-n_cells // WORD_BITS)
+
+
+def pack_bits(mask):
+    """ Pack a boolean array into uint64 words along the last axis.
+
+    Parameters
+    ----------
+    mask : array of bool
+        The cells to pack.
+
+    Returns
+    -------
+    words : array of uint64
+        The packed cells, with padding bits set to zero.
+    """
+    n_cells = mask.shape[-1]
+    padding = [(0, 0)] * (mask.ndim - 1)
+    padding.append((0, n_words(n_cells) * WORD_BITS - n_cells))
+    padded = np.pad(mask.astype(bool), padding, mode='constant')
+    packed = np.packbits(padded, axis=-1, bitorder='little')
+    return packed.view('<u8').astype(np.uint64, copy=False)
+
+
+def unpack_bits(words, n_cells):
+    """ Unpack uint64 words into a boolean array along the last axis.
+
+    Parameters
+    ----------
+    words : array of uint64
+        The packed cells.
+    n_cells : int
+        The number of cells along the last axis.
+
+    Returns
+    -------
+    mask : array of bool
+        The unpacked cells.
+    """
+    as_bytes = np.ascontiguousarray(words, dtype='<u8').view(np.uint8)
+    bits = np.unpackbits(as_bytes, axis=-1, count=n_cells, bitorder='little')
+    return bits.view(bool)
+
+
+def get_bit(words, position):
+    """ Get the cells at a position along the last axis as 0 or 1 values.
+
+    Parameters
+    ----------
+    words : array of uint64
+        The packed cells.
+    position : int
+        The position of the cells along the last axis.
+
+    Returns
+    -------
+    bits : array of uint64
+        The values of the cells.
+    """
+    word, bit = divmod(position, WORD_BITS)
+    return (words[..., word] >> np.uint64(bit)) & np.uint64(1)
+
+
+def set_bit(words, position, bits):
+    """ Set the cells at a position along the last axis, in place.
+
+    Parameters
+    ----------
+    words : array of uint64
+        The packed cells.
+    position : int
+        The position of the cells along the last axis.
+    bits : array of uint64
+        The values of the cells, each 0 or 1.
+    """
+    word, bit = divmod(position, WORD_BITS)
+    shift = np.uint64(bit)
+    column = words[..., word]
+    column &= ~(np.uint64(1) << shift)
+    column |= (bits & np.uint64(1)) << shift
+
+
+def shift_cells(words, offset):
+    """ Shift packed cells along the last axis.
+
+    The cell at position ``x`` of the result holds the cell at position
+    ``x + offset`` of the input.  Cells shifted in from past either end are
+    zero.
+
+    Parameters
+    ----------
+    words : array of uint64
+        The packed cells.
+    offset : int
+        The number of cells to shift by.  This must be less than 64 in
+        absolute value.
+
+    Returns
+    -------
+    shifted : array of uint64
+        The shifted cells.
+    """
+    if offset == 0:
+        return words.copy()
+
+    zeros = np.zeros(words.shape[:-1] + (1,), dtype=np.uint64)
+    if offset > 0:
+        shift = np.uint64(offset)
+        following = np.concatenate([words[..., 1:], zeros], axis=-1)
+        return (words >> shift) | (following << np.uint64(WORD_BITS - offset))
+    else:
+        shift = np.uint64(-offset)
+        preceding = np.concatenate([zeros, words[..., :-1]], axis=-1)
+        return (words << shift) | (preceding >> np.uint64(WORD_BITS + offset))
+
+
+def add_to_counter(counter, plane):
+    """ Add a plane of packed bits to a bit-sliced counter, in place.
+
+    The counter is a list of packed bit planes, where plane ``i`` holds bit
+    ``i`` of the count for each cell.  The counter must have enough planes
+    to hold the largest possible count.
+
+    Parameters
+    ----------
+    counter : list of arrays of uint64
+        The bit-sliced counter.
+    plane : array of uint64
+        The packed cells to add to the count.
+    """
+    carry = plane
+    for i, bits in enumerate(counter):
+        counter[i] = bits ^ carry
+        carry = bits & carry
+
+
+def counter_equals(counter, value):
+    """ Compute which cells of a bit-sliced counter hold a value.
+
+    Parameters
+    ----------
+    counter : list of arrays of uint64
+        The bit-sliced counter.
+    value : int
+        The value to compare with.
+
+    Returns
+    -------
+    equal : array of uint64
+        Packed cells which are set where the count equals the value.
+    """
+    if value < 0 or value >= 2**len(counter):
+        return np.zeros_like(counter[0])
+
+    equal = np.full_like(counter[0], ALL_ONES)
+    for i, bits in enumerate(counter):
+        if (value >> i) & 1:
+            equal &= bits
+        else:
+            equal &= ~bits
+    return equal
@@ -12,10 +12,18 @@
 This module contains the main class for a cellular automata simulation.
 """
 import numpy as np
-from traits.api import Array, HasStrictTraits, Int, Instance, List, Property
+from traits.api import (
+    Any, Array, Bool, Either, HasStrictTraits, Int, Instance, List, Property,
+    cached_property
+)
 
+from .abstract_engine import AbstractEngine
 from .abstract_initializer import AbstractInitializer
 from .abstract_rule import AbstractRule
+from .cycle_detector import CycleDetector
+from .io.checkpoint import load_checkpoint, save_checkpoint
+from .rules.fused import fuse_pointwise_rules
+from .states_cache import StatesCache
 
 
 class CellularAutomaton(HasStrictTraits):
@@ -42,6 +50,54 @@ class CellularAutomaton(HasStrictTraits):
     #: The list of rules to apply, in order.
     rules = List(Instance(AbstractRule))
 
+    #: Whether to fuse runs of consecutive pointwise rules, such as
+    #: :py:class:`~.ChangeStateRule`, into a single lookup table pass.  The
+    #: results are the same as applying the rules separately.
+    fuse_rules = Bool(True)
+
+    #: The rules as they are applied each tick, after any fusion.
+    plan = Property(
+        List(Instance(AbstractRule)), depends_on='rules[], fuse_rules'
+    )
+
+    #: Whether to step using a pair of preallocated states arrays rather than
+    #: allocating a new array every tick.  When this is True, arrays which
+    #: were previously held by :py:attr:`states` are reused for later ticks,
+    #: so anything which holds on to old states should copy them.
+    double_buffered = Bool(False)
+
+    #: The engine used to apply the rules each tick.  If this is None, the
+    #: rules are applied one after another to the whole states array.
+    engine = Instance(AbstractEngine)
+
+    #: An optional detector which notices when deterministic rules have
+    #: brought the automaton into a fixed point or cycle.  When a cycle is
+    #: detected during :py:meth:`run`, the run is either stopped or fast
+    #: forwarded to its final states, depending on the detector's action.
+    cycle_detector = Instance(CycleDetector)
+
+    #: The seed for the automaton's random streams.  If None, fresh entropy
+    #: is used, which can be recovered from :py:attr:`seed_sequence` to
+    #: replay a run.
+    seed = Either(None, Int)
+
+    #: The root of the tree of random streams.  Each rule and initializer
+    #: is given its own child stream, in order, and rules may spawn further
+    #: streams from theirs for each replica or tile.
+    seed_sequence = Instance(np.random.SeedSequence)
+
+    #: The spare states array used when double-buffering.
+    _spare_states = Any
+
+    #: The generators given to the rules, in order.
+    _rule_generators = List
+
+    #: The generators given to the initializers, in order.
+    _initializer_generators = List
+
+    #: The seed sequences from which rule and initializer streams are spawned.
+    _stream_seeds = List
+
     # ------------------------------------------------------------------------
     # CellularAutomata interface
     # ------------------------------------------------------------------------
@@ -51,6 +107,7 @@ class CellularAutomaton(HasStrictTraits):
         if self.tick != -1:
             raise ValueError("Automaton has already started")
 
+        self._assign_generators()
         states = self.states
         for initializer in self.initializers:
             states = initializer.initialize_states(states)
@@ -64,32 +121,292 @@ class CellularAutomaton(HasStrictTraits):
         This will change the states array after all rules have had a chance to
         apply their changes.
         """
-        states = self.states.copy()
-        for rule in self.rules:
-            states = rule.step(states)
-        self.states = states
+        self._assign_generators()
+        detecting = self._prepare_cycle_detection()
+        self.states = self._advance(self.states)
         self.tick += 1
+        if detecting:
+            self.cycle_detector.observe(self.tick, self.states, self.rules)
+
+    def run(self, n_steps, notify_every=None):
+        """ Advance the cellular automaton several steps through time.
+
+        This gives the same results as calling :py:meth:`step` repeatedly,
+        but the :py:attr:`states` and :py:attr:`tick` traits are only updated
+        every ``notify_every`` ticks and after the final tick, so listeners
+        such as recorders are only notified at those times.  This avoids the
+        overhead of trait validation and notification on every tick.
+
+        If there is a :py:attr:`cycle_detector` and the rules are all
+        deterministic, the states are checked for repeats after every tick,
+        and once a cycle is detected the run either stops early or jumps
+        straight to the states at the end of the run.
+
+        Parameters
+        ----------
+        n_steps : int
+            The number of steps to advance.
+        notify_every : int or None
+            How often to update the traits.  If None, the traits are only
+            updated after the final step.
+        """
+        if notify_every is None:
+            notify_every = max(n_steps, 1)
+        elif notify_every < 1:
+            raise ValueError("notify_every must be a positive integer")
+
+        self._assign_generators()
+        if self._prepare_cycle_detection():
+            self._run_detecting_cycles(n_steps, notify_every)
+            return
+
+        states = self.states
+        tick = self.tick
+        done = 0
+        while done < n_steps:
+            n_ticks = min(notify_every, n_steps - done)
+            states = self._advance(states, n_ticks)
+            done += n_ticks
+            self.states = states
+            self.tick = tick + done
+
+    def checkpoint(self, path, background=False):
+        """ Save the state of the automaton to a compressed checkpoint file.
+
+        The checkpoint holds the states, tick, rules, initializers, the
+        random streams of the automaton and the state of NumPy's global
+        random number generator, which is enough to resume the simulation
+        exactly with :py:meth:`restore`.
+
+        Parameters
+        ----------
+        path : str
+            The path of the checkpoint file.
+        background : bool
+            Whether to compress and write the file in a background thread.
+            The states are copied before this method returns, so the
+            automaton can safely carry on running.
+
+        Returns
+        -------
+        future : Future or None
+            If writing in the background, a future which completes when the
+            file has been written, otherwise None.
+        """
+        config = {
+            'rules': list(self.rules),
+            'initializers': list(self.initializers),
+            'seed': self.seed,
+            'seed_sequence': self.seed_sequence,
+            'stream_seeds': list(self._stream_seeds),
+            'rule_generators': list(self._rule_generators),
+            'initializer_generators': list(self._initializer_generators),
+            'random_state': np.random.get_state(),
+        }
+        return save_checkpoint(
+            path, self.states, self.tick, config, background=background
+        )
+
+    def restore(self, path):
+        """ Restore the state of the automaton from a checkpoint file.
+
+        The engine and cycle detector of the automaton are kept.
+
+        Parameters
+        ----------
+        path : str
+            The path of the checkpoint file.
+        """
+        checkpoint = load_checkpoint(path)
+
+        saved_states = checkpoint['states']
+        states = self._zeros(saved_states.shape, self.engine)
+        states[...] = saved_states
+
+        self.rules = checkpoint['rules']
+        self.initializers = checkpoint['initializers']
+        self.seed = checkpoint['seed']
+        self.seed_sequence = checkpoint['seed_sequence']
+        self._stream_seeds = checkpoint['stream_seeds']
+        self._rule_generators = checkpoint['rule_generators']
+        self._initializer_generators = checkpoint['initializer_generators']
+        self._spare_states = None
+        self.states = states
+        self.tick = checkpoint['tick']
+        np.random.set_state(checkpoint['random_state'])
 
     def reset(self):
-        """ Reset the simulation to a pre-start state. """
-        self.states = np.zeros(self.shape, dtype='uint8')
+        """ Reset the simulation to a pre-start state.
+
+        The random streams are restarted from :py:attr:`seed`, so a seeded
+        automaton will repeat the same run.
+        """
+        self.states = self._zeros(self.shape, self.engine)
+        self._spare_states = None
+        self.seed_sequence = np.random.SeedSequence(self.seed)
         self.tick = -1
 
     # ------------------------------------------------------------------------
     # Private interface
     # ------------------------------------------------------------------------
 
+    def _assign_generators(self):
+        """ Give each rule and initializer its own random stream. """
+        if not self._stream_seeds:
+            self._stream_seeds = self.seed_sequence.spawn(2)
+        rules_seed, initializers_seed = self._stream_seeds
+        for objects, generators, seed_sequence in [
+                (self.rules, self._rule_generators, rules_seed),
+                (self.initializers, self._initializer_generators,
+                 initializers_seed)]:
+            if len(generators) < len(objects):
+                children = seed_sequence.spawn(len(objects) - len(generators))
+                generators.extend(
+                    np.random.default_rng(child) for child in children
+                )
+            for item, generator in zip(objects, generators):
+                if item.generator is not generator:
+                    item.generator = generator
+
+    def _run_detecting_cycles(self, n_steps, notify_every):
+        """ Run tick by tick, checking for cycles after each tick. """
+        detector = self.cycle_detector
+        states = self.states
+        tick = self.tick
+        end = tick + n_steps
+        notified = tick
+        while tick < end:
+            states = self._advance(states)
+            tick += 1
+            if detector.observe(tick, states, self.rules):
+                if detector.action == 'fast_forward':
+                    states = detector.fast_forward(end)
+                    tick = end
+                break
+            if tick - notified == notify_every and tick < end:
+                self.states = states
+                self.tick = notified = tick
+        self.states = states
+        self.tick = tick
+
+    def _prepare_cycle_detection(self):
+        """ Whether to detect cycles, starting a new history if needed. """
+        detector = self.cycle_detector
+        if (detector is None or self.tick < 0 or
+                not detector.is_enabled(self.rules)):
+            return False
+        if not detector.is_continuing(self.tick, self.states, self.rules):
+            detector.reset()
+            detector.observe(self.tick, self.states, self.rules)
+        return True
+
+    def _advance(self, states, n_ticks=1):
+        """ Apply all the rules for some ticks, returning the new states. """
+        if self.engine is not None:
+            return self._advance_engine(states, n_ticks)
+
+        for i in range(n_ticks):
+            if self.double_buffered:
+                states = self._advance_double_buffered(states)
+            else:
+                states = states.copy()
+                cache = StatesCache(states)
+                for rule in self.plan:
+                    states = rule.step_cached(states, cache)
+                    if states is not cache.states:
+                        cache = StatesCache(states)
+        return states
+
+    def _advance_double_buffered(self, states):
+        """ Apply all the rules, ping-ponging between two states buffers.
+
+        In-place rules are applied directly to whichever buffer holds the
+        current states, as long as that buffer is not the input states.  Other
+        rules write their result into the other buffer.  Rules share a cache
+        of masks and counts derived from the buffer holding the current
+        states.
+        """
+        current = states
+        other = self._spare_buffer(states)
+        cache = None
+        for rule in self.plan:
+            if rule.in_place and current is not states:
+                result = rule.step_cached(current, cache)
+                if result is not current:
+                    np.copyto(current, result)
+                    cache.invalidate()
+            else:
+                rule.step_into(current, other)
+                current, other = other, current
+                cache = StatesCache(current)
+
+        self._spare_states = other
+        return current
+
+    def _advance_engine(self, states, n_ticks):
+        """ Apply all the rules for some ticks using the engine. """
+        if self.double_buffered:
+            out = self._spare_buffer(states)
+        else:
+            out = self.engine.allocate(states.shape, states.dtype)
+
+        new_states = self.engine.advance(self.plan, states, n_ticks, out)
+
+        if self.double_buffered:
+            self._spare_states = states if new_states is out else out
+        return new_states
+
+    def _spare_buffer(self, states):
+        """ Return a spare states buffer that is distinct from the states. """
+        spare = self._spare_states
+        if spare is None or spare is states or spare.shape != states.shape:
+            if self.engine is not None:
+                spare = self.engine.allocate(states.shape, states.dtype)
+            else:
+                spare = np.empty_like(states)
+        return spare
+
+    @staticmethod
+    def _zeros(shape, engine=None):
+        """ Create a states array filled with zeros. """
+        if engine is None:
+            return np.zeros(shape, dtype='uint8')
+        states = engine.allocate(shape, 'uint8')
+        states.fill(0)
+        return states
+
     def __init__(self, **traits):
         shape = traits.pop('shape', None)
         if shape is not None:
-            states = np.zeros(shape, dtype='uint8')
-            traits.setdefault('states', states)
+            if 'states' not in traits:
+                traits['states'] = self._zeros(shape, traits.get('engine'))
         elif 'states' not in traits:
             raise ValueError("Must specify either shape or initial states")
         super(CellularAutomaton, self).__init__(**traits)
 
+    # Trait change handlers --------------------------------------------------
+
+    def _seed_changed(self):
+        self.seed_sequence = np.random.SeedSequence(self.seed)
+
+    def _seed_sequence_changed(self):
+        self._stream_seeds = []
+        self._rule_generators = []
+        self._initializer_generators = []
+
+    # Trait defaults ---------------------------------------------------------
+
+    def _seed_sequence_default(self):
+        return np.random.SeedSequence(self.seed)
+
     # Trait properties -------------------------------------------------------
 
+    @cached_property
+    def _get_plan(self):
+        if self.fuse_rules:
+            return fuse_pointwise_rules(self.rules)
+        return list(self.rules)
+
     def _get_shape(self):
         return self.states.shape
 
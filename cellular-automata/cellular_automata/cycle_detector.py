@@ -0,0 +1,239 @@
+# Copyright (c) 2017, Enthought, Inc.
+# All rights reserved.
+#
+# This software is provided without warranty under the terms of the BSD
+# license included in LICENSE.txt and may be redistributed only
+# under the conditions described in the aforementioned license.  The license
+# is also available online at http://www.enthought.com/licenses/BSD.txt
+#
+# Thanks for using Enthought open source!
+"""
+This module provides a detector for deterministic automata which have
+settled into a fixed point or a cycle.
+"""
+
+from collections import deque
+import zlib
+
+import numpy as np
+from traits.api import (
+    Any, Dict, Either, Enum, HasStrictTraits, Instance, Int, List
+)
+
+
+class CycleDetector(HasStrictTraits):
+    """ Detect when the states of an automaton repeat.
+
+    The detector keeps a rolling history of copies of the most recent
+    states together with a table of cheap checksums of them.  When the
+    checksum of new states matches one in the table the states are compared
+    exactly, and if they are equal the automaton is in a cycle: since the
+    rules are deterministic, the states will repeat with the same period
+    forever.
+
+    Detection is only meaningful when all the rules are deterministic, so
+    it is skipped for rule lists which contain stochastic rules.
+    """
+
+    #: The maximum number of past states to remember.  Cycles with longer
+    #: periods are not detected.
+    max_history = Int(256)
+
+    #: What :py:meth:`CellularAutomaton.run` does when a cycle is detected:
+    #: either jump straight to the final states of the run, or stop early.
+    action = Enum('fast_forward', 'stop')
+
+    #: The tick at which the cycle was first entered, or None if no cycle
+    #: has been detected.  This is exact if the history covers every tick
+    #: since the detector was reset, otherwise it is an upper bound.
+    transient_length = Either(None, Int)
+
+    #: The period of the detected cycle, or None if no cycle has been
+    #: detected.  A fixed point has period 1.
+    period = Either(None, Int)
+
+    # Private Traits ---------------------------------------------------------
+
+    #: The history of (tick, checksum, states) tuples, oldest first.
+    _history = Instance(deque, ())
+
+    #: Map from checksums to the ticks in the history with that checksum.
+    _ticks = Dict
+
+    #: The states array which was last observed.
+    _last_states = Any
+
+    #: The rules which the history was produced by.
+    _rules = List
+
+    # ------------------------------------------------------------------------
+    # CycleDetector interface
+    # ------------------------------------------------------------------------
+
+    def reset(self):
+        """ Forget the history and any detected cycle. """
+        self._history = deque()
+        self._ticks = {}
+        self._last_states = None
+        self._rules = []
+        self.transient_length = None
+        self.period = None
+
+    def is_enabled(self, rules):
+        """ Whether cycles can be detected for a list of rules.
+
+        Parameters
+        ----------
+        rules : list of AbstractRule
+            The rules of the automaton.
+
+        Returns
+        -------
+        enabled : bool
+            False if any of the rules are stochastic.
+        """
+        return not any(rule.stochastic for rule in rules)
+
+    def is_continuing(self, tick, states, rules):
+        """ Whether states follow on from the last observed states.
+
+        Parameters
+        ----------
+        tick : int
+            The current tick of the automaton.
+        states : array
+            The current states of the automaton.
+        rules : list of AbstractRule
+            The rules of the automaton.
+
+        Returns
+        -------
+        continuing : bool
+            True if the states are the states last observed at the same tick
+            with the same rules.
+        """
+        return states is self._last_states and self._follows(tick, rules)
+
+    def observe(self, tick, states, rules):
+        """ Record new states and check whether they have been seen before.
+
+        If the states are not for the tick after the last observed states,
+        or the rules have changed, the history is reset first.
+
+        Parameters
+        ----------
+        tick : int
+            The tick of the states.
+        states : array
+            The states of the automaton.  A copy of this is kept.
+        rules : list of AbstractRule
+            The rules of the automaton.
+
+        Returns
+        -------
+        detected : bool
+            Whether the automaton is known to be in a cycle.
+        """
+        if not self._follows(tick - 1, rules):
+            self.reset()
+            self._rules = list(rules)
+
+        checksum = zlib.crc32(np.ascontiguousarray(states))
+        for previous_tick in self._ticks.get(checksum, []):
+            if np.array_equal(self._states_at(previous_tick), states):
+                if self.period is None:
+                    self.transient_length = previous_tick
+                    self.period = tick - previous_tick
+                break
+
+        self._append(tick, checksum, states.copy())
+        self._last_states = states
+        return self.period is not None
+
+    def predict(self, tick):
+        """ The states at a future tick of a detected cycle.
+
+        Parameters
+        ----------
+        tick : int
+            The tick to predict, which must not be before the last observed
+            tick.
+
+        Returns
+        -------
+        states : array
+            A new array holding the states at that tick.
+        """
+        if self.period is None:
+            raise ValueError("No cycle has been detected.")
+        last_tick = self._history[-1][0]
+        if tick < last_tick:
+            raise ValueError("Cannot predict states before the last tick.")
+        return self._states_at(self._cycle_tick(tick)).copy()
+
+    def fast_forward(self, tick):
+        """ Jump the history forward to a future tick of a detected cycle.
+
+        The history is replaced by the last period of states leading up to
+        the tick, so that detection continues seamlessly from the returned
+        states.
+
+        Parameters
+        ----------
+        tick : int
+            The tick to jump to, which must not be before the last observed
+            tick.
+
+        Returns
+        -------
+        states : array
+            A new array holding the states at that tick.
+        """
+        states = self.predict(tick)
+        entries = [
+            self._history[self._cycle_tick(future) - self._history[0][0]]
+            for future in range(tick - self.period + 1, tick + 1)
+        ]
+        self._history = deque()
+        self._ticks = {}
+        for future, (old_tick, checksum, old_states) in zip(
+                range(tick - self.period + 1, tick + 1), entries):
+            self._append(future, checksum, old_states)
+        self._last_states = states
+        return states
+
+    # ------------------------------------------------------------------------
+    # Private interface
+    # ------------------------------------------------------------------------
+
+    def _follows(self, tick, rules):
+        """ Whether the last observed states were for a tick and rules. """
+        return (
+            len(self._history) > 0 and
+            self._history[-1][0] == tick and
+            len(rules) == len(self._rules) and
+            all(rule is old_rule for rule, old_rule in zip(rules, self._rules))
+        )
+
+    def _append(self, tick, checksum, states):
+        """ Add states to the history, discarding the oldest if needed. """
+        history = self._history
+        history.append((tick, checksum, states))
+        self._ticks.setdefault(checksum, []).append(tick)
+        while len(history) > max(self.max_history, 1):
+            old_tick, old_checksum, old_states = history.popleft()
+            old_ticks = self._ticks[old_checksum]
+            old_ticks.remove(old_tick)
+            if not old_ticks:
+                del self._ticks[old_checksum]
+
+    def _cycle_tick(self, tick):
+        """ The tick in the last period of the history equivalent to a tick.
+        """
+        last_tick = self._history[-1][0]
+        return last_tick - (last_tick - tick) % self.period
+
+    def _states_at(self, tick):
+        """ The stored states at a tick in the history. """
+        history = self._history
+        return history[tick - history[0][0]][2]
@@ -0,0 +1,706 @@
+# Copyright (c) 2017, Enthought, Inc.
+# All rights reserved.
+#
+# This software is provided without warranty under the terms of the BSD
+# license included in LICENSE.txt and may be redistributed only
+# under the conditions described in the aforementioned license.  The license
+# is also available online at http://www.enthought.com/licenses/BSD.txt
+#
+# Thanks for using Enthought open source!
+"""
+This module provides an implementation of Gosper's Hashlife algorithm for
+Life-like rules, which can advance sparse or highly regular patterns by huge
+numbers of generations.
+
+The plane is represented by a quadtree of canonical nodes, so that identical
+regions anywhere in the pattern and at any time are the same node.  The
+result of advancing the centre of each node is memoized on the node, so
+repeated structure in space and time is only ever computed once.
+"""
+
+import numpy as np
+from traits.api import (
+    Any, Bool, HasStrictTraits, Instance, Int, Property
+)
+
+from cellular_automata.abstract_engine import AbstractEngine
+from cellular_automata.rules.life import LifeRule
+
+
+class Node(object):
+    """ A canonical quadtree node covering a square of 2**level cells.
+
+    Nodes should only be created by a :py:class:`NodeCache`, which ensures
+    that there is exactly one node for each distinct square of cells.
+    """
+
+    __slots__ = ('nw', 'ne', 'sw', 'se', 'level', 'population', 'results')
+
+    def __init__(self, nw, ne, sw, se, level, population):
+        self.nw = nw
+        self.ne = ne
+        self.sw = sw
+        self.se = se
+        self.level = level
+        self.population = population
+
+        #: Memoized successors of the node, keyed by log2 of the step size.
+        self.results = {}
+
+
+class NodeCache(object):
+    """ The table of canonical nodes for a Life-like rule.
+
+    Parameters
+    ----------
+    rule : LifeRule
+        The rule which determines the successors of the nodes.
+    """
+
+    def __init__(self, rule):
+        centre = np.array(rule.structure.shape) // 2
+        self.offsets = [
+            tuple(centre - index) for index in np.argwhere(rule.structure)
+        ]
+        self.born_counts = frozenset(rule.born_counts)
+        self.survive_counts = frozenset(rule.survive_counts)
+
+        self.leaves = (
+            Node(None, None, None, None, 0, 0),
+            Node(None, None, None, None, 0, 1),
+        )
+        self.table = {}
+        self._empty = [self.leaves[0]]
+
+    def __len__(self):
+        return len(self.table)
+
+    def join(self, nw, ne, sw, se):
+        """ The canonical node with the given quadrants. """
+        key = (nw, ne, sw, se)
+        node = self.table.get(key)
+        if node is None:
+            population = (
+                nw.population + ne.population + sw.population + se.population
+            )
+            node = Node(nw, ne, sw, se, nw.level + 1, population)
+            self.table[key] = node
+        return node
+
+    def empty(self, level):
+        """ The canonical node with no live cells at a level. """
+        while len(self._empty) <= level:
+            node = self._empty[-1]
+            self._empty.append(self.join(node, node, node, node))
+        return self._empty[level]
+
+    def expand(self, node):
+        """ Centre a node in a node of the next level up. """
+        empty = self.empty(node.level - 1)
+        return self.join(
+            self.join(empty, empty, empty, node.nw),
+            self.join(empty, empty, node.ne, empty),
+            self.join(empty, node.sw, empty, empty),
+            self.join(node.se, empty, empty, empty),
+        )
+
+    def successor(self, node, j):
+        """ The centre of a node advanced by 2**j generations.
+
+        Parameters
+        ----------
+        node : Node
+            A node of level at least 2.
+        j : int
+            The log2 of the number of generations.  This is capped at two
+            less than the level of the node.
+
+        Returns
+        -------
+        result : Node
+            The node of one level lower covering the centre of the node.
+        """
+        if node.population == 0:
+            return node.nw
+        j = min(j, node.level - 2)
+        result = node.results.get(j)
+        if result is not None:
+            return result
+
+        if node.level == 2:
+            result = self._base_successor(node)
+        else:
+            join = self.join
+            successor = self.successor
+            nw, ne, sw, se = node.nw, node.ne, node.sw, node.se
+            c1 = successor(nw, j)
+            c2 = successor(join(nw.ne, ne.nw, nw.se, ne.sw), j)
+            c3 = successor(ne, j)
+            c4 = successor(join(nw.sw, nw.se, sw.nw, sw.ne), j)
+            c5 = successor(join(nw.se, ne.sw, sw.ne, se.nw), j)
+            c6 = successor(join(ne.sw, ne.se, se.nw, se.ne), j)
+            c7 = successor(sw, j)
+            c8 = successor(join(sw.ne, se.nw, sw.se, se.sw), j)
+            c9 = successor(se, j)
+            if j < node.level - 2:
+                result = join(
+                    join(c1.se, c2.sw, c4.ne, c5.nw),
+                    join(c2.se, c3.sw, c5.ne, c6.nw),
+                    join(c4.se, c5.sw, c7.ne, c8.nw),
+                    join(c5.se, c6.sw, c8.ne, c9.nw),
+                )
+            else:
+                result = join(
+                    successor(join(c1, c2, c4, c5), j),
+                    successor(join(c2, c3, c5, c6), j),
+                    successor(join(c4, c5, c7, c8), j),
+                    successor(join(c5, c6, c8, c9), j),
+                )
+
+        node.results[j] = result
+        return result
+
+    def from_array(self, mask):
+        """ Build the node for a square boolean array.
+
+        Parameters
+        ----------
+        mask : array of bool
+            A square array whose side is a power of two of at least 4.
+
+        Returns
+        -------
+        node : Node
+            The canonical node holding the cells.
+        """
+        size = mask.shape[0]
+        n_blocks = size // 4
+        blocks = mask.reshape(n_blocks, 4, n_blocks, 4).transpose(0, 2, 1, 3)
+        codes = blocks.reshape(n_blocks, n_blocks, 16).astype(np.int64)
+        codes = codes.dot(1 << np.arange(16))
+        unique, inverse = np.unique(codes, return_inverse=True)
+
+        block_nodes = np.empty(len(unique), dtype=object)
+        for index, code in enumerate(unique):
+            block_nodes[index] = self._from_code(int(code))
+        nodes = block_nodes[inverse].reshape(n_blocks, n_blocks)
+
+        join = self.join
+        while nodes.shape[0] > 1:
+            n = nodes.shape[0] // 2
+            parents = np.empty((n, n), dtype=object)
+            for i, j in np.ndindex(n, n):
+                parents[i, j] = join(
+                    nodes[2*i, 2*j], nodes[2*i, 2*j + 1],
+                    nodes[2*i + 1, 2*j], nodes[2*i + 1, 2*j + 1],
+                )
+            nodes = parents
+        return nodes[0, 0]
+
+    def to_array(self, node, mask, top, left):
+        """ Set the live cells of a node in a boolean window array.
+
+        Parameters
+        ----------
+        node : Node
+            The node to write.
+        mask : array of bool
+            The window, which should be all False initially.
+        top, left : int
+            The position of the node's top-left cell relative to the window.
+        """
+        size = 1 << node.level
+        rows, cols = mask.shape
+        if (node.population == 0 or top >= rows or left >= cols or
+                top + size <= 0 or left + size <= 0):
+            return
+        if node.level == 0:
+            mask[top, left] = True
+            return
+        half = size // 2
+        self.to_array(node.nw, mask, top, left)
+        self.to_array(node.ne, mask, top, left + half)
+        self.to_array(node.sw, mask, top + half, left)
+        self.to_array(node.se, mask, top + half, left + half)
+
+    def collect_garbage(self, roots):
+        """ Discard all nodes and memoized results not needed by the roots.
+
+        Parameters
+        ----------
+        roots : list of Node
+            The nodes which are still in use.
+        """
+        table = {}
+        stack = list(roots) + self._empty
+        while stack:
+            node = stack.pop()
+            node.results = {}
+            if node.level == 0:
+                continue
+            key = (node.nw, node.ne, node.sw, node.se)
+            if key not in table:
+                table[key] = node
+                stack.extend(key)
+        self.table = table
+
+    # ------------------------------------------------------------------------
+    # Private interface
+    # ------------------------------------------------------------------------
+
+    def _from_code(self, code):
+        """ The level 2 node for 16 cells packed in row-major order. """
+        leaves = self.leaves
+        cells = [leaves[(code >> i) & 1] for i in range(16)]
+        join = self.join
+        return join(
+            join(cells[0], cells[1], cells[4], cells[5]),
+            join(cells[2], cells[3], cells[6], cells[7]),
+            join(cells[8], cells[9], cells[12], cells[13]),
+            join(cells[10], cells[11], cells[14], cells[15]),
+        )
+
+    def _base_successor(self, node):
+        """ The centre of a level 2 node advanced by one generation. """
+        cells = [[0] * 4 for i in range(4)]
+        quadrants = [(node.nw, 0, 0), (node.ne, 0, 2),
+                     (node.sw, 2, 0), (node.se, 2, 2)]
+        for quadrant, row, col in quadrants:
+            cells[row][col] = quadrant.nw.population
+            cells[row][col + 1] = quadrant.ne.population
+            cells[row + 1][col] = quadrant.sw.population
+            cells[row + 1][col + 1] = quadrant.se.population
+
+        new_cells = []
+        for row in (1, 2):
+            for col in (1, 2):
+                count = sum(
+                    cells[row + row_offset][col + col_offset]
+                    for row_offset, col_offset in self.offsets
+                )
+                if cells[row][col]:
+                    live = count in self.survive_counts
+                else:
+                    live = count in self.born_counts
+                new_cells.append(self.leaves[int(live)])
+        return self.join(*new_cells)
+
+
+class HashlifeUniverse(HasStrictTraits):
+    """ An unbounded plane of cells evolved by Hashlife.
+
+    Cells are addressed by (row, column) coordinates on the plane, which may
+    be negative.  The nodes created while evolving the pattern are kept in a
+    cache so that later jumps can reuse them.  When the cache holds more
+    than :py:attr:`max_nodes` nodes after a jump, nodes which are no longer
+    part of the current pattern are discarded along with all memoized
+    results.
+    """
+
+    #: The rule used to evolve the cells.  This must be a deterministic
+    #: Life-like rule with a 3x3 structure and which does not give birth to
+    #: cells with no neighbours.
+    rule = Instance(LifeRule)
+
+    #: The maximum number of nodes to keep in the cache between jumps.  Each
+    #: node uses a few hundred bytes.
+    max_nodes = Int(2**20)
+
+    #: The number of generations the pattern has been advanced.
+    generation = Int(0)
+
+    #: The number of live cells.
+    population = Property(Int)
+
+    #: The number of nodes currently in the cache.
+    n_nodes = Property(Int)
+
+    # Private Traits ---------------------------------------------------------
+
+    #: The canonical node table.
+    _cache = Any
+
+    #: The root node of the pattern.
+    _root = Any
+
+    #: The plane coordinates of the root node's top-left cell.
+    _origin = Any((0, 0))
+
+    # ------------------------------------------------------------------------
+    # HashlifeUniverse interface
+    # ------------------------------------------------------------------------
+
+    def set_states(self, states, top=0, left=0):
+        """ Replace the pattern with the live cells of a states array.
+
+        Parameters
+        ----------
+        states : array
+            A 2D array of states.  Cells equal to the rule's live state are
+            live, and all others are dead.
+        top, left : int
+            The plane coordinates of the top-left cell of the states.
+        """
+        check_hashlife_rule(self.rule)
+        if states.ndim != 2:
+            raise ValueError("Hashlife requires 2-dimensional states.")
+
+        level = max(2, int(np.ceil(np.log2(max(states.shape + (1,))))))
+        size = 1 << level
+        mask = np.zeros((size, size), dtype=bool)
+        mask[:states.shape[0], :states.shape[1]] = (
+            states == self.rule.live_state
+        )
+        self._root = self._cache.from_array(mask)
+        self._origin = (top, left)
+        self.generation = 0
+
+    def window(self, top, left, shape, out=None):
+        """ Get the states of a rectangular window onto the plane.
+
+        Parameters
+        ----------
+        top, left : int
+            The plane coordinates of the top-left cell of the window.
+        shape : tuple of int
+            The shape of the window.
+        out : array or None
+            An array of the given shape to hold the states.  If None, a new
+            uint8 array is created.
+
+        Returns
+        -------
+        states : array
+            The states of the window, using the rule's live and dead states.
+        """
+        mask = np.zeros(shape, dtype=bool)
+        if self._root is not None:
+            root_top, root_left = self._origin
+            self._cache.to_array(
+                self._root, mask, root_top - top, root_left - left
+            )
+        if out is None:
+            out = np.empty(shape, dtype='uint8')
+        out.fill(self.rule.dead_state)
+        out[mask] = self.rule.live_state
+        return out
+
+    def jump(self, k):
+        """ Advance the pattern by 2**k generations.
+
+        Parameters
+        ----------
+        k : int
+            The log2 of the number of generations to advance.
+        """
+        cache = self._cache
+        root = self._root
+        if root is None:
+            root = cache.empty(2)
+        top, left = self._origin
+
+        # pad with empty space until the pattern is well within the centre
+        while root.level < k + 2 or not self._is_centred(root):
+            offset = 1 << (root.level - 1)
+            root = cache.expand(root)
+            top, left = top - offset, left - offset
+        offset = 1 << (root.level - 1)
+        root = cache.expand(root)
+        top, left = top - offset, left - offset
+
+        self._root = cache.successor(root, k)
+        offset = 1 << (root.level - 2)
+        self._origin = (top + offset, left + offset)
+        self.generation += 1 << k
+
+        if len(cache) > self.max_nodes:
+            self.collect_garbage()
+
+    def advance(self, n_generations):
+        """ Advance the pattern by any number of generations.
+
+        The number of generations is split into powers of two, each of which
+        is performed by a single jump.
+
+        Parameters
+        ----------
+        n_generations : int
+            The number of generations to advance.
+        """
+        k = 0
+        while n_generations:
+            if n_generations & 1:
+                self.jump(k)
+            n_generations >>= 1
+            k += 1
+
+    def collect_garbage(self):
+        """ Discard cached nodes and results not used by the pattern. """
+        roots = [] if self._root is None else [self._root]
+        self._cache.collect_garbage(roots)
+
+    # ------------------------------------------------------------------------
+    # Private interface
+    # ------------------------------------------------------------------------
+
+    def _is_centred(self, node):
+        """ Whether all live cells are within the central half of a node. """
+        centre = (
+            node.nw.se.population + node.ne.sw.population +
+            node.sw.ne.population + node.se.nw.population
+        )
+        return centre == node.population
+
+    # Trait change handlers --------------------------------------------------
+
+    def _rule_changed(self):
+        self._cache = NodeCache(self.rule)
+        self._root = None
+        self._origin = (0, 0)
+
+    # Trait properties -------------------------------------------------------
+
+    def _get_population(self):
+        return 0 if self._root is None else self._root.population
+
+    def _get_n_nodes(self):
+        return 0 if self._cache is None else len(self._cache)
+
+
+class HashlifeEngine(AbstractEngine):
+    """ An engine which advances a Life-like rule with Hashlife.
+
+    By default the results are the same as a :py:class:`LifeRule` with the
+    ``'empty'`` boundary.  Since a cell can only affect its neighbours each
+    generation, the pattern is advanced in jumps which are too short for
+    any live cell to reach past the edge of the states.  While live cells
+    are fewer than :py:attr:`min_jump` cells from the edge, blocks of
+    :py:attr:`min_jump` ticks are applied in the usual way instead, so
+    patterns which fill the states cost little more than the usual way.
+
+    If :py:attr:`unbounded` is True, the states are instead treated as a
+    window onto an unbounded plane of dead cells, and are advanced in a
+    single jump.  Live cells which leave the window are remembered for as
+    long as the states are not modified between calls, so they can come
+    back, which gives different results from the ``'empty'`` boundary.
+
+    This is most effective with :py:meth:`CellularAutomaton.run` and a large
+    ``notify_every``, since the time for each call grows roughly with the
+    logarithm of the number of ticks for regular patterns.  Rule lists other
+    than a single suitable :py:class:`LifeRule` are applied in the usual way.
+    """
+
+    # HashlifeEngine Traits --------------------------------------------------
+
+    #: The maximum number of nodes to keep in the cache between jumps.
+    max_nodes = Int(2**20)
+
+    #: The fewest generations to advance with a single Hashlife jump.
+    min_jump = Int(32)
+
+    #: Whether to evolve the states as a window onto an unbounded plane,
+    #: rather than with the rule's 'empty' boundary.
+    unbounded = Bool(False)
+
+    #: The universe holding the current pattern.
+    universe = Instance(HashlifeUniverse)
+
+    # Private Traits ---------------------------------------------------------
+
+    #: The rule parameters which the universe was created for.
+    _rule_key = Any
+
+    #: A copy of the last states returned.
+    _last_states = Any
+
+    # ------------------------------------------------------------------------
+    # AbstractEngine interface
+    # ------------------------------------------------------------------------
+
+    def step(self, rules, states, out):
+        """ Apply the rules for a single tick.
+
+        Parameters
+        ----------
+        rules : list of AbstractRule
+            The rules to apply, in order.
+        states : array
+            An array holding the current states of the automaton.  This is
+            not modified.
+        out : array
+            An array of the same shape and dtype as states which will hold
+            the new states.
+
+        Returns
+        -------
+        states : array
+            The new states of the automaton.
+        """
+        return self.advance(rules, states, 1, out)
+
+    def advance(self, rules, states, n_ticks, out):
+        """ Apply the rules for several ticks using Hashlife.
+
+        Parameters
+        ----------
+        rules : list of AbstractRule
+            The rules to apply, in order, each tick.
+        states : array
+            An array holding the current states of the automaton.  This is
+            not modified.
+        n_ticks : int
+            The number of ticks to advance.
+        out : array
+            An array of the same shape and dtype as states which will hold
+            the new states.
+
+        Returns
+        -------
+        states : array
+            The new states of the automaton.
+        """
+        if not self.can_use(rules, states):
+            if n_ticks == 1:
+                return super(HashlifeEngine, self).step(rules, states, out)
+            return super(HashlifeEngine, self).advance(
+                rules, states, n_ticks, out
+            )
+
+        rule = rules[0]
+        rule_key = _rule_key(rule)
+        universe = self.universe
+        if (universe is None or rule_key != self._rule_key or
+                self._last_states is None or
+                not np.array_equal(states, self._last_states)):
+            universe = None
+
+        min_jump = max(self.min_jump, 1)
+        current = states
+        scratch = None
+        while n_ticks > 0:
+            if self.unbounded:
+                n_jump = n_ticks
+            else:
+                n_jump = _edge_distance(current == rule.live_state)
+                if n_jump is None:
+                    n_jump = n_ticks
+                n_jump = min(n_jump, n_ticks)
+
+            if n_jump < min(min_jump, n_ticks):
+                # live cells near the edge would be born past it
+                n_dense = min(min_jump, n_ticks)
+                for i in range(n_dense):
+                    if current is out:
+                        if scratch is None:
+                            scratch = np.empty_like(out)
+                        target = scratch
+                    else:
+                        target = out
+                    current = super(HashlifeEngine, self).step(
+                        rules, current, target
+                    )
+                universe = None
+                n_ticks -= n_dense
+                continue
+
+            if universe is None:
+                universe = HashlifeUniverse(
+                    rule=rule, max_nodes=self.max_nodes
+                )
+                universe.set_states(current)
+            universe.advance(n_jump)
+            current = universe.window(0, 0, states.shape, out=out)
+            n_ticks -= n_jump
+
+        if current is not out:
+            np.copyto(out, current)
+        self.universe = universe
+        self._rule_key = rule_key
+        self._last_states = out.copy()
+        return out
+
+    # ------------------------------------------------------------------------
+    # HashlifeEngine interface
+    # ------------------------------------------------------------------------
+
+    def can_use(self, rules, states):
+        """ Whether the rules can be applied with Hashlife.
+
+        Parameters
+        ----------
+        rules : list of AbstractRule
+            The rules to apply, in order, each tick.
+        states : array
+            An array holding the current states of the automaton.
+
+        Returns
+        -------
+        usable : bool
+            True if the rules are a single suitable :py:class:`LifeRule`
+            with the empty boundary, and the states are 2D and only hold its
+            live and dead states.
+        """
+        if len(rules) != 1 or not isinstance(rules[0], LifeRule):
+            return False
+        rule = rules[0]
+        try:
+            check_hashlife_rule(rule)
+        except ValueError:
+            return False
+        if rule.boundary != 'empty' or states.ndim != 2:
+            return False
+        two_state = (states == rule.live_state) | (states == rule.dead_state)
+        return bool(two_state.all())
+
+    # Trait change handlers --------------------------------------------------
+
+    def _unbounded_changed(self):
+        # cells past the edge of the states are only kept when unbounded
+        self.universe = None
+
+
+def check_hashlife_rule(rule):
+    """ Check that a Life-like rule can be evolved with Hashlife.
+
+    Parameters
+    ----------
+    rule : LifeRule
+        The rule to check.
+
+    Raises
+    ------
+    ValueError
+        If the rule does not have a 3x3 structure, or gives birth to cells
+        with no live neighbours.
+    """
+    if rule.structure.shape != (3, 3):
+        raise ValueError("Hashlife requires a 3x3 structure.")
+    if 0 in rule.born_counts:
+        raise ValueError("Hashlife cannot evolve rules with birth on 0.")
+
+
+def _edge_distance(mask):
+    """ The number of cells between the live cells and the edge of a mask.
+
+    This is the number of generations for which no cells can be born past
+    the edge, or None if there are no live cells.
+    """
+    distances = []
+    for axis in range(mask.ndim):
+        other_axes = tuple(i for i in range(mask.ndim) if i != axis)
+        live = np.flatnonzero(mask.any(axis=other_axes))
+        if len(live) == 0:
+            return None
+        distances += [live[0], mask.shape[axis] - 1 - live[-1]]
+    return int(min(distances))
+
+
+def _rule_key(rule):
+    """ A hashable summary of the parameters of a Life-like rule. """
+    return (
+        rule.live_state,
+        rule.dead_state,
+        frozenset(rule.born_counts),
+        frozenset(rule.survive_counts),
+        rule.structure.tobytes(),
+    )
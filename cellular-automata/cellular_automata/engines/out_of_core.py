@@ -0,0 +1,273 @@
+# Copyright (c) 2017, Enthought, Inc.
+# All rights reserved.
+#
+# This software is provided without warranty under the terms of the BSD
+# license included in LICENSE.txt and may be redistributed only
+# under the conditions described in the aforementioned license.  The license
+# is also available online at http://www.enthought.com/licenses/BSD.txt
+#
+# Thanks for using Enthought open source!
+"""
+This module provides an engine which steps memory-mapped states arrays that
+may be larger than the available memory, one chunk of rows at a time.
+"""
+
+import tempfile
+import weakref
+
+import numpy as np
+from traits.api import Any, Int, List, Str
+
+from cellular_automata.abstract_engine import AbstractEngine
+from cellular_automata.tiling import band_regions, padded_block, rule_wraps
+
+#: The largest number of backing files of released states arrays which are
+#: kept for reuse by later arrays.
+MAX_FREE_FILES = 2
+
+
+class ChunkedEngine(AbstractEngine):
+    """ An engine which applies rules to bounded-size chunks of rows.
+
+    The states arrays used with this engine are memory-mapped files, so the
+    states may be much larger than the available memory.  Rules are applied
+    to chunks of :py:attr:`chunk_rows` rows, each padded with a halo of the
+    neighbouring rows, so that the memory used by the rules' temporary
+    arrays is bounded by the chunk size rather than the grid size.
+
+    Consecutive deterministic local rules are grouped into a single pass
+    over the states, with a halo wide enough for all of them, which reduces
+    the amount of reading and writing of the files.  A stochastic rule ends
+    a pass, so that the random outcome for each cell is decided exactly
+    once.  Rules which are not local, such as :py:class:`BurnGrovesRule`,
+    cannot be split into chunks and are applied to the whole array, so they
+    load the whole grid into memory along with any temporary arrays of the
+    same size that they create, such as the grove labels of
+    :py:class:`BurnGrovesRule`.
+
+    A call to :py:meth:`advance` only uses the output array and a scratch
+    array which the engine keeps between calls.  The backing files of
+    states arrays which have been released are reused by later calls to
+    :py:meth:`allocate`, so an automaton which allocates new states every
+    tick keeps reusing the same few files.
+
+    Existing memory-mapped states can be used by passing an
+    :py:class:`numpy.memmap` as the states of the automaton.
+    """
+
+    # ChunkedEngine Traits ---------------------------------------------------
+
+    #: The number of rows in each chunk.
+    chunk_rows = Int(1024)
+
+    #: The directory to hold the files backing the states arrays.  If empty,
+    #: the system's default temporary directory is used.
+    directory = Str
+
+    # Private Traits ---------------------------------------------------------
+
+    #: A scratch states buffer.
+    _scratch = Any
+
+    #: The open backing files of released states arrays.
+    _free_files = List
+
+    # ------------------------------------------------------------------------
+    # AbstractEngine interface
+    # ------------------------------------------------------------------------
+
+    def allocate(self, shape, dtype):
+        """ Allocate a states array backed by an anonymous temporary file.
+
+        The file is reused for a later array once the array is released.
+
+        Parameters
+        ----------
+        shape : tuple of int
+            The shape of the array.
+        dtype : dtype
+            The dtype of the array.
+
+        Returns
+        -------
+        states : memmap
+            The new array.
+        """
+        dtype = np.dtype(dtype)
+        size = int(np.prod(shape)) * dtype.itemsize
+        if self._free_files:
+            backing_file = self._free_files.pop()
+            backing_file.truncate(size)
+        else:
+            directory = self.directory if self.directory else None
+            backing_file = tempfile.TemporaryFile(dir=directory)
+
+        states = np.memmap(backing_file, dtype=dtype, mode='w+', shape=shape)
+        weakref.finalize(states, _recycle, self._free_files, backing_file)
+        return states
+
+    def step(self, rules, states, out):
+        """ Apply each of the rules in turn for a single tick.
+
+        Parameters
+        ----------
+        rules : list of AbstractRule
+            The rules to apply, in order.
+        states : array
+            An array holding the current states of the automaton.  This is
+            not modified.
+        out : array
+            An array of the same shape and dtype as states which will hold
+            the new states.
+
+        Returns
+        -------
+        out : array
+            The output array holding the new states of the automaton.
+        """
+        return self.advance(rules, states, 1, out)
+
+    def advance(self, rules, states, n_ticks, out):
+        """ Apply the rules for several ticks.
+
+        The states move between the output array and the engine's scratch
+        array, so no arrays are allocated after the first call.
+
+        Parameters
+        ----------
+        rules : list of AbstractRule
+            The rules to apply, in order, each tick.
+        states : array
+            An array holding the current states of the automaton.  This is
+            not modified.
+        n_ticks : int
+            The number of ticks to advance.
+        out : array
+            An array of the same shape and dtype as states which will hold
+            the new states.
+
+        Returns
+        -------
+        out : array
+            The output array holding the new states of the automaton.
+        """
+        for rule in rules:
+            rule.check_states(states)
+
+        scratch = self._scratch
+        if (scratch is None or scratch.shape != states.shape or
+                scratch.dtype != states.dtype):
+            scratch = self._scratch = self.allocate(states.shape, states.dtype)
+
+        current = states
+        for tick in range(n_ticks):
+            current = self._apply_rules(rules, states, current, out, scratch)
+
+        if current is not out:
+            for region in self.chunks(states.shape):
+                out[region] = current[region]
+        if isinstance(out, np.memmap):
+            out.flush()
+        return out
+
+    # ------------------------------------------------------------------------
+    # ChunkedEngine interface
+    # ------------------------------------------------------------------------
+
+    def chunks(self, shape):
+        """ The regions of the states which are processed together.
+
+        Parameters
+        ----------
+        shape : tuple of int
+            The shape of the states array.
+
+        Returns
+        -------
+        regions : list of tuples of slices
+            Slices which select each chunk from the states array.
+        """
+        n_chunks = -(-shape[0] // max(self.chunk_rows, 1))
+        return band_regions(shape, n_chunks)
+
+    def passes(self, rules):
+        """ Group the rules into passes over the states.
+
+        Each pass is either a single non-local rule, or a sequence of local
+        rules which all use the same boundary wrapping, of which only the
+        last may be stochastic.
+
+        Parameters
+        ----------
+        rules : list of AbstractRule
+            The rules to apply, in order.
+
+        Returns
+        -------
+        passes : list of lists of AbstractRule
+            The rules grouped into passes.
+        """
+        passes = []
+        current = []
+        for rule in rules:
+            if current and (rule.halo is None or
+                            rule_wraps(rule) != rule_wraps(current[0])):
+                passes.append(current)
+                current = []
+            current.append(rule)
+            if rule.halo is None or rule.stochastic:
+                passes.append(current)
+                current = []
+        if current:
+            passes.append(current)
+        return passes
+
+    # ------------------------------------------------------------------------
+    # Private interface
+    # ------------------------------------------------------------------------
+
+    def _apply_rules(self, rules, states, current, out, scratch):
+        """ Apply the rules for one tick, returning the buffer holding the
+        new states.
+
+        The current states are either the caller's states, which must not
+        be modified, or one of the output and scratch buffers.
+        """
+        for rules_pass in self.passes(rules):
+            halo = rules_pass[0].halo
+            if halo is None:
+                rule = rules_pass[0]
+                if rule.in_place and current is not states:
+                    result = rule.step(current)
+                    if result is not current:
+                        np.copyto(current, result)
+                    continue
+                target = scratch if current is out else out
+                rule.step_into(current, target)
+            else:
+                halo = sum(rule.halo for rule in rules_pass)
+                if halo == 0 and current is not states:
+                    target = current
+                else:
+                    target = scratch if current is out else out
+                self._apply_pass(rules_pass, halo, current, target)
+            current = target
+        return current
+
+    def _apply_pass(self, rules, halo, states, out):
+        """ Apply a sequence of local rules chunk by chunk. """
+        wrap = rule_wraps(rules[0])
+        for region in self.chunks(states.shape):
+            block, inner = padded_block(states, region, halo, wrap)
+            block = np.array(block)
+            for rule in rules:
+                block = rule.step(block)
+            out[region] = block[inner]
+
+
+def _recycle(free_files, backing_file):
+    """ Keep the backing file of a released states array for reuse. """
+    if len(free_files) < MAX_FREE_FILES:
+        free_files.append(backing_file)
+    else:
+        backing_file.close()
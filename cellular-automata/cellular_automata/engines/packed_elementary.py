@@ -0,0 +1,252 @@
+# Copyright (c) 2017, Enthought, Inc.
+# All rights reserved.
+#
+# This software is provided without warranty under the terms of the BSD
+# license included in LICENSE.txt and may be redistributed only
+# under the conditions described in the aforementioned license.  The license
+# is also available online at http://www.enthought.com/licenses/BSD.txt
+#
+# Thanks for using Enthought open source!
+"""
+This module provides an engine which runs elementary 1D automata on
+bit-packed states, 64 cells to a machine word.
+"""
+
+import numpy as np
+
+from cellular_automata.abstract_engine import AbstractEngine
+from cellular_automata.bit_packing import (
+    ALL_ONES, WORD_BITS, get_bit, pack_bits, set_bit, shift_cells, unpack_bits
+)
+from cellular_automata.rules.elementary_1d_rule import (
+    Elementary1DRule, algebraic_normal_form
+)
+
+#: Constant values of cells outside the line for the boundary modes which
+#: don't copy cells.
+PAD_VALUES = {
+    'empty': 0,
+    'filled': 1,
+}
+
+#: The boundary modes supported by the packed engine.
+PACKED_BOUNDARIES = {'empty', 'filled', 'wrap'}
+
+
+class PackedElementaryEngine(AbstractEngine):
+    """ An engine which runs an :py:class:`Elementary1DRule` on bit-packed
+    states.
+
+    When the only rule is an :py:class:`Elementary1DRule` with the 'empty',
+    'filled' or 'wrap' boundary, the filled cells of the line are packed 64
+    to a uint64 word.  The rule is evaluated with the exclusive-or of the
+    conjunctions in its algebraic normal form, which is derived from the
+    rule's bit mask, so each word-wide bitwise operation updates 64 cells.
+
+    The states are only packed at the start and unpacked at the end of a
+    call to :py:meth:`advance`, so :py:meth:`CellularAutomaton.run` with a
+    large ``notify_every`` keeps the states packed for many ticks.  Other
+    rule lists are applied in the usual way.
+    """
+
+    # ------------------------------------------------------------------------
+    # AbstractEngine interface
+    # ------------------------------------------------------------------------
+
+    def step(self, rules, states, out):
+        """ Apply the rules for a single tick.
+
+        Parameters
+        ----------
+        rules : list of AbstractRule
+            The rules to apply, in order.
+        states : array
+            An array holding the current states of the automaton.  This is
+            not modified.
+        out : array
+            An array of the same shape and dtype as states which will hold
+            the new states.
+
+        Returns
+        -------
+        states : array
+            The new states of the automaton.
+        """
+        return self.advance(rules, states, 1, out)
+
+    def advance(self, rules, states, n_ticks, out):
+        """ Apply the rules for several ticks, keeping the states packed.
+
+        Parameters
+        ----------
+        rules : list of AbstractRule
+            The rules to apply, in order, each tick.
+        states : array
+            An array holding the current states of the automaton.  This is
+            not modified.
+        n_ticks : int
+            The number of ticks to advance.
+        out : array
+            An array of the same shape and dtype as states which will hold
+            the new states.
+
+        Returns
+        -------
+        states : array
+            The new states of the automaton.
+        """
+        if n_ticks == 0 or not self.can_pack(rules, states):
+            if n_ticks == 1:
+                return super(PackedElementaryEngine, self).step(
+                    rules, states, out
+                )
+            return super(PackedElementaryEngine, self).advance(
+                rules, states, n_ticks, out
+            )
+
+        rule = rules[0]
+        rule.check_states(states)
+        packed = PackedElementaryStates(rule, states)
+        for i in range(n_ticks):
+            packed.step()
+        return packed.unpack(out)
+
+    # ------------------------------------------------------------------------
+    # PackedElementaryEngine interface
+    # ------------------------------------------------------------------------
+
+    def can_pack(self, rules, states):
+        """ Whether the rules can be applied to packed states.
+
+        Parameters
+        ----------
+        rules : list of AbstractRule
+            The rules to apply, in order, each tick.
+        states : array
+            An array holding the current states of the automaton.
+
+        Returns
+        -------
+        packable : bool
+            True if the rules are a single :py:class:`Elementary1DRule`
+            with a supported boundary mode, and the states are 1D.
+        """
+        if len(rules) != 1 or not isinstance(rules[0], Elementary1DRule):
+            return False
+        return states.ndim == 1 and rules[0].boundary in PACKED_BOUNDARIES
+
+    def space_time(self, rules, states, n_ticks):
+        """ The packed rows of the space-time diagram of a line.
+
+        Parameters
+        ----------
+        rules : list of AbstractRule
+            A single :py:class:`Elementary1DRule` which can be packed.
+        states : array
+            A 1D array holding the initial states of the line.
+        n_ticks : int
+            The number of ticks to advance.
+
+        Returns
+        -------
+        rows : array of uint64
+            An array of shape ``(n_ticks + 1, n_words)`` whose rows hold the
+            filled cells of the line at each tick, starting with the initial
+            states, packed as by :py:func:`~.bit_packing.pack_bits`.  The
+            padding bits are zero.
+        """
+        if not self.can_pack(rules, states):
+            msg = "Rules {!r} can't be applied to packed states."
+            raise ValueError(msg.format(rules))
+
+        rule = rules[0]
+        rule.check_states(states)
+        packed = PackedElementaryStates(rule, states)
+        rows = np.empty((n_ticks + 1,) + packed.words.shape, dtype=np.uint64)
+        rows[0] = packed.words
+        for tick in range(1, n_ticks + 1):
+            rows[tick] = packed.step()
+        return rows
+
+
+class PackedElementaryStates(object):
+    """ The states of an elementary 1D automaton packed into uint64 words.
+
+    The padding bits past the end of the line are kept at zero.
+
+    Parameters
+    ----------
+    rule : Elementary1DRule
+        The rule to apply.  Its boundary mode must be 'empty', 'filled' or
+        'wrap'.
+    states : array
+        A 1D array holding the states.  Cells which don't hold the filled
+        state are treated as empty.
+    """
+
+    def __init__(self, rule, states):
+        self.rule = rule
+        self.n_cells = states.shape[-1]
+        self.terms = algebraic_normal_form(rule.bit_mask)
+        self.words = pack_bits(states == rule.filled_state)
+
+        remainder = self.n_cells % WORD_BITS
+        if remainder:
+            self.last_word_mask = np.uint64((1 << remainder) - 1)
+        else:
+            self.last_word_mask = ALL_ONES
+
+    def step(self):
+        """ Advance the packed states by one tick.
+
+        Returns
+        -------
+        words : array of uint64
+            The packed cells after the step.
+        """
+        words = self.words
+        last = self.n_cells - 1
+        left = shift_cells(words, -1)
+        right = shift_cells(words, 1)
+
+        boundary = self.rule.boundary
+        if boundary == 'wrap':
+            set_bit(left, 0, get_bit(words, last))
+            set_bit(right, last, get_bit(words, 0))
+        else:
+            value = np.uint64(PAD_VALUES[boundary])
+            set_bit(left, 0, value)
+            set_bit(right, last, value)
+
+        cells = {-1: left, 0: words, 1: right}
+        result = np.zeros_like(words)
+        for term in self.terms:
+            if not term:
+                result ^= ALL_ONES
+                continue
+            conjunction = cells[term[0]].copy()
+            for offset in term[1:]:
+                conjunction &= cells[offset]
+            result ^= conjunction
+
+        result[..., -1] &= self.last_word_mask
+        self.words = result
+        return result
+
+    def unpack(self, out):
+        """ Write the unpacked states into an array.
+
+        Parameters
+        ----------
+        out : array
+            The array to hold the states.
+
+        Returns
+        -------
+        out : array
+            The array holding the states.
+        """
+        filled = unpack_bits(self.words, self.n_cells)
+        out.fill(self.rule.empty_state)
+        out[filled] = self.rule.filled_state
+        return out
@@ -0,0 +1,249 @@
+# Copyright (c) 2017, Enthought, Inc.
+# All rights reserved.
+#
+# This software is provided without warranty under the terms of the BSD
+# license included in LICENSE.txt and may be redistributed only
+# under the conditions described in the aforementioned license.  The license
+# is also available online at http://www.enthought.com/licenses/BSD.txt
+#
+# Thanks for using Enthought open source!
+"""
+This module provides an engine which runs two-state Life-like automata on
+bit-packed states, 64 cells to a machine word.
+"""
+
+import numpy as np
+
+from cellular_automata.abstract_engine import AbstractEngine
+from cellular_automata.bit_packing import (
+    ALL_ONES, WORD_BITS, add_to_counter, counter_equals, get_bit,
+    pack_bits, set_bit, shift_cells, unpack_bits
+)
+from cellular_automata.rules.life import LifeRule
+
+#: NumPy padding modes matching the boundary modes which copy cells.
+PAD_MODES = {
+    'nearest': 'edge',
+    'wrap': 'wrap',
+    'reflect': 'symmetric',
+}
+
+#: Constant values of cells outside the states for the other boundary modes.
+PAD_VALUES = {
+    'empty': 0,
+    'filled': 1,
+}
+
+
+class PackedLifeEngine(AbstractEngine):
+    """ An engine which runs a :py:class:`LifeRule` on bit-packed states.
+
+    When the only rule is a :py:class:`LifeRule` on 2D states which only
+    hold the live and dead state values, the live cells are packed 64 to a
+    uint64 word along rows.  Neighbour counts are then computed for 64 cells
+    at a time by adding shifted copies of the packed cells into a bit-sliced
+    counter using bitwise operations, and the new cells are selected by
+    comparing the counter with the born and survive counts.  This works for
+    any born and survive counts, any odd-shaped structure, and every
+    boundary mode.
+
+    The states are only packed at the start and unpacked at the end of a
+    call to :py:meth:`advance`, so :py:meth:`CellularAutomaton.run` with a
+    large ``notify_every`` keeps the states packed for many ticks.  Other
+    rule lists are applied in the usual way.
+    """
+
+    # ------------------------------------------------------------------------
+    # AbstractEngine interface
+    # ------------------------------------------------------------------------
+
+    def step(self, rules, states, out):
+        """ Apply the rules for a single tick.
+
+        Parameters
+        ----------
+        rules : list of AbstractRule
+            The rules to apply, in order.
+        states : array
+            An array holding the current states of the automaton.  This is
+            not modified.
+        out : array
+            An array of the same shape and dtype as states which will hold
+            the new states.
+
+        Returns
+        -------
+        states : array
+            The new states of the automaton.
+        """
+        return self.advance(rules, states, 1, out)
+
+    def advance(self, rules, states, n_ticks, out):
+        """ Apply the rules for several ticks, keeping the states packed.
+
+        Parameters
+        ----------
+        rules : list of AbstractRule
+            The rules to apply, in order, each tick.
+        states : array
+            An array holding the current states of the automaton.  This is
+            not modified.
+        n_ticks : int
+            The number of ticks to advance.
+        out : array
+            An array of the same shape and dtype as states which will hold
+            the new states.
+
+        Returns
+        -------
+        states : array
+            The new states of the automaton.
+        """
+        if not self.can_pack(rules, states):
+            if n_ticks == 1:
+                return super(PackedLifeEngine, self).step(rules, states, out)
+            return super(PackedLifeEngine, self).advance(
+                rules, states, n_ticks, out
+            )
+
+        rule = rules[0]
+        rule.check_states(states)
+        packed = PackedLifeStates(rule, states)
+        for i in range(n_ticks):
+            packed.step()
+        return packed.unpack(out)
+
+    # ------------------------------------------------------------------------
+    # PackedLifeEngine interface
+    # ------------------------------------------------------------------------
+
+    def can_pack(self, rules, states):
+        """ Whether the rules can be applied to packed states.
+
+        Parameters
+        ----------
+        rules : list of AbstractRule
+            The rules to apply, in order, each tick.
+        states : array
+            An array holding the current states of the automaton.
+
+        Returns
+        -------
+        packable : bool
+            True if the rules are a single suitable :py:class:`LifeRule`
+            and the states only hold its live and dead states.
+        """
+        if len(rules) != 1 or not isinstance(rules[0], LifeRule):
+            return False
+        rule = rules[0]
+        structure = rule.structure
+        if states.ndim != 2 or structure.ndim != 2:
+            return False
+        if any(n % 2 == 0 or n // 2 >= WORD_BITS for n in structure.shape):
+            return False
+        two_state = (states == rule.live_state) | (states == rule.dead_state)
+        return bool(two_state.all())
+
+
+class PackedLifeStates(object):
+    """ The states of a Life-like automaton packed into uint64 words.
+
+    The live cells are held with a border of :py:attr:`radius` cells on each
+    side, which is refilled according to the rule's boundary mode before
+    each step.
+
+    Parameters
+    ----------
+    rule : LifeRule
+        The rule to apply.
+    states : array
+        A 2D array holding only the live and dead states of the rule.
+    """
+
+    def __init__(self, rule, states):
+        self.rule = rule
+        self.shape = states.shape
+        self.radius = max(rule.structure.shape) // 2
+
+        # offsets of neighbours, flipped to match ndimage.convolve
+        centre = np.array(rule.structure.shape) // 2
+        self.offsets = [
+            tuple(centre - index) for index in np.argwhere(rule.structure)
+        ]
+        self.n_planes = max(len(self.offsets).bit_length(), 1)
+
+        r = self.radius
+        live = np.pad(states == rule.live_state, r, mode='constant')
+        self.words = pack_bits(live)
+
+    def step(self):
+        """ Advance the packed states by one tick. """
+        self._fill_border()
+
+        rows, cols = self.shape
+        r = self.radius
+        words = self.words
+        counter = [
+            np.zeros((rows, words.shape[1]), dtype=np.uint64)
+            for i in range(self.n_planes)
+        ]
+        for row_offset, col_offset in self.offsets:
+            neighbours = words[r + row_offset:r + row_offset + rows]
+            add_to_counter(counter, shift_cells(neighbours, col_offset))
+
+        born = np.zeros_like(counter[0])
+        for count in self.rule.born_counts:
+            born |= counter_equals(counter, count)
+        survived = np.zeros_like(counter[0])
+        for count in self.rule.survive_counts:
+            survived |= counter_equals(counter, count)
+
+        live = words[r:r + rows]
+        words[r:r + rows] = (born & ~live) | (survived & live)
+
+    def unpack(self, out):
+        """ Write the unpacked states into an array.
+
+        Parameters
+        ----------
+        out : array
+            The array to hold the states.
+
+        Returns
+        -------
+        out : array
+            The array holding the states.
+        """
+        rows, cols = self.shape
+        r = self.radius
+        live = unpack_bits(self.words[r:r + rows], cols + 2 * r)[:, r:r + cols]
+        out.fill(self.rule.dead_state)
+        out[live] = self.rule.live_state
+        return out
+
+    def _fill_border(self):
+        """ Set the border cells according to the boundary mode. """
+        rows, cols = self.shape
+        r = self.radius
+        if r == 0:
+            return
+        words = self.words
+        boundary = self.rule.boundary
+
+        if boundary in PAD_VALUES:
+            value = PAD_VALUES[boundary]
+            bits = np.full(rows + 2 * r, value, dtype=np.uint64)
+            for position in list(range(r)) + list(range(r + cols, cols + 2*r)):
+                set_bit(words, position, bits)
+            word_value = ALL_ONES if value else np.uint64(0)
+            words[:r] = word_value
+            words[r + rows:] = word_value
+            return
+
+        mode = PAD_MODES[boundary]
+        col_sources = np.pad(np.arange(cols), r, mode=mode) + r
+        for position in list(range(r)) + list(range(r + cols, cols + 2*r)):
+            set_bit(words, position, get_bit(words, col_sources[position]))
+        row_sources = np.pad(np.arange(rows), r, mode=mode) + r
+        words[:r] = words[row_sources[:r]]
+        words[r + rows:] = words[row_sources[r + rows:]]
@@ -0,0 +1,440 @@
+# Copyright (c) 2017, Enthought, Inc.
+# All rights reserved.
+#
+# This software is provided without warranty under the terms of the BSD
+# license included in LICENSE.txt and may be redistributed only
+# under the conditions described in the aforementioned license.  The license
+# is also available online at http://www.enthought.com/licenses/BSD.txt
+#
+# Thanks for using Enthought open source!
+"""
+This module provides an engine which decomposes the states array into
+subdomains which are stepped by separate worker processes, with the states
+held in shared memory.
+"""
+
+import multiprocessing
+from multiprocessing import shared_memory
+import pickle
+import traceback
+import weakref
+
+import numpy as np
+from traits.api import Bool, Either, Instance, Int, List
+
+from cellular_automata.abstract_engine import AbstractEngine
+from cellular_automata.abstract_rule import AbstractRule
+from cellular_automata.tiling import band_regions, padded_block, rule_wraps
+
+
+class SharedMemoryEngine(AbstractEngine):
+    """ An engine which steps bands of the states in worker processes.
+
+    The states are held in a pair of shared memory buffers, and each worker
+    process owns one band of rows.  For each rule, every worker reads its
+    band together with a halo of neighbouring rows from one buffer and
+    writes the new states of its band to the other buffer, then waits at a
+    barrier for the other workers, so halos are exchanged through shared
+    memory.  Rules which are not local are applied to the whole array by
+    the first worker, and their transient outputs, such as
+    :py:attr:`BurnGrovesRule.burnt_grove_sizes`, are copied back to the
+    rules.
+
+    The states stay in the shared buffers for all the ticks of a call to
+    :py:meth:`advance`.  Arrays created by :py:meth:`allocate` are also
+    held in shared memory, so the workers copy the states in and out of
+    them directly.
+
+    Whenever the rules are sent to the workers, each worker is given its
+    own child stream of each rule's generator, so stochastic rules are
+    reproducible for a given automaton seed and number of workers, although
+    the random draws differ from serial execution.  The rules are only sent
+    again when the list of rules changes, or when a trait of one of the
+    rules, or of a rule that it wraps, changes.
+
+    Worker processes are started on the first step and run until
+    :py:meth:`shutdown` is called or the shape of the states changes.
+    """
+
+    # SharedMemoryEngine Traits ----------------------------------------------
+
+    #: The number of worker processes.
+    n_workers = Int
+
+    #: The seed for the global NumPy random states of the workers, for rules
+    #: which draw from :py:mod:`numpy.random` rather than their generator.
+    #: If None, then fresh entropy is used each time the workers are started.
+    seed = Either(None, Int)
+
+    # Private Traits ---------------------------------------------------------
+
+    #: The pair of shared memory blocks holding the states.
+    _shared_memory = List
+
+    #: Arrays backed by the shared memory blocks.
+    _buffers = List
+
+    #: The worker processes.
+    _processes = List
+
+    #: Connections used to send commands to the workers.
+    _connections = List
+
+    #: The rules that the workers currently hold.
+    _rules = List
+
+    #: Whether the rules have changed since they were sent to the workers.
+    _rules_modified = Bool(False)
+
+    #: The arrays created by :py:meth:`allocate`, keyed by the names of
+    #: their shared memory blocks.
+    _allocated = Instance(weakref.WeakValueDictionary, ())
+
+    # ------------------------------------------------------------------------
+    # AbstractEngine interface
+    # ------------------------------------------------------------------------
+
+    def allocate(self, shape, dtype):
+        """ Allocate an uninitialized states array in shared memory.
+
+        The shared memory is released when the array is garbage collected.
+
+        Parameters
+        ----------
+        shape : tuple of int
+            The shape of the array.
+        dtype : dtype
+            The dtype of the array.
+
+        Returns
+        -------
+        states : array
+            The new array.
+        """
+        dtype = np.dtype(dtype)
+        size = int(np.prod(shape)) * dtype.itemsize
+        block = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        states = np.ndarray(shape, dtype, buffer=block.buf)
+        weakref.finalize(states, _release, block)
+        self._allocated[block.name] = states
+        return states
+
+    def step(self, rules, states, out):
+        """ Apply each of the rules in turn for a single tick.
+
+        Parameters
+        ----------
+        rules : list of AbstractRule
+            The rules to apply, in order.
+        states : array
+            An array holding the current states of the automaton.  This is
+            not modified.
+        out : array
+            An array of the same shape and dtype as states which will hold
+            the new states.
+
+        Returns
+        -------
+        out : array
+            The output array holding the new states of the automaton.
+        """
+        return self.advance(rules, states, 1, out)
+
+    def advance(self, rules, states, n_ticks, out):
+        """ Apply the rules for several ticks in the worker processes.
+
+        Parameters
+        ----------
+        rules : list of AbstractRule
+            The rules to apply, in order, each tick.
+        states : array
+            An array holding the current states of the automaton.  This is
+            not modified.
+        n_ticks : int
+            The number of ticks to advance.
+        out : array
+            An array of the same shape and dtype as states which will hold
+            the new states.
+
+        Returns
+        -------
+        out : array
+            The output array holding the new states of the automaton.
+        """
+        for rule in rules:
+            rule.check_states(states)
+        if n_ticks == 0:
+            np.copyto(out, states)
+            return out
+
+        if (not self._buffers or self._buffers[0].shape != states.shape or
+                self._buffers[0].dtype != states.dtype):
+            self.shutdown()
+            self._start(states)
+
+        n_workers = len(self._connections)
+        rules = list(rules)
+        if rules == self._rules and not self._rules_modified:
+            rule_messages = [None] * n_workers
+        else:
+            # spawning streams changes the rules' generators, so pickle after
+            streams = [rule.generator.spawn(n_workers) for rule in rules]
+            pickled_rules = pickle.dumps(rules)
+            rule_messages = [
+                (pickled_rules, [children[index] for children in streams])
+                for index in range(n_workers)
+            ]
+            self._watch_rules(self._rules, remove=True)
+            self._watch_rules(rules)
+            self._rules = rules
+            self._rules_modified = False
+
+        source = self._allocated_name(states)
+        if source is None:
+            np.copyto(self._buffers[0], states)
+        target = self._allocated_name(out)
+
+        for connection, rule_message in zip(self._connections, rule_messages):
+            connection.send((rule_message, n_ticks, source, target))
+        results = [connection.recv() for connection in self._connections]
+
+        errors = [result[1] for result in results if result[0] == 'error']
+        if errors:
+            self.shutdown()
+            raise RuntimeError("Worker process failed:\n" + errors[0])
+
+        kind, current, outputs = results[0]
+        for rule, values in zip(rules, outputs):
+            rule.trait_set(**values)
+        if target is None:
+            np.copyto(out, self._buffers[current])
+        return out
+
+    # ------------------------------------------------------------------------
+    # SharedMemoryEngine interface
+    # ------------------------------------------------------------------------
+
+    def shutdown(self):
+        """ Stop the worker processes and release the shared memory. """
+        for connection in self._connections:
+            connection.send(StopIteration)
+            connection.close()
+        for process in self._processes:
+            process.join()
+        self._buffers = []
+        for block in self._shared_memory:
+            block.close()
+            block.unlink()
+        self._shared_memory = []
+        self._processes = []
+        self._connections = []
+        self._watch_rules(self._rules, remove=True)
+        self._rules = []
+        self._rules_modified = False
+
+    # ------------------------------------------------------------------------
+    # Private interface
+    # ------------------------------------------------------------------------
+
+    def _start(self, states):
+        """ Create the shared buffers and start the worker processes. """
+        self._shared_memory = [
+            shared_memory.SharedMemory(create=True, size=max(states.nbytes, 1))
+            for i in range(2)
+        ]
+        self._buffers = [
+            np.ndarray(states.shape, states.dtype, buffer=block.buf)
+            for block in self._shared_memory
+        ]
+
+        regions = band_regions(states.shape, self.n_workers)
+        seeds = np.random.SeedSequence(self.seed).spawn(len(regions))
+        barrier = multiprocessing.Barrier(len(regions))
+        for index, (region, seed) in enumerate(zip(regions, seeds)):
+            connection, worker_connection = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=_worker,
+                args=(
+                    worker_connection,
+                    barrier,
+                    [block.name for block in self._shared_memory],
+                    states.shape,
+                    states.dtype,
+                    region,
+                    index == 0,
+                    seed.generate_state(4),
+                ),
+                daemon=True,
+            )
+            process.start()
+            self._processes.append(process)
+            self._connections.append(connection)
+
+    def _allocated_name(self, states):
+        """ The name of the shared memory block of an allocated array, or
+        None if the array wasn't created by :py:meth:`allocate`.
+        """
+        for name, array in self._allocated.items():
+            if array is states:
+                return name
+        return None
+
+    def _watch_rules(self, rules, remove=False):
+        """ Start or stop listening for changes to rules and their parts.
+        """
+        for rule in _nested_rules(rules):
+            rule.on_trait_change(self._rule_modified, remove=remove)
+
+    def _rule_modified(self, rule, name, old, new):
+        # transient traits hold caches and outputs, not parameters
+        trait = rule.trait(name)
+        if trait is None or not trait.transient:
+            self._rules_modified = True
+
+    # Trait defaults ---------------------------------------------------------
+
+    def _n_workers_default(self):
+        return multiprocessing.cpu_count()
+
+
+def _worker(connection, barrier, names, shape, dtype, region, is_first, seed):
+    """ The main loop of a worker process.
+
+    Each message received is either StopIteration, meaning the worker should
+    exit, or a tuple of the new rules, the number of ticks to advance, and
+    the names of the shared memory blocks of the initial and final states.
+    The new rules are either None, meaning keep using the current rules, or
+    a tuple of pickled rules and the worker's generator for each rule.  If
+    the name of the initial or final states is None, then the parent
+    process copies the states into or out of the buffers itself.
+    """
+    blocks = [shared_memory.SharedMemory(name=name) for name in names]
+    buffers = [
+        np.ndarray(shape, dtype, buffer=block.buf) for block in blocks
+    ]
+    np.random.seed(seed)
+
+    rules = []
+    try:
+        while True:
+            message = connection.recv()
+            if message is StopIteration:
+                break
+            rule_message, n_ticks, source, target = message
+
+            try:
+                if rule_message is not None:
+                    pickled_rules, generators = rule_message
+                    rules = [
+                        rule.clone_with_generator(generator)
+                        for rule, generator
+                        in zip(pickle.loads(pickled_rules), generators)
+                    ]
+                if source is not None:
+                    _copy_band(source, buffers[0], region, True)
+                    barrier.wait()
+                current = 0
+                for tick in range(n_ticks):
+                    for rule in rules:
+                        current = _apply_rule(
+                            rule, buffers, current, region, is_first,
+                            barrier,
+                        )
+                if target is not None:
+                    _copy_band(target, buffers[current], region, False)
+            except Exception:
+                barrier.abort()
+                connection.send(('error', traceback.format_exc()))
+            else:
+                outputs = [
+                    _rule_outputs(rule) if is_first else {} for rule in rules
+                ]
+                connection.send(('ok', current, outputs))
+    finally:
+        del buffers
+        for block in blocks:
+            block.close()
+
+
+def _copy_band(name, buffer, region, to_buffer):
+    """ Copy a band between a buffer and a named shared memory block. """
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        states = np.ndarray(buffer.shape, buffer.dtype, buffer=block.buf)
+        if to_buffer:
+            buffer[region] = states[region]
+        else:
+            states[region] = buffer[region]
+        del states
+    finally:
+        block.close()
+
+
+def _rule_outputs(rule):
+    """ The public transient traits of a rule which isn't local.
+
+    Rules which aren't local are applied to the whole array by the first
+    worker, so its values of these are the values for the whole array.
+    """
+    if rule.halo is not None:
+        return {}
+    names = rule.trait_names(type='trait', transient=True)
+    return {
+        name: getattr(rule, name) for name in names
+        if not name.startswith('_')
+    }
+
+
+def _nested_rules(rules):
+    """ Yield the rules, along with any rules held in their traits. """
+    for rule in rules:
+        yield rule
+        for name in rule.trait_names(type='trait'):
+            value = getattr(rule, name)
+            if isinstance(value, AbstractRule):
+                yield from _nested_rules([value])
+            elif isinstance(value, list):
+                yield from _nested_rules([
+                    item for item in value if isinstance(item, AbstractRule)
+                ])
+
+
+def _release(block):
+    """ Release the shared memory of an array created by the engine. """
+    block.close()
+    block.unlink()
+
+
+def _apply_rule(rule, buffers, current, region, is_first, barrier):
+    """ Apply a rule to a worker's band, returning the current buffer index.
+    """
+    source = buffers[current]
+    target = buffers[1 - current]
+
+    if rule.halo is None:
+        # non-local rules are applied to everything by the first worker
+        if rule.in_place:
+            if is_first:
+                result = rule.step(source)
+                if result is not source:
+                    np.copyto(source, result)
+            barrier.wait()
+            return current
+        elif is_first:
+            rule.step_into(source, target)
+    elif rule.halo == 0 and rule.in_place:
+        # pointwise rules can update the band where it is
+        band = source[region]
+        result = rule.step(band)
+        if result is not band:
+            band[...] = result
+        barrier.wait()
+        return current
+    else:
+        block, inner = padded_block(
+            source, region, rule.halo, rule_wraps(rule)
+        )
+        target[region] = rule.step(np.array(block))[inner]
+
+    barrier.wait()
+    return 1 - current
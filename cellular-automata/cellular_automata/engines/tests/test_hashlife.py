@@ -0,0 +1,177 @@
+# Copyright (c) 2017, Enthought, Inc.
+# All rights reserved.
+#
+# This software is provided without warranty under the terms of the BSD
+# license included in LICENSE.txt and may be redistributed only
+# under the conditions described in the aforementioned license.  The license
+# is also available online at http://www.enthought.com/licenses/BSD.txt
+#
+# Thanks for using Enthought open source!
+
+from unittest import TestCase
+
+import numpy as np
+from numpy.testing import assert_array_equal
+
+from traits.testing.unittest_tools import UnittestTools
+
+from cellular_automata.cellular_automaton import CellularAutomaton
+from cellular_automata.rules.life import LifeRule
+from ..hashlife import HashlifeEngine, HashlifeUniverse
+
+GLIDER = np.array([
+    [0, 1, 0],
+    [0, 0, 1],
+    [1, 1, 1],
+], dtype='uint8')
+
+
+def dense_steps(rule, states, n_steps):
+    states = states.copy()
+    for i in range(n_steps):
+        states = rule.step(states)
+    return states
+
+
+class TestHashlifeUniverse(TestCase, UnittestTools):
+
+    def test_matches_dense(self):
+        np.random.seed(7)
+        states = np.zeros((64, 64), dtype='uint8')
+        states[24:40, 24:40] = np.random.uniform(size=(16, 16)) < 0.4
+        rules = [
+            LifeRule(),
+            LifeRule(born_counts={3, 6}, survive_counts={2, 3}),
+            LifeRule(structure=np.array([
+                [1, 1, 0],
+                [0, 0, 1],
+                [1, 1, 1],
+            ], dtype=bool)),
+        ]
+
+        for rule in rules:
+            for n_steps in [1, 5, 16]:
+                universe = HashlifeUniverse(rule=rule)
+                universe.set_states(states)
+                universe.advance(n_steps)
+
+                expected = dense_steps(rule, states, n_steps)
+                assert_array_equal(universe.window(0, 0, (64, 64)), expected)
+                self.assertEqual(universe.generation, n_steps)
+
+    def test_glider_jump(self):
+        universe = HashlifeUniverse(rule=LifeRule())
+        universe.set_states(GLIDER)
+
+        universe.jump(12)
+
+        # a glider moves one cell diagonally every four generations
+        self.assertEqual(universe.generation, 4096)
+        self.assertEqual(universe.population, 5)
+        window = universe.window(1024, 1024, (3, 3))
+        assert_array_equal(window, GLIDER)
+
+    def test_garbage_collection(self):
+        np.random.seed(8)
+        states = (np.random.uniform(size=(32, 32)) < 0.4).astype('uint8')
+        rule = LifeRule()
+        universe = HashlifeUniverse(rule=rule, max_nodes=100)
+        universe.set_states(states)
+
+        universe.advance(30)
+
+        self.assertLessEqual(universe.n_nodes, 100 + 4 * 64)
+        expected = dense_steps(rule, np.pad(states, 40), 30)
+        assert_array_equal(universe.window(-40, -40, (112, 112)), expected)
+
+    def test_birth_on_zero(self):
+        universe = HashlifeUniverse(rule=LifeRule(born_counts={0, 3}))
+
+        with self.assertRaises(ValueError):
+            universe.set_states(GLIDER)
+
+
+class TestHashlifeEngine(TestCase, UnittestTools):
+
+    def test_run(self):
+        states = np.zeros((40, 40), dtype='uint8')
+        states[:3, :3] = GLIDER
+        rules = [LifeRule()]
+        automaton = CellularAutomaton(
+            states=states, rules=rules, engine=HashlifeEngine()
+        )
+
+        tick = automaton.tick
+
+        automaton.run(100, notify_every=17)
+
+        self.assertEqual(automaton.tick, tick + 100)
+        expected = dense_steps(rules[0], states, 100)
+        assert_array_equal(automaton.states, expected)
+
+    def test_soups_match_dense(self):
+        generator = np.random.default_rng(9)
+        rule = LifeRule()
+        for i in range(40):
+            states = (generator.random((24, 24)) < 0.35).astype('uint8')
+            automaton = CellularAutomaton(
+                states=states.copy(), rules=[rule], engine=HashlifeEngine()
+            )
+
+            automaton.run(60, notify_every=20)
+
+            assert_array_equal(automaton.states, dense_steps(rule, states, 60))
+
+    def test_pattern_near_edge(self):
+        generator = np.random.default_rng(10)
+        states = (generator.random((64, 64)) < 0.4).astype('uint8')
+        rule = LifeRule()
+        engine = HashlifeEngine()
+        automaton = CellularAutomaton(
+            states=states.copy(), rules=[rule], engine=engine
+        )
+
+        automaton.run(20)
+
+        # the soup fills the states, so it is stepped in the usual way
+        self.assertIsNone(engine.universe)
+        assert_array_equal(automaton.states, dense_steps(rule, states, 20))
+
+    def test_glider_leaving_window(self):
+        states = np.zeros((40, 40), dtype='uint8')
+        states[:3, :3] = GLIDER
+        rule = LifeRule()
+        automaton = CellularAutomaton(
+            states=states, rules=[rule], engine=HashlifeEngine()
+        )
+
+        automaton.run(200, notify_every=200)
+
+        # the glider crashes into the edge and leaves debris behind
+        assert_array_equal(automaton.states, dense_steps(rule, states, 200))
+
+    def test_cells_leaving_window_return(self):
+        states = np.zeros((8, 8), dtype='uint8')
+        states[0, 3:6] = 1
+        engine = HashlifeEngine(unbounded=True)
+        automaton = CellularAutomaton(states=states, rules=[LifeRule()],
+                                      engine=engine)
+
+        automaton.run(2, notify_every=1)
+
+        # the vertical phase of the blinker sticks out of the window
+        assert_array_equal(automaton.states, states)
+        self.assertEqual(engine.universe.generation, 2)
+
+    def test_fallback(self):
+        states = np.zeros((10, 10), dtype='uint8')
+        states[:3, :3] = GLIDER
+        rules = [LifeRule(boundary='wrap')]
+        automaton = CellularAutomaton(
+            states=states, rules=rules, engine=HashlifeEngine()
+        )
+
+        automaton.run(40)
+
+        self.assertIsNone(automaton.engine.universe)
+        assert_array_equal(automaton.states, dense_steps(rules[0], states, 40))
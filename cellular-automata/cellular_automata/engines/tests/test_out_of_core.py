@@ -0,0 +1,128 @@
+# Copyright (c) 2017, Enthought, Inc.
+# All rights reserved.
+#
+# This software is provided without warranty under the terms of the BSD
+# license included in LICENSE.txt and may be redistributed only
+# under the conditions described in the aforementioned license.  The license
+# is also available online at http://www.enthought.com/licenses/BSD.txt
+#
+# Thanks for using Enthought open source!
+
+import os
+import shutil
+import tempfile
+from unittest import TestCase, mock
+
+import numpy as np
+from numpy.testing import assert_array_equal
+
+from traits.testing.unittest_tools import UnittestTools
+
+from cellular_automata.cellular_automaton import CellularAutomaton
+from cellular_automata.rules.binary_morphology import BinaryMorphologyRule
+from cellular_automata.rules.change_state_rule import ChangeStateRule
+from cellular_automata.rules.forest import BurnGrovesRule, SlowBurnRule
+from cellular_automata.rules.life import LifeRule
+from .. import out_of_core
+from ..out_of_core import ChunkedEngine
+
+
+class TestChunkedEngine(TestCase, UnittestTools):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.engine = ChunkedEngine(chunk_rows=7, directory=self.directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_memmap_forest_matches_serial(self):
+        filename = os.path.join(self.directory, 'forest.dat')
+        states = np.memmap(filename, dtype='uint8', mode='w+', shape=(40, 30))
+        # low probabilities are sampled sparsely, which uses the random
+        # stream differently in each chunk, so only compare dense sampling
+        rules = [
+            ChangeStateRule(from_state=0, to_state=1, p_change=0.05),
+            ChangeStateRule(from_state=1, to_state=2, p_change=0.03),
+            SlowBurnRule(),
+        ]
+        serial = CellularAutomaton(shape=(40, 30), rules=rules, seed=5)
+        chunked = CellularAutomaton(
+            states=states, rules=rules, engine=self.engine,
+            double_buffered=True, seed=5,
+        )
+
+        serial.run(30)
+        chunked.run(30)
+
+        self.assertIsInstance(chunked.states, np.memmap)
+        assert_array_equal(chunked.states, serial.states)
+
+    def test_fused_deterministic_rules(self):
+        np.random.seed(6)
+        states = (np.random.uniform(size=(33, 20)) < 0.4).astype('uint8')
+        rules = [
+            LifeRule(boundary='wrap'),
+            LifeRule(boundary='wrap'),
+            BinaryMorphologyRule(operation='closing'),
+            LifeRule(boundary='reflect'),
+        ]
+
+        self.assertEqual(
+            [len(rules_pass) for rules_pass in self.engine.passes(rules)],
+            [2, 2],
+        )
+
+        serial = CellularAutomaton(states=states.copy(), rules=rules)
+        chunked = CellularAutomaton(
+            states=states.copy(), rules=rules, engine=self.engine,
+        )
+        serial.run(5)
+        chunked.run(5)
+
+        assert_array_equal(chunked.states, serial.states)
+
+    def test_passes(self):
+        grow = ChangeStateRule(p_change=0.5)
+        life = LifeRule()
+        groves = BurnGrovesRule()
+
+        passes = self.engine.passes([life, grow, life, groves, life])
+
+        self.assertEqual(passes, [[life, grow], [life], [groves], [life]])
+
+    def test_allocate(self):
+        automaton = CellularAutomaton(shape=(10, 10), engine=self.engine)
+
+        self.assertIsInstance(automaton.states, np.memmap)
+        assert_array_equal(automaton.states, 0)
+
+        automaton.reset()
+        self.assertIsInstance(automaton.states, np.memmap)
+
+    def test_buffers_reused(self):
+        np.random.seed(3)
+        states = (np.random.uniform(size=(30, 20)) < 0.4).astype('uint8')
+        rules = [LifeRule(boundary='wrap'), BurnGrovesRule(p_fire=0.0)]
+        serial = CellularAutomaton(states=states.copy(), rules=rules)
+        serial.run(20)
+
+        with mock.patch.object(
+                out_of_core.tempfile, 'TemporaryFile',
+                wraps=tempfile.TemporaryFile) as temporary_file:
+            out = np.empty_like(states)
+            self.engine.advance(rules, states, 5, out)
+            self.engine.advance(rules, out.copy(), 5, out)
+            # only the scratch buffer is allocated
+            self.assertEqual(temporary_file.call_count, 1)
+
+            chunked = CellularAutomaton(
+                states=self.engine.allocate(states.shape, states.dtype),
+                rules=rules, engine=self.engine,
+            )
+            chunked.states[...] = out
+            chunked.run(10, notify_every=1)
+            # released states arrays give their files to later arrays
+            self.assertLessEqual(temporary_file.call_count, 3)
+
+        assert_array_equal(chunked.states, serial.states)
@@ -0,0 +1,130 @@
+# Copyright (c) 2017, Enthought, Inc.
+# All rights reserved.
+#
+# This software is provided without warranty under the terms of the BSD
+# license included in LICENSE.txt and may be redistributed only
+# under the conditions described in the aforementioned license.  The license
+# is also available online at http://www.enthought.com/licenses/BSD.txt
+#
+# Thanks for using Enthought open source!
+
+from unittest import TestCase
+
+import numpy as np
+from numpy.testing import assert_array_equal
+
+from traits.testing.unittest_tools import UnittestTools
+
+from cellular_automata.bit_packing import unpack_bits
+from cellular_automata.cellular_automaton import CellularAutomaton
+from cellular_automata.rules.change_state_rule import ChangeStateRule
+from cellular_automata.rules.elementary_1d_rule import Elementary1DRule
+from ..packed_elementary import PackedElementaryEngine, algebraic_normal_form
+
+
+class TestPackedElementaryEngine(TestCase, UnittestTools):
+
+    def setUp(self):
+        self.engine = PackedElementaryEngine()
+
+    def assert_matches_serial(self, rules, states, n_steps, notify_every=None):
+        serial = CellularAutomaton(states=states.copy(), rules=rules, seed=0)
+        packed = CellularAutomaton(
+            states=states.copy(), rules=rules, engine=self.engine, seed=0,
+        )
+
+        serial.run(n_steps)
+        packed.run(n_steps, notify_every=notify_every)
+
+        assert_array_equal(packed.states, serial.states)
+
+    def test_algebraic_normal_form(self):
+        rule_90 = Elementary1DRule(rule_number=90)
+        rule_30 = Elementary1DRule(rule_number=30)
+
+        self.assertEqual(
+            algebraic_normal_form(rule_90.bit_mask), [(1,), (-1,)]
+        )
+        self.assertEqual(
+            sorted(algebraic_normal_form(rule_30.bit_mask)),
+            [(-1,), (0,), (0, 1), (1,)],
+        )
+        self.assertEqual(algebraic_normal_form([True] * 8), [()])
+        self.assertEqual(algebraic_normal_form([False] * 8), [])
+
+    def test_all_rules(self):
+        generator = np.random.default_rng(1)
+        states = (generator.random(150) < 0.5).astype('uint8')
+
+        for boundary in ['empty', 'filled', 'wrap']:
+            for rule_number in range(256):
+                rules = [Elementary1DRule(
+                    rule_number=rule_number, boundary=boundary
+                )]
+                self.assert_matches_serial(rules, states, 5)
+
+    def test_word_sizes(self):
+        generator = np.random.default_rng(2)
+        for n_cells in [1, 2, 63, 64, 65, 128]:
+            states = (generator.random(n_cells) < 0.5).astype('uint8')
+            for boundary in ['empty', 'filled', 'wrap']:
+                rules = [Elementary1DRule(rule_number=110, boundary=boundary)]
+                self.assert_matches_serial(rules, states, 20, notify_every=7)
+
+    def test_custom_states(self):
+        states = np.full(70, 5, dtype='uint8')
+        states[30:35] = 7
+        states[40] = 2
+        rules = [Elementary1DRule(
+            rule_number=30, empty_state=5, filled_state=7,
+        )]
+
+        self.assert_matches_serial(rules, states, 10)
+
+    def test_space_time(self):
+        states = np.zeros(101, dtype='uint8')
+        states[50] = 1
+        rules = [Elementary1DRule(rule_number=30, boundary='wrap')]
+        automaton = CellularAutomaton(states=states.copy(), rules=rules)
+        expected = [automaton.states.copy()]
+        for i in range(30):
+            automaton.step()
+            expected.append(automaton.states.copy())
+
+        rows = self.engine.space_time(rules, states, 30)
+
+        self.assertEqual(rows.shape, (31, 2))
+        self.assertEqual(rows.dtype, np.uint64)
+        assert_array_equal(unpack_bits(rows, 101), expected)
+        self.assertFalse(np.any(rows[:, -1] >> np.uint64(101 - 64)))
+
+    def test_space_time_unsupported(self):
+        states = np.zeros(10, dtype='uint8')
+        rules = [Elementary1DRule(boundary='reflect')]
+
+        with self.assertRaises(ValueError):
+            self.engine.space_time(rules, states, 3)
+
+    def test_fallback(self):
+        generator = np.random.default_rng(3)
+        states = (generator.random(80) < 0.5).astype('uint8')
+        rules = [
+            Elementary1DRule(rule_number=54),
+            ChangeStateRule(from_state=0, to_state=1, p_change=0.01),
+        ]
+
+        self.assertFalse(self.engine.can_pack(rules, states))
+        self.assert_matches_serial(rules, states, 5)
+
+        reflect = [Elementary1DRule(rule_number=54, boundary='reflect')]
+        self.assertFalse(self.engine.can_pack(reflect, states))
+        self.assert_matches_serial(reflect, states, 5)
+
+    def test_states_not_modified(self):
+        states = np.ones(100, dtype='uint8')
+        out = np.empty_like(states)
+
+        result = self.engine.step([Elementary1DRule()], states, out)
+
+        self.assertIs(result, out)
+        assert_array_equal(states, 1)
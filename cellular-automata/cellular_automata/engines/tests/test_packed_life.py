@@ -0,0 +1,120 @@
+# Copyright (c) 2017, Enthought, Inc.
+# All rights reserved.
+#
+# This software is provided without warranty under the terms of the BSD
+# license included in LICENSE.txt and may be redistributed only
+# under the conditions described in the aforementioned license.  The license
+# is also available online at http://www.enthought.com/licenses/BSD.txt
+#
+# Thanks for using Enthought open source!
+
+from unittest import TestCase
+
+import numpy as np
+from numpy.testing import assert_array_equal
+
+from traits.testing.unittest_tools import UnittestTools
+
+from cellular_automata.bit_packing import pack_bits, unpack_bits
+from cellular_automata.cellular_automaton import CellularAutomaton
+from cellular_automata.rules.change_state_rule import ChangeStateRule
+from cellular_automata.rules.life import LifeRule
+from ..packed_life import PackedLifeEngine
+
+
+class TestPackedLifeEngine(TestCase, UnittestTools):
+
+    def setUp(self):
+        self.engine = PackedLifeEngine()
+
+    def assert_matches_serial(self, rules, states, n_steps, notify_every=None):
+        serial = CellularAutomaton(states=states.copy(), rules=rules, seed=0)
+        packed = CellularAutomaton(
+            states=states.copy(), rules=rules, engine=self.engine, seed=0,
+        )
+
+        serial.run(n_steps)
+        packed.run(n_steps, notify_every=notify_every)
+
+        assert_array_equal(packed.states, serial.states)
+
+    def test_pack_round_trip(self):
+        np.random.seed(1)
+        mask = np.random.uniform(size=(3, 130)) < 0.5
+
+        words = pack_bits(mask)
+
+        self.assertEqual(words.shape, (3, 3))
+        self.assertEqual(words.dtype, np.uint64)
+        assert_array_equal(unpack_bits(words, 130), mask)
+
+    def test_life_boundaries(self):
+        np.random.seed(3)
+        states = (np.random.uniform(size=(23, 70)) < 0.4).astype('uint8')
+
+        for boundary in ['empty', 'filled', 'nearest', 'wrap', 'reflect']:
+            rules = [LifeRule(boundary=boundary)]
+            self.assert_matches_serial(rules, states, 10)
+
+    def test_custom_counts_and_structure(self):
+        np.random.seed(4)
+        states = (np.random.uniform(size=(30, 129)) < 0.3).astype('uint8')
+        structure = np.ones((5, 5), dtype=bool)
+        structure[2, 2] = False
+
+        for boundary in ['empty', 'wrap', 'reflect']:
+            rules = [LifeRule(
+                boundary=boundary,
+                structure=structure,
+                born_counts={6, 7, 8},
+                survive_counts={5, 6, 7, 8, 9},
+            )]
+            self.assert_matches_serial(rules, states, 8)
+
+    def test_asymmetric_structure(self):
+        np.random.seed(5)
+        states = (np.random.uniform(size=(20, 64)) < 0.4).astype('uint8')
+        structure = np.array([
+            [1, 1, 0],
+            [0, 0, 1],
+            [0, 1, 0],
+        ], dtype=bool)
+
+        rules = [LifeRule(structure=structure, born_counts={2})]
+        self.assert_matches_serial(rules, states, 8)
+
+    def test_run_notify_every(self):
+        states = np.zeros(shape=(10, 10), dtype='uint8')
+        states[1, 2] = states[2, 3] = states[3, 1:4] = 1
+        rules = [LifeRule(boundary='wrap')]
+
+        self.assert_matches_serial(rules, states, 40, notify_every=7)
+
+    def test_custom_states(self):
+        states = np.full((8, 8), 5, dtype='uint8')
+        states[3, 2:5] = 7
+        rules = [LifeRule(live_state=7, dead_state=5)]
+
+        self.assert_matches_serial(rules, states, 3)
+
+    def test_fallback(self):
+        np.random.seed(6)
+        states = (np.random.uniform(size=(12, 12)) < 0.4).astype('uint8')
+        states[0, 0] = 2
+        rules = [
+            LifeRule(),
+            ChangeStateRule(from_state=0, to_state=1, p_change=0.01),
+        ]
+
+        self.assertFalse(self.engine.can_pack(rules[:1], states))
+        self.assert_matches_serial(rules, states, 5)
+        self.assert_matches_serial(rules[:1], states, 5)
+
+    def test_states_not_modified(self):
+        states = np.ones(shape=(10, 10), dtype='uint8')
+        out = np.empty_like(states)
+
+        result = self.engine.step([LifeRule()], states, out)
+
+        self.assertIs(result, out)
+        assert_array_equal(states, 1)
@@ -0,0 +1,163 @@
+# Copyright (c) 2017, Enthought, Inc.
+# All rights reserved.
+#
+# This software is provided without warranty under the terms of the BSD
+# license included in LICENSE.txt and may be redistributed only
+# under the conditions described in the aforementioned license.  The license
+# is also available online at http://www.enthought.com/licenses/BSD.txt
+#
+# Thanks for using Enthought open source!
+
+import pickle
+from unittest import TestCase, mock
+
+import numpy as np
+from numpy.testing import assert_array_equal
+
+from traits.testing.unittest_tools import UnittestTools
+
+from cellular_automata.cellular_automaton import CellularAutomaton
+from cellular_automata.rules.active_region import ActiveRegionRule
+from cellular_automata.rules.change_state_rule import ChangeStateRule
+from cellular_automata.rules.forest import BurnGrovesRule, SlowBurnRule
+from cellular_automata.rules.life import LifeRule
+from .. import shared_memory
+from ..shared_memory import SharedMemoryEngine
+
+
+class UnpicklableRule(LifeRule):
+    """ A rule which can't be unpickled by the workers. """
+
+    def __setstate__(self, state):
+        raise RuntimeError("Can't unpickle this rule.")
+
+
+class TestSharedMemoryEngine(TestCase, UnittestTools):
+
+    def test_deterministic_matches_serial(self):
+        np.random.seed(4)
+        states = (np.random.uniform(size=(30, 20)) < 0.4).astype('uint8')
+        rules = [LifeRule(boundary='wrap'), SlowBurnRule()]
+        engine = SharedMemoryEngine(n_workers=3)
+        self.addCleanup(engine.shutdown)
+
+        serial = CellularAutomaton(states=states.copy(), rules=rules)
+        distributed = CellularAutomaton(
+            states=states.copy(), rules=rules, engine=engine,
+        )
+        serial.run(10)
+        distributed.run(10)
+
+        assert_array_equal(distributed.states, serial.states)
+
+        # changing a rule is seen by the workers
+        rules[0].boundary = 'empty'
+        serial.run(5)
+        distributed.run(5)
+
+        assert_array_equal(distributed.states, serial.states)
+
+    def test_stochastic_reproducible(self):
+        rules = [
+            ChangeStateRule(from_state=0, to_state=1, p_change=0.1),
+            BurnGrovesRule(p_fire=0.01),
+            ChangeStateRule(from_state=2, to_state=0),
+        ]
+        results = []
+        for i in range(2):
+            engine = SharedMemoryEngine(n_workers=2)
+            self.addCleanup(engine.shutdown)
+            automaton = CellularAutomaton(
+                shape=(16, 16), rules=rules, engine=engine, seed=12345,
+            )
+            automaton.start()
+            automaton.run(20)
+            results.append(automaton.states)
+
+        assert_array_equal(results[0], results[1])
+        self.assertTrue(np.any(results[0] == 1))
+
+    def test_check_states(self):
+        engine = SharedMemoryEngine(n_workers=2)
+        self.addCleanup(engine.shutdown)
+        states = np.zeros(shape=(8, 8), dtype='uint8')
+
+        with self.assertRaises(ValueError):
+            engine.step([LifeRule()], np.zeros(8, dtype='uint8'), states[0])
+
+    def test_allocated_and_plain_arrays(self):
+        np.random.seed(5)
+        states = (np.random.uniform(size=(24, 24)) < 0.4).astype('uint8')
+        rules = [LifeRule(boundary='wrap')]
+        engine = SharedMemoryEngine(n_workers=3)
+        self.addCleanup(engine.shutdown)
+        serial = CellularAutomaton(states=states.copy(), rules=rules)
+        serial.run(6)
+
+        shared_states = engine.allocate(states.shape, states.dtype)
+        shared_states[...] = states
+        shared_out = engine.allocate(states.shape, states.dtype)
+        plain_out = np.empty_like(states)
+
+        for source, out in [(states, plain_out), (shared_states, shared_out),
+                            (states, shared_out), (shared_states, plain_out)]:
+            out.fill(0)
+            result = engine.advance(rules, source, 6, out)
+
+            self.assertIs(result, out)
+            assert_array_equal(out, serial.states)
+        assert_array_equal(shared_states, states)
+
+    def test_rules_only_sent_when_changed(self):
+        np.random.seed(6)
+        states = (np.random.uniform(size=(20, 20)) < 0.4).astype('uint8')
+        rules = [ActiveRegionRule(rule=LifeRule(), tile_size=4)]
+        serial_rules = [ActiveRegionRule(rule=LifeRule(), tile_size=4)]
+        engine = SharedMemoryEngine(n_workers=2)
+        self.addCleanup(engine.shutdown)
+        serial = CellularAutomaton(states=states.copy(), rules=serial_rules)
+        distributed = CellularAutomaton(
+            states=states.copy(), rules=rules, engine=engine,
+        )
+
+        with mock.patch.object(
+                shared_memory.pickle, 'dumps', wraps=pickle.dumps) as dumps:
+            distributed.run(4)
+            distributed.run(4)
+            self.assertEqual(dumps.call_count, 1)
+
+            # a change to a wrapped rule is seen by the workers
+            rules[0].rule.boundary = 'wrap'
+            distributed.run(4)
+            self.assertEqual(dumps.call_count, 2)
+
+        serial.run(8)
+        serial_rules[0].rule.boundary = 'wrap'
+        serial_rules[0].reset()
+        serial.run(4)
+        assert_array_equal(distributed.states, serial.states)
+
+    def test_outputs_copied_back(self):
+        states = np.zeros((12, 12), dtype='uint8')
+        states[1:3, 1:4] = 1
+        states[6:11, 8] = 1
+        states[10, 0] = 1
+        rule = BurnGrovesRule(p_fire=1.0)
+        engine = SharedMemoryEngine(n_workers=3)
+        self.addCleanup(engine.shutdown)
+
+        engine.step([rule], states, np.empty_like(states))
+
+        self.assertEqual(sorted(rule.burnt_grove_sizes), [1, 5, 6])
+
+    def test_rule_unpickling_error(self):
+        states = np.zeros((12, 12), dtype='uint8')
+        engine = SharedMemoryEngine(n_workers=3)
+        self.addCleanup(engine.shutdown)
+
+        with self.assertRaises(RuntimeError):
+            engine.step([UnpicklableRule()], states, np.empty_like(states))
+
+        # the engine restarts its workers for the next step
+        out = engine.step([LifeRule()], states, np.empty_like(states))
+        assert_array_equal(out, 0)
@@ -0,0 +1,120 @@
+# Copyright (c) 2017, Enthought, Inc.
+# All rights reserved.
+#
+# This software is provided without warranty under the terms of the BSD
+# license included in LICENSE.txt and may be redistributed only
+# under the conditions described in the aforementioned license.  The license
+# is also available online at http://www.enthought.com/licenses/BSD.txt
+#
+# Thanks for using Enthought open source!
+
+from unittest import TestCase
+
+import numpy as np
+from numpy.testing import assert_array_equal
+
+from traits.testing.unittest_tools import UnittestTools
+
+from cellular_automata.cellular_automaton import CellularAutomaton
+from cellular_automata.rules.binary_morphology import BinaryMorphologyRule
+from cellular_automata.rules.change_state_rule import ChangeStateRule
+from cellular_automata.rules.elementary_1d_rule import Elementary1DRule
+from cellular_automata.rules.forest import SlowBurnRule
+from cellular_automata.rules.life import LifeRule
+from ..threaded import ThreadedEngine
+
+
+class TestThreadedEngine(TestCase, UnittestTools):
+
+    def setUp(self):
+        self.engine = ThreadedEngine(n_threads=3, n_bands=5)
+
+    def tearDown(self):
+        self.engine.shutdown()
+
+    def assert_matches_serial(self, rules, states, n_steps, **traits):
+        serial = CellularAutomaton(states=states.copy(), rules=rules)
+        threaded = CellularAutomaton(
+            states=states.copy(), rules=rules, engine=self.engine, **traits
+        )
+
+        serial.run(n_steps)
+        threaded.run(n_steps)
+
+        assert_array_equal(threaded.states, serial.states)
+
+    def assert_reproducible(self, rules, states, n_steps, seed, **traits):
+        results = []
+        for i in range(2):
+            automaton = CellularAutomaton(
+                states=states.copy(), rules=rules, engine=self.engine,
+                seed=seed, **traits
+            )
+            automaton.run(n_steps)
+            results.append(automaton.states)
+
+        assert_array_equal(results[0], results[1])
+
+    def test_life_boundaries(self):
+        np.random.seed(3)
+        states = (np.random.uniform(size=(23, 17)) < 0.4).astype('uint8')
+
+        for boundary in ['empty', 'filled', 'nearest', 'wrap', 'reflect']:
+            rules = [LifeRule(boundary=boundary)]
+            self.assert_matches_serial(rules, states, 10)
+
+    def test_incremental_counts(self):
+        engine = ThreadedEngine(n_threads=8, n_bands=8)
+        self.addCleanup(engine.shutdown)
+        # few live cells, so the counts of one band are updated from the
+        # previous counts of another
+        np.random.seed(1)
+        states = (np.random.uniform(size=(512, 512)) < 0.01).astype('uint8')
+        serial = CellularAutomaton(
+            states=states.copy(), rules=[LifeRule(incremental=True)]
+        )
+        threaded = CellularAutomaton(
+            states=states.copy(), rules=[LifeRule(incremental=True)],
+            engine=engine,
+        )
+
+        for i in range(5):
+            serial.run(10)
+            threaded.run(10)
+
+            assert_array_equal(threaded.states, serial.states)
+
+    def test_mixed_rules(self):
+        states = np.zeros(shape=(40, 40), dtype='uint8')
+        rules = [
+            ChangeStateRule(from_state=0, to_state=1, p_change=0.05),
+            ChangeStateRule(from_state=1, to_state=2, p_change=1e-3),
+            SlowBurnRule(),
+            BinaryMorphologyRule(
+                foreground_state=1, operation='opening',
+                structure=np.ones((5, 5), dtype=bool),
+            ),
+        ]
+
+        # stochastic bands draw from their own streams, so the results
+        # differ from serial execution but are reproducible for a seed
+        self.assert_reproducible(rules, states, 30, seed=0)
+        self.assert_reproducible(
+            rules, states, 30, seed=1, double_buffered=True
+        )
+
+    def test_elementary_1d_wrap(self):
+        states = np.zeros(shape=31, dtype='uint8')
+        states[0] = 1
+        rules = [Elementary1DRule(rule_number=110, boundary='wrap')]
+
+        self.assert_matches_serial(rules, states, 20)
+
+    def test_states_not_modified(self):
+        states = np.ones(shape=(10, 10), dtype='uint8')
+        out = np.empty_like(states)
+
+        result = self.engine.step([LifeRule()], states, out)
+
+        self.assertIs(result, out)
+        assert_array_equal(states, 1)
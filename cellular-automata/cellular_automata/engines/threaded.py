@@ -0,0 +1,178 @@
+# Copyright (c) 2017, Enthought, Inc.
+# All rights reserved.
+#
+# This software is provided without warranty under the terms of the BSD
+# license included in LICENSE.txt and may be redistributed only
+# under the conditions described in the aforementioned license.  The license
+# is also available online at http://www.enthought.com/licenses/BSD.txt
+#
+# Thanks for using Enthought open source!
+"""
+This module provides an engine which applies rules to bands of the states
+array in parallel using a pool of threads.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import multiprocessing
+
+import numpy as np
+from traits.api import Any, Int
+
+from cellular_automata.abstract_engine import AbstractEngine
+from cellular_automata.tiling import band_regions, padded_block, rule_wraps
+
+
+class ThreadedEngine(AbstractEngine):
+    """ An engine which applies each rule to bands of rows in parallel.
+
+    Local rules are applied to bands of rows, each padded with a halo of
+    rows wide enough for the rule, on a pool of threads.  The NumPy and
+    SciPy operations used by the rules release the GIL, so the bands are
+    computed concurrently.  For deterministic rules the results are
+    identical to applying the rules serially, including the behaviour at
+    the boundaries.
+
+    Stochastic local rules draw the random numbers for each band from a
+    separate child stream of the rule's generator, so the random numbers are
+    also generated concurrently.  The results are reproducible for a given
+    seed and number of bands, but differ from serial execution.
+
+    Rules which are not local are applied to the whole states array in the
+    calling thread.
+    """
+
+    # ThreadedEngine Traits --------------------------------------------------
+
+    #: The number of threads to use.
+    n_threads = Int
+
+    #: The number of bands to split the states into.  If this is zero, one
+    #: band is used per thread.
+    n_bands = Int(0)
+
+    # Private Traits ---------------------------------------------------------
+
+    #: The thread pool.
+    _executor = Any
+
+    #: A scratch states buffer.
+    _scratch = Any
+
+    # ------------------------------------------------------------------------
+    # AbstractEngine interface
+    # ------------------------------------------------------------------------
+
+    def step(self, rules, states, out):
+        """ Apply each of the rules in turn for a single tick.
+
+        Parameters
+        ----------
+        rules : list of AbstractRule
+            The rules to apply, in order.
+        states : array
+            An array holding the current states of the automaton.  This is
+            not modified.
+        out : array
+            An array of the same shape and dtype as states which will hold
+            the new states.
+
+        Returns
+        -------
+        out : array
+            The output array holding the new states of the automaton.
+        """
+        scratch = self._scratch
+        if scratch is None or scratch.shape != states.shape:
+            scratch = self._scratch = np.empty_like(states)
+
+        current = states
+        for rule in rules:
+            target = scratch if current is out else out
+            if rule.halo is None:
+                if rule.in_place and current is not states:
+                    result = rule.step(current)
+                    if result is not current:
+                        np.copyto(current, result)
+                    continue
+                rule.step_into(current, target)
+            else:
+                self.step_bands(rule, current, target)
+            current = target
+
+        if current is not out:
+            np.copyto(out, current)
+        return out
+
+    # ------------------------------------------------------------------------
+    # ThreadedEngine interface
+    # ------------------------------------------------------------------------
+
+    def step_bands(self, rule, states, out):
+        """ Apply a local rule to bands of the states in parallel.
+
+        Parameters
+        ----------
+        rule : AbstractRule
+            A rule with a finite halo.
+        states : array
+            An array holding the current states of the automaton.  This is
+            not modified.
+        out : array
+            An array of the same shape and dtype as states which will hold
+            the new states.
+
+        Returns
+        -------
+        out : array
+            The output array holding the new states of the automaton.
+        """
+        rule.check_states(states)
+        halo = rule.halo
+        wrap = rule_wraps(rule)
+
+        def step_band(region, band_rule):
+            block, inner = padded_block(states, region, halo, wrap)
+            result = band_rule.step(np.array(block))
+            out[region] = result[inner]
+
+        n_bands = self.n_bands if self.n_bands > 0 else self.n_threads
+        regions = band_regions(states.shape, n_bands)
+        if rule.stochastic:
+            band_rules = [
+                rule.clone_with_generator(generator)
+                for generator in rule.child_generators(len(regions))
+            ]
+        else:
+            band_rules = [rule] * len(regions)
+
+        if len(regions) == 1:
+            step_band(regions[0], band_rules[0])
+        else:
+            # consume the iterator so that exceptions are raised
+            list(self._get_executor().map(step_band, regions, band_rules))
+        return out
+
+    def shutdown(self):
+        """ Shut down the thread pool. """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    # ------------------------------------------------------------------------
+    # Private interface
+    # ------------------------------------------------------------------------
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.n_threads)
+        return self._executor
+
+    # Trait change handlers --------------------------------------------------
+
+    def _n_threads_changed(self):
+        self.shutdown()
+
+    # Trait defaults ---------------------------------------------------------
+
+    def _n_threads_default(self):
+        return multiprocessing.cpu_count()
@@ -0,0 +1,96 @@
+# Copyright (c) 2017, Enthought, Inc.
+# All rights reserved.
+#
+# This software is provided without warranty under the terms of the BSD
+# license included in LICENSE.txt and may be redistributed only
+# under the conditions described in the aforementioned license.  The license
+# is also available online at http://www.enthought.com/licenses/BSD.txt
+#
+# Thanks for using Enthought open source!
+
+"""
+This module contains a cellular automaton class which simulates an ensemble
+of independent replicas at once.
+"""
+import numpy as np
+from traits.api import Int, Property, Tuple
+
+from .cellular_automaton import CellularAutomaton
+
+
+class EnsembleAutomaton(CellularAutomaton):
+    """ A cellular automaton which evolves many independent replicas at once.
+
+    The states of the replicas are held in a single array with the replicas
+    stacked along the first axis, so the states array has shape
+    ``(n_replicas,) + replica_shape``.  Rules are applied to every replica
+    in one call via their :py:meth:`step_ensemble` method, and rule
+    parameters such as probabilities may hold one value per replica, which
+    makes parameter sweeps a handful of large array operations.
+
+    Initializers are applied to each replica separately.
+    """
+
+    #: The number of replicas in the ensemble.
+    n_replicas = Property(Int, depends_on='states')
+
+    #: The shape of the states of each replica.
+    replica_shape = Property(Tuple, depends_on='states')
+
+    # ------------------------------------------------------------------------
+    # CellularAutomata interface
+    # ------------------------------------------------------------------------
+
+    def start(self):
+        """ Create the initial states of each replica. """
+        if self.tick != -1:
+            raise ValueError("Automaton has already started")
+
+        self._assign_generators()
+        states = self.states
+        for replica in states:
+            for initializer in self.initializers:
+                result = initializer.initialize_states(replica)
+                if result is not replica:
+                    replica[...] = result
+
+        self.states = states
+        self.tick = 0
+
+    # ------------------------------------------------------------------------
+    # Private interface
+    # ------------------------------------------------------------------------
+
+    def _advance(self, states, n_ticks=1):
+        """ Apply all the rules to every replica, returning the new states. """
+        for i in range(n_ticks):
+            if self.double_buffered:
+                new_states = self._spare_buffer(states)
+                np.copyto(new_states, states)
+                self._spare_states = states
+            else:
+                new_states = states.copy()
+
+            for rule in self.plan:
+                rule.step_ensemble(new_states)
+            states = new_states
+        return states
+
+    def __init__(self, **traits):
+        n_replicas = traits.pop('n_replicas', None)
+        replica_shape = traits.pop('replica_shape', None)
+        if n_replicas is not None and replica_shape is not None:
+            shape = (n_replicas,) + tuple(replica_shape)
+            traits.setdefault('shape', shape)
+        elif n_replicas is not None or replica_shape is not None:
+            msg = "Must specify both n_replicas and replica_shape"
+            raise ValueError(msg)
+        super(EnsembleAutomaton, self).__init__(**traits)
+
+    # Trait properties -------------------------------------------------------
+
+    def _get_n_replicas(self):
+        return self.states.shape[0]
+
+    def _get_replica_shape(self):
+        return self.states.shape[1:]
@@ -37,7 +37,9 @@ class RandomChoice(AbstractInitializer):
         states : array
             The initialized array.
         """
-        states[:] = self.random_variable.rvs(size=states.shape)
+        states[:] = self.random_variable.rvs(
+            size=states.shape, random_state=self.generator
+        )
         return states
 
     @classmethod
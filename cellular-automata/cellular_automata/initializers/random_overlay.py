@@ -8,8 +8,6 @@
 #
 # Thanks for using Enthought open source!
 
-import numpy as np
-
 from cellular_automata.abstract_initializer import AbstractInitializer
 from cellular_automata.automata_traits import Probability, StateValue
 
@@ -35,6 +33,6 @@ class RandomOverlay(AbstractInitializer):
         states : array
             The states after having been modified by the initializer.
         """
-        overlaid_mask = (np.random.uniform(states.shape) < self.p_value)
+        overlaid_mask = (self.generator.random(states.shape) < self.p_value)
         states[overlaid_mask] = self.overlay_value
         return states
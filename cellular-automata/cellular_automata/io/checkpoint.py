@@ -0,0 +1,113 @@
+# Copyright (c) 2017, Enthought, Inc.
+# All rights reserved.
+#
+# This software is provided without warranty under the terms of the BSD
+# license included in LICENSE.txt and may be redistributed only
+# under the conditions described in the aforementioned license.  The license
+# is also available online at http://www.enthought.com/licenses/BSD.txt
+#
+# Thanks for using Enthought open source!
+"""
+This module provides functions for saving the full state of a cellular
+automaton to a compressed checkpoint file and restoring it later, so that
+long simulations can be resumed part way through.
+
+A checkpoint is a compressed NumPy ``.npz`` archive holding the states, the
+tick, and a pickled dictionary of the rest of the automaton's configuration,
+such as its rules, initializers and random streams.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import os
+import pickle
+
+import numpy as np
+
+#: The version of the checkpoint file format.
+CHECKPOINT_VERSION = 1
+
+#: The executor used to write checkpoints in the background.  A single
+#: worker ensures that checkpoints are written in the order requested.
+_writer = None
+
+
+def save_checkpoint(path, states, tick, config, background=False):
+    """ Save the state of an automaton to a checkpoint file.
+
+    The states are copied and the configuration is pickled immediately, so
+    the automaton can carry on running while the checkpoint is compressed
+    and written in the background.  The file is written under a temporary
+    name and then renamed, so an interrupted write never leaves a truncated
+    checkpoint at the path.
+
+    Parameters
+    ----------
+    path : str
+        The path of the checkpoint file.
+    states : array
+        The states of the automaton.
+    tick : int
+        The tick of the automaton.
+    config : dict
+        Any other picklable state needed to restore the automaton.
+    background : bool
+        Whether to write the file in a background thread.
+
+    Returns
+    -------
+    future : Future or None
+        If writing in the background, a future which completes when the file
+        has been written, otherwise None.
+    """
+    arrays = {
+        'version': np.array(CHECKPOINT_VERSION),
+        'states': np.array(states),
+        'tick': np.array(tick),
+        'config': _pickled(config),
+    }
+
+    if background:
+        global _writer
+        if _writer is None:
+            _writer = ThreadPoolExecutor(max_workers=1)
+        return _writer.submit(_write_checkpoint, path, arrays)
+    _write_checkpoint(path, arrays)
+
+
+def load_checkpoint(path):
+    """ Load the contents of a checkpoint file.
+
+    Parameters
+    ----------
+    path : str
+        The path of the checkpoint file.
+
+    Returns
+    -------
+    checkpoint : dict
+        The saved configuration dictionary, together with the 'states' and
+        'tick' from the checkpoint.
+    """
+    with np.load(path, allow_pickle=False) as archive:
+        version = int(archive['version'])
+        if version > CHECKPOINT_VERSION:
+            msg = "Checkpoint version {} is newer than supported version {}."
+            raise ValueError(msg.format(version, CHECKPOINT_VERSION))
+        checkpoint = pickle.loads(archive['config'].tobytes())
+        checkpoint['states'] = archive['states']
+        checkpoint['tick'] = int(archive['tick'])
+    return checkpoint
+
+
+def _pickled(value):
+    """ Pickle a value into an array of bytes. """
+    return np.frombuffer(pickle.dumps(value), dtype=np.uint8)
+
+
+def _write_checkpoint(path, arrays):
+    """ Write checkpoint arrays to a temporary file and move it into place.
+    """
+    temporary_path = os.fspath(path) + '.tmp'
+    with open(temporary_path, 'wb') as checkpoint_file:
+        np.savez_compressed(checkpoint_file, **arrays)
+    os.replace(temporary_path, path)
@@ -0,0 +1,69 @@
+# Copyright (c) 2017, Enthought, Inc.
+# All rights reserved.
+#
+# This software is provided without warranty under the terms of the BSD
+# license included in LICENSE.txt and may be redistributed only
+# under the conditions described in the aforementioned license.  The license
+# is also available online at http://www.enthought.com/licenses/BSD.txt
+#
+# Thanks for using Enthought open source!
+"""
+This module provides a function which advances an automaton by many ticks,
+jumping straight to the final states when its rules allow it.
+"""
+
+from .rules.elementary_1d_rule import Elementary1DRule
+
+
+def can_jump(automaton):
+    """ Whether an automaton's rules can jump ahead.
+
+    Parameters
+    ----------
+    automaton : CellularAutomaton
+        The automaton.
+
+    Returns
+    -------
+    can_jump : bool
+        True if the only rule is an additive :py:class:`Elementary1DRule`
+        with a boundary mode that allows it to jump ahead.
+    """
+    plan = automaton.plan
+    return (
+        len(plan) == 1 and isinstance(plan[0], Elementary1DRule) and
+        plan[0].can_jump and automaton.states.ndim == 1
+    )
+
+
+def advance(automaton, n_ticks):
+    """ Advance an automaton by some ticks.
+
+    If the automaton's rules can jump ahead, the final states are computed
+    directly in a number of steps which grows with the logarithm of the
+    number of ticks.  Otherwise this is the same as calling
+    :py:meth:`CellularAutomaton.run`.  Either way, the :py:attr:`states`
+    and :py:attr:`tick` are only updated at the end.
+
+    Parameters
+    ----------
+    automaton : CellularAutomaton
+        The automaton to advance.
+    n_ticks : int
+        The number of ticks to advance.
+
+    Raises
+    ------
+    ValueError
+        If the number of ticks is negative.
+    """
+    if n_ticks < 0:
+        msg = "Can't advance by a negative number of ticks: {}."
+        raise ValueError(msg.format(n_ticks))
+    if not can_jump(automaton):
+        automaton.run(n_ticks)
+        return
+
+    rule = automaton.plan[0]
+    automaton.states = rule.jump(automaton.states, n_ticks)
+    automaton.tick += n_ticks
@@ -0,0 +1,257 @@
+# Copyright (c) 2017, Enthought, Inc.
+# All rights reserved.
+#
+# This software is provided without warranty under the terms of the BSD
+# license included in LICENSE.txt and may be redistributed only
+# under the conditions described in the aforementioned license.  The license
+# is also available online at http://www.enthought.com/licenses/BSD.txt
+#
+# Thanks for using Enthought open source!
+"""
+This module provides a survey which runs many elementary 1D rules from the
+same initial line at once, for classifying the rule space.
+"""
+
+import numpy as np
+from traits.api import (
+    Array, Bool, Dict, Enum, HasStrictTraits, Int, Property, Range,
+    Tuple, cached_property
+)
+
+from .rules.elementary_1d_rule import Elementary1DRule, neighbourhood_index
+
+#: Boundary modes which are unchanged by complementing the cells.
+COMPLEMENT_BOUNDARIES = {'nearest', 'wrap', 'reflect'}
+
+
+def equivalence_classes(rule_numbers, complement=True):
+    """ Group elementary rules which are equivalent under symmetries.
+
+    A rule is equivalent to its reflection, which is the same rule seen in a
+    mirror, and to its complement, which swaps the roles of empty and filled
+    cells.
+
+    Parameters
+    ----------
+    rule_numbers : sequence of int
+        The rules to group.
+    complement : bool
+        Whether rules are equivalent to their complements as well as their
+        reflections.
+
+    Returns
+    -------
+    classes : dict
+        Map from each rule number to a tuple of ``(representative,
+        reflected, complemented)``, where the representative is the smallest
+        rule number in the class, and the rule is obtained by reflecting
+        and/or complementing the representative as given by the flags.
+    """
+    classes = {}
+    for rule_number in rule_numbers:
+        rule_number = int(rule_number)
+        orbit = []
+        for reflected in [False, True]:
+            for complemented in [False, True]:
+                if complemented and not complement:
+                    continue
+                rule = Elementary1DRule(rule_number=rule_number)
+                if reflected:
+                    rule.reflect()
+                if complemented:
+                    rule.complement()
+                orbit.append((rule.rule_number, reflected, complemented))
+        # the transforms are their own inverses, so the transform which
+        # takes the rule to the representative also takes it back
+        classes[rule_number] = min(orbit)
+    return classes
+
+
+class RuleSurvey(HasStrictTraits):
+    """ Run many elementary 1D rules from the same initial line.
+
+    The lines for every rule are stacked into a single ``(n_rules, size)``
+    array, and each tick the neighbourhood index of every cell is computed
+    once and the new cells are read from the bits of each row's rule number
+    in one vectorized operation.
+
+    When :py:attr:`collapse` is True, :py:meth:`statistics` runs only the
+    representative of each class of equivalent rules, once, and reports its
+    statistics for every rule in the class.  A rule obtained by reflecting
+    and/or complementing its representative evolves exactly like the
+    representative run from the correspondingly reflected and/or
+    complemented line, with the results transformed back, so each rule's
+    statistics are those of its evolution from the transformed initial
+    line rather than from the initial line itself.  This is the same
+    distribution of statistics over random initial lines, for a third of
+    the work.  Rules are only collapsed with their complements for
+    boundary modes which treat empty and filled cells alike.
+    :py:meth:`space_time` always runs every rule exactly.
+    """
+
+    #: The rules to survey.
+    rule_numbers = Array(dtype='uint8', shape=(None,), value=np.arange(256))
+
+    #: The boundary mode to use, as for :py:class:`Elementary1DRule`.
+    boundary = Enum('wrap', 'empty', 'filled', 'nearest', 'reflect')
+
+    #: Whether :py:meth:`statistics` runs only the representatives of
+    #: classes of equivalent rules, reporting each representative's
+    #: evolution for every rule in its class.
+    collapse = Bool(False)
+
+    #: The length of the blocks of cells whose distribution gives the
+    #: entropy statistic.
+    block_size = Range(1, 8, 3)
+
+    #: Map from each rule number to its representative and the transforms
+    #: from the representative to the rule.
+    classes = Property(
+        Dict(Int, Tuple(Int, Bool, Bool)),
+        depends_on='rule_numbers, boundary, collapse',
+    )
+
+    #: The representatives of the classes of the surveyed rules.
+    representatives = Property(
+        Array(dtype='uint8'), depends_on='classes'
+    )
+
+    # ------------------------------------------------------------------------
+    # RuleSurvey interface
+    # ------------------------------------------------------------------------
+
+    def space_time(self, states, n_ticks):
+        """ The space-time diagram of each rule.
+
+        Parameters
+        ----------
+        states : array
+            A 1D array of the initial line, where non-zero cells are filled.
+        n_ticks : int
+            The number of ticks to run.
+
+        Returns
+        -------
+        diagrams : array of bool
+            An array of shape ``(n_rules, n_ticks + 1, size)`` holding the
+            filled cells of each rule's line at each tick, starting with the
+            initial line.
+        """
+        rule_numbers = self.rule_numbers
+        line = self._initial_line(states)
+        lines = np.repeat(line[np.newaxis], len(rule_numbers), axis=0)
+        diagrams = np.empty(
+            (len(rule_numbers), n_ticks + 1, len(line)), dtype=bool
+        )
+        diagrams[:, 0] = lines
+        for tick in range(1, n_ticks + 1):
+            lines = self._step(lines, rule_numbers)
+            diagrams[:, tick] = lines
+        return diagrams
+
+    def statistics(self, states, n_ticks):
+        """ Summary statistics of each rule at each tick.
+
+        This doesn't store the space-time diagrams, so it can survey long
+        runs of long lines.
+
+        Parameters
+        ----------
+        states : array
+            A 1D array of the initial line, where non-zero cells are filled.
+        n_ticks : int
+            The number of ticks to run.
+
+        Returns
+        -------
+        statistics : dict of arrays
+            Arrays of shape ``(n_rules, n_ticks + 1)`` holding the
+            'density' of filled cells, and the 'entropy' in bits per cell of
+            the distribution of blocks of :py:attr:`block_size` adjacent
+            cells within the line.  When :py:attr:`collapse` is True, the
+            statistics of each rule are those of its evolution from the
+            initial line reflected and/or complemented as in
+            :py:attr:`classes`.
+        """
+        line = self._initial_line(states)
+        run_rules = self.representatives
+        run_index = {rule: row for row, rule in enumerate(run_rules.tolist())}
+        rows = []
+        complemented = []
+        for rule_number in self.rule_numbers.tolist():
+            representative, _, complement = self.classes[rule_number]
+            rows.append(run_index[representative])
+            complemented.append(complement)
+        complemented = np.array(complemented, dtype=bool)
+
+        lines = np.repeat(line[np.newaxis], len(run_rules), axis=0)
+        density = np.empty((len(run_rules), n_ticks + 1))
+        entropy = np.empty((len(run_rules), n_ticks + 1))
+        for tick in range(n_ticks + 1):
+            if tick > 0:
+                lines = self._step(lines, run_rules)
+            density[:, tick] = lines.mean(axis=-1)
+            entropy[:, tick] = self._block_entropy(lines)
+
+        # complementing a rule and its initial line complements its lines
+        density = density[rows]
+        density[complemented] = 1.0 - density[complemented]
+        # reversing or complementing blocks permutes them, so the entropy
+        # is unchanged
+        return {'density': density, 'entropy': entropy[rows]}
+
+    # ------------------------------------------------------------------------
+    # Private interface
+    # ------------------------------------------------------------------------
+
+    def _initial_line(self, states):
+        """ The filled cells of a 1D initial line. """
+        states = np.asarray(states)
+        if states.ndim != 1:
+            msg = "Survey states must be 1-dimensional, not {}-dimensional."
+            raise ValueError(msg.format(states.ndim))
+        return states != 0
+
+    def _step(self, lines, rule_numbers):
+        """ Advance each line with its own rule by one tick. """
+        index = neighbourhood_index(lines, self.boundary)
+        np.right_shift(rule_numbers[:, np.newaxis], index, out=index)
+        index &= 1
+        return index.view(bool)
+
+    def _block_entropy(self, lines):
+        """ The entropy of the blocks of cells in each line. """
+        k = self.block_size
+        n_rules, size = lines.shape
+        n_blocks = size - k + 1
+        if n_blocks < 1:
+            return np.zeros(n_rules)
+
+        blocks = np.zeros((n_rules, n_blocks), dtype=np.intp)
+        for i in range(k):
+            blocks <<= 1
+            blocks |= lines[:, i:i + n_blocks]
+        blocks += np.arange(n_rules)[:, np.newaxis] << k
+        counts = np.bincount(blocks.ravel(), minlength=n_rules << k)
+        p = counts.reshape(n_rules, 1 << k) / n_blocks
+        with np.errstate(divide='ignore', invalid='ignore'):
+            terms = np.where(p > 0, -p * np.log2(p), 0.0)
+        return terms.sum(axis=-1) / k
+
+    # Trait properties -------------------------------------------------------
+
+    @cached_property
+    def _get_classes(self):
+        if not self.collapse:
+            return {
+                int(rule): (int(rule), False, False)
+                for rule in self.rule_numbers
+            }
+        complement = self.boundary in COMPLEMENT_BOUNDARIES
+        return equivalence_classes(self.rule_numbers, complement)
+
+    @cached_property
+    def _get_representatives(self):
+        representatives = {entry[0] for entry in self.classes.values()}
+        return np.array(sorted(representatives), dtype='uint8')
+
@@ -0,0 +1,206 @@
+# Copyright (c) 2017, Enthought, Inc.
+# All rights reserved.
+#
+# This software is provided without warranty under the terms of the BSD
+# license included in LICENSE.txt and may be redistributed only
+# under the conditions described in the aforementioned license.  The license
+# is also available online at http://www.enthought.com/licenses/BSD.txt
+#
+# Thanks for using Enthought open source!
+"""
+This module provides a rule which applies a deterministic local rule only to
+the parts of the states which may change.
+"""
+
+import numpy as np
+from scipy import ndimage
+
+from traits.api import (
+    Any, Constant, Instance, Int, Range, on_trait_change
+)
+
+from cellular_automata.abstract_rule import AbstractRule
+from cellular_automata.tiling import (
+    padded_block, reduce_tiles, rule_wraps, tile_grid_shape, tile_region
+)
+
+
+class ActiveRegionRule(AbstractRule):
+    """ Apply a deterministic local rule only where the states are changing.
+
+    The states are divided into square tiles.  A tile is dirty if any of its
+    cells differ from the result of the previous step, either because the
+    wrapped rule changed them or because some other rule did.  If no tile
+    within reach of a tile is dirty, then applying the rule cannot change
+    the tile, and so the rule is only applied to dirty tiles and their
+    neighbours, each padded with a halo from the surrounding states.
+
+    This gives large speed-ups when most of the states are static, such as
+    sparse Life soups or forest fires which have mostly burnt out.
+
+    The wrapped rule must be deterministic and have a finite
+    :py:attr:`halo`.
+    """
+
+    # ActiveRegionRule Traits ------------------------------------------------
+
+    #: The deterministic, local rule to apply.
+    rule = Instance(AbstractRule)
+
+    #: The length of each side of a tile.
+    tile_size = Int(64)
+
+    #: The fraction of active tiles above which the wrapped rule is simply
+    #: applied to the entire states array.
+    max_active_fraction = Range(0.0, 1.0, 0.5)
+
+    # AbstractRule Traits ----------------------------------------------------
+
+    #: This rule modifies the states passed to it.
+    in_place = Constant(True)
+
+    #: The rule remembers the previous states, so it can only be applied to
+    #: complete states arrays.
+    halo = Constant(None)
+
+    # Private Traits ---------------------------------------------------------
+
+    #: The states after the previous step.
+    _previous = Any(transient=True)
+
+    #: The tiles which were changed by the rule in the previous step.
+    _changed = Any(transient=True)
+
+    # ------------------------------------------------------------------------
+    # ActiveRegionRule interface
+    # ------------------------------------------------------------------------
+
+    def active_tiles(self, states):
+        """ Compute which tiles need the rule to be applied to them.
+
+        Parameters
+        ----------
+        states : array
+            An array holding the current states of the automaton.
+
+        Returns
+        -------
+        active : array of bool
+            An array with one value for each tile.
+        """
+        grid_shape = tile_grid_shape(states.shape, self.tile_size)
+        if self._previous is None or self._previous.shape != states.shape:
+            return np.ones(grid_shape, dtype=bool)
+
+        dirty = reduce_tiles(states != self._previous, self.tile_size)
+        dirty |= self._changed
+
+        reach = -(-self.rule.halo // self.tile_size)
+        if reach == 0:
+            return dirty
+        mode = 'wrap' if rule_wraps(self.rule) else 'constant'
+        return ndimage.maximum_filter(dirty, size=2*reach+1, mode=mode)
+
+    def reset(self):
+        """ Forget the previous states, so the next step updates every tile.
+        """
+        self._previous = None
+        self._changed = None
+
+    # ------------------------------------------------------------------------
+    # AbstractRule interface
+    # ------------------------------------------------------------------------
+
+    def step(self, states):
+        """ Apply the wrapped rule to the active tiles of the states.
+
+        Parameters
+        ----------
+        states : array
+            An array holding the current states of the automaton.
+
+        Returns
+        -------
+        states : array
+            The new states of the automaton after the rule has been applied.
+        """
+        states = super(ActiveRegionRule, self).step(states)
+
+        active = self.active_tiles(states)
+        changed = np.zeros(active.shape, dtype=bool)
+        if (self._previous is None or self._previous.shape != states.shape or
+                active.mean() > self.max_active_fraction):
+            previous = states.copy()
+            result = self.rule.step(states)
+            if result is not states:
+                np.copyto(states, result)
+            changed = reduce_tiles(states != previous, self.tile_size)
+            self._previous = states.copy()
+            self._changed = changed
+            return states
+
+        halo = self.rule.halo
+        wrap = rule_wraps(self.rule)
+
+        # compute all the new tiles before modifying any of the states
+        updates = []
+        for index in zip(*np.nonzero(active)):
+            region = tile_region(index, states.shape, self.tile_size)
+            block, inner = padded_block(states, region, halo, wrap)
+            new_tile = self.rule.step(block.copy())[inner]
+            if np.any(new_tile != states[region]):
+                changed[index] = True
+                updates.append((region, new_tile))
+
+        for region, new_tile in updates:
+            states[region] = new_tile
+            self._previous[region] = new_tile
+
+        # tiles which other rules changed now match the states
+        for index in zip(*np.nonzero(active & ~changed)):
+            region = tile_region(index, states.shape, self.tile_size)
+            self._previous[region] = states[region]
+
+        self._changed = changed
+        return states
+
+    def check_states(self, states):
+        """ Check that the wrapped rule can be applied to the states.
+
+        Parameters
+        ----------
+        states : array
+            An array holding the current state of the automaton.
+
+        Raises
+        ------
+        ValueError
+            If the states are not compatible with the rule, or the wrapped
+            rule is not deterministic and local.
+        """
+        if self.rule is None:
+            raise ValueError("ActiveRegionRule has no rule to apply.")
+        if self.rule.halo is None:
+            raise ValueError("ActiveRegionRule requires a local rule.")
+        if self.rule.stochastic:
+            raise ValueError("ActiveRegionRule requires a deterministic rule.")
+        self.rule.check_states(states)
+
+    # ------------------------------------------------------------------------
+    # Private interface
+    # ------------------------------------------------------------------------
+
+    # Trait change handlers --------------------------------------------------
+
+    def _rule_changed(self):
+        self.reset()
+
+    def _tile_size_changed(self):
+        self.reset()
+
+    @on_trait_change('rule.+')
+    def _rule_trait_changed(self, rule, name, old, new):
+        # transient traits hold caches, not the parameters of the rule
+        trait = rule.trait(name)
+        if trait is None or not trait.transient:
+            self.reset()
@@ -11,10 +11,42 @@
 A collection of base classes for common behaviour of certain rule types.
 """
 
-from traits.api import Array, Enum, Int, Property
+import threading
+
+import numpy as np
+from traits.api import (
+    Any, Array, Bool, Enum, Int, Property, Range, cached_property
+)
 
 from cellular_automata.abstract_rule import AbstractRule
 
+#: The modes of :py:func:`numpy.pad` which extend the states in the same way
+#: as each boundary mode.
+PAD_MODES = {
+    'empty': 'constant',
+    'filled': 'constant',
+    'nearest': 'edge',
+    'wrap': 'wrap',
+    'reflect': 'symmetric',
+}
+
+#: The modes of :py:mod:`scipy.ndimage` filters for each boundary mode.
+FILTER_MODES = {
+    'empty': 'constant',
+    'filled': 'constant',
+    'nearest': 'nearest',
+    'wrap': 'wrap',
+    'reflect': 'reflect',
+}
+
+#: Separable structures which are not boxes, with more than this many
+#: neighbours, are convolved along each axis rather than directly.
+MAX_DIRECT_NEIGHBOURS = 16
+
+#: Structures which are not separable, with at least this many neighbours,
+#: are convolved using FFTs.
+MIN_FFT_NEIGHBOURS = 64
+
 
 class NDimRule(AbstractRule):
     """ A rule which expects the state to be N-dimensional. """
@@ -61,6 +93,16 @@ class StructureRule(NDimRule):
     #: The structure to use for determining neighbours.
     structure = Array(dtype=bool)
 
+    #: The structure with an extra leading axis of length one.  This is
+    #: suitable for use with ensembles of replicas, since cells in one
+    #: replica are never neighbours of cells in another.
+    ensemble_structure = Property(Array(dtype=bool), depends_on='structure')
+
+    # AbstractRule Traits ----------------------------------------------------
+
+    #: By default, cells depend on cells covered by the structure.
+    halo = Property(depends_on='structure')
+
     # NDimRule Traits --------------------------------------------------------
 
     #: The dimension should match the dimension of the structure.
@@ -75,8 +117,13 @@ class StructureRule(NDimRule):
     def _get_ndim(self):
         return self.structure.ndim
 
+    def _get_ensemble_structure(self):
+        return self.structure[None, ...]
+
+    def _get_halo(self):
+        return max(self.structure.shape) // 2
+
     def _structure_default(self):
-        import numpy as np
         return np.ones(shape=(3, 3), dtype=bool)
 
 
@@ -85,6 +132,15 @@ class CountNeighboursRule(StructureRule):
 
     The :py:attr:`structure` array is used to determine which cells are
     counted as neighbours.
+
+    When :py:attr:`incremental` is True, the rule keeps the counts from the
+    previous call and only updates them around the cells which have entered
+    or left the mask since then, so when few cells change each tick the
+    cost scales with the number of changed cells rather than with the size
+    of the states.  The counts are recomputed from scratch every
+    :py:attr:`resync_interval` calls.  The counts are kept separately for
+    each thread, so the rule can be applied to several tiles of the states
+    concurrently, as by :py:class:`ThreadedEngine`.
     """
 
     # CountNeighboursRule Traits ---------------------------------------------
@@ -92,37 +148,346 @@ class CountNeighboursRule(StructureRule):
     #: The boundary mode to use.
     boundary = Enum('empty', 'filled', 'nearest', 'wrap', 'reflect')
 
+    #: How to count neighbours.  'direct' convolves with the structure,
+    #: 'separable' convolves with a 1D factor of the structure along each
+    #: axis, 'box' sums windows using cumulative sums, which costs the same
+    #: for any size of window, and 'fft' convolves using FFTs.  The
+    #: separable and box strategies also handle structures which leave out
+    #: the central cell.  'auto' picks the fastest suitable strategy.
+    strategy = Enum('auto', 'direct', 'separable', 'box', 'fft')
+
+    #: The strategy which is used, after resolving 'auto'.
+    selected_strategy = Property(depends_on='structure, strategy')
+
+    #: The dtype of the counts: the smallest unsigned integer type which can
+    #: hold the largest possible count.
+    count_dtype = Property(depends_on='structure')
+
+    #: Whether to update the previous counts from the changed cells.
+    incremental = Bool(False)
+
+    #: The number of incremental updates between full recomputations.
+    resync_interval = Int(64)
+
+    #: The fraction of changed cells above which the counts are recomputed
+    #: from scratch, since that is faster than updating them.
+    max_changed_fraction = Range(0.0, 1.0, 0.05)
+
+    # Private Traits ---------------------------------------------------------
+
+    #: The previous mask, counts and number of updates since they were last
+    #: computed from scratch, for each thread and key.
+    _incremental_counts = Any(transient=True)
+
+    #: The 1D factors of the structure along each axis, or None if it is not
+    #: separable, and whether the central cell is left out.
+    _factors = Property(depends_on='structure')
+
     # ------------------------------------------------------------------------
     # CountNeighboursRule interface
     # ------------------------------------------------------------------------
 
-    def count_neighbours(self, mask):
-        """ Return the count of the neighbours according to the mask. """
-        from scipy.ndimage.filters import convolve
+    def count_neighbours(self, mask, ensemble=False, key=None):
+        """ Return the count of the neighbours according to the mask.
 
-        mask = mask.astype('uint8')
-        filter_args = {'mode': self.boundary}
-        if self.boundary == 'empty':
-            filter_args['mode'] = 'constant'
-            filter_args['cval'] = 0
-        elif self.boundary == 'filled':
-            filter_args['mode'] = 'constant'
-            filter_args['cval'] = 1
-
-        counts = convolve(mask, self.structure, **filter_args)
-
-        return counts
+        Parameters
+        ----------
+        mask : array
+            A boolean array of the cells which should be counted.
+        ensemble : bool
+            Whether the mask holds an ensemble of replicas stacked along the
+            first axis.  Neighbours are never counted across replicas.
+        key : hashable
+            When counting incrementally, identifies which of the masks that
+            the rule counts this is, such as the state value of the cells in
+            the mask.  Counts for different keys are kept separately.
+
+        Returns
+        -------
+        counts : array
+            The number of neighbours of each cell which are in the mask.
+            When counting incrementally, this is a read-only view which is
+            updated by the next call with the same key.
+        """
+        if not self.incremental:
+            return self._convolve(mask, ensemble)
+
+        if self._incremental_counts is None:
+            self._incremental_counts = {}
+        # threads stepping different tiles must not share counts
+        key = (threading.get_ident(), key, ensemble)
+        tracked = self._incremental_counts.get(key)
+        if (tracked is None or tracked[0].shape != mask.shape or
+                tracked[2] >= self.resync_interval):
+            tracked = None
+        else:
+            previous, counts, n_updates = tracked
+            changed = np.flatnonzero(mask != previous)
+            if len(changed) > self.max_changed_fraction * mask.size:
+                tracked = None
+            else:
+                self._update_counts(counts, mask, changed, ensemble)
+                np.copyto(previous, mask)
+                tracked[2] += 1
+
+        if tracked is None:
+            counts = self._convolve(mask, ensemble)
+            tracked = [np.array(mask, dtype=bool), counts, 0]
+            self._incremental_counts[key] = tracked
+
+        view = tracked[1].view()
+        view.flags.writeable = False
+        return view
+
+    def reset_counts(self):
+        """ Forget the counts kept for incremental counting. """
+        self._incremental_counts = None
 
     # ------------------------------------------------------------------------
     # Private interface
     # ------------------------------------------------------------------------
 
+    def _convolve(self, mask, ensemble):
+        """ Count the neighbours in the mask from scratch. """
+        structure = self.ensemble_structure if ensemble else self.structure
+        dtype = self.count_dtype
+        strategy = self.selected_strategy
+        mask = mask.astype(dtype)
+
+        if strategy == 'direct':
+            from scipy.ndimage import convolve
+            cval = 1 if self.boundary == 'filled' else 0
+            return convolve(
+                mask, structure.astype(dtype),
+                mode=FILTER_MODES[self.boundary], cval=cval,
+            )
+
+        if strategy == 'fft':
+            from scipy.signal import fftconvolve
+            padded = self._pad(mask.astype(float), structure.shape)
+            counts = fftconvolve(padded, structure.astype(float), 'valid')
+            return np.rint(counts).astype(dtype)
+
+        factors, without_centre = self._factors
+        if ensemble:
+            factors = [np.ones(1, dtype=bool)] + factors
+        if strategy == 'box':
+            counts = self._pad(mask, structure.shape)
+            for axis, factor in enumerate(factors):
+                counts = _window_sums(counts, len(factor), axis, dtype)
+            counts = np.ascontiguousarray(counts)
+        else:
+            from scipy.ndimage import convolve1d
+            counts = mask
+            cval = 1 if self.boundary == 'filled' else 0
+            for axis, factor in enumerate(factors):
+                counts = convolve1d(
+                    counts, factor.astype(dtype), axis=axis,
+                    mode=FILTER_MODES[self.boundary], cval=cval,
+                )
+                # cells outside have the count of a filled line of cells
+                cval *= int(factor.sum())
+        if without_centre:
+            counts -= mask
+        return counts
+
+    def _pad(self, mask, shape):
+        """ Pad the mask so that convolving with a structure of the given
+        shape without padding gives the counts for the boundary mode.
+        """
+        # the convolution sums cells from size - 1 - centre before each cell
+        # to centre after it
+        pad_width = [(size - 1 - size // 2, size // 2) for size in shape]
+        mode = PAD_MODES[self.boundary]
+        if mode == 'constant':
+            value = 1 if self.boundary == 'filled' else 0
+            return np.pad(mask, pad_width, mode, constant_values=value)
+        return np.pad(mask, pad_width, mode)
+
+    def _update_counts(self, counts, mask, changed, ensemble):
+        """ Add the changes in the counts from the changed cells. """
+        if len(changed) == 0:
+            return
+        structure = self.ensemble_structure if ensemble else self.structure
+        shape = mask.shape
+        points = np.unravel_index(changed, shape)
+        signs = mask.flat[changed]
+
+        # the positions, including positions outside the states which the
+        # boundary mode maps to a changed cell, whose neighbours change
+        owners = np.arange(len(changed))
+        coordinates = []
+        for axis, size in enumerate(shape):
+            reach = structure.shape[axis] // 2
+            axis_owners, axis_coordinates = _boundary_sources(
+                points[axis], size, reach, self.boundary
+            )
+            owners, coordinates = _expand(
+                owners, coordinates, axis_owners, axis_coordinates
+            )
+
+        flat_counts = counts.reshape(-1)
+        centre = np.array(structure.shape) // 2
+        for offset in np.argwhere(structure) - centre:
+            targets = [
+                coordinate + delta
+                for coordinate, delta in zip(coordinates, offset)
+            ]
+            inside = np.ones(len(owners), dtype=bool)
+            if self.boundary == 'wrap':
+                targets = [
+                    target % size for target, size in zip(targets, shape)
+                ]
+            else:
+                for target, size in zip(targets, shape):
+                    inside &= (target >= 0) & (target < size)
+            flat = np.ravel_multi_index(
+                [target[inside] for target in targets], shape
+            )
+            entering = signs[owners[inside]]
+            np.add.at(flat_counts, flat[entering], 1)
+            np.subtract.at(flat_counts, flat[~entering], 1)
+
+    # Trait properties -------------------------------------------------------
+
+    @cached_property
+    def _get__factors(self):
+        return _separable_factors(self.structure)
+
+    @cached_property
+    def _get_selected_strategy(self):
+        factors, without_centre = self._factors
+        strategy = self.strategy
+        if strategy == 'auto':
+            # window sums beat direct convolution even for 3x3 boxes
+            n_neighbours = np.count_nonzero(self.structure)
+            if factors is not None and all(f.all() for f in factors):
+                strategy = 'box'
+            elif factors is not None and n_neighbours > MAX_DIRECT_NEIGHBOURS:
+                strategy = 'separable'
+            elif n_neighbours >= MIN_FFT_NEIGHBOURS:
+                strategy = 'fft'
+            else:
+                strategy = 'direct'
+        elif strategy in ('separable', 'box'):
+            if factors is None:
+                msg = "The structure is not separable."
+                raise ValueError(msg)
+            if strategy == 'box' and not all(f.all() for f in factors):
+                msg = "The structure is not a box."
+                raise ValueError(msg)
+        return strategy
+
+    @cached_property
+    def _get_count_dtype(self):
+        return np.min_scalar_type(np.count_nonzero(self.structure))
+
+    # Trait change handlers --------------------------------------------------
+
+    def _boundary_changed(self):
+        self.reset_counts()
+
+    def _structure_changed(self):
+        self.reset_counts()
+
     # Trait defaults ---------------------------------------------------------
 
     def _structure_default(self):
-        import numpy as np
         return np.array([
             [1, 1, 1],
             [1, 0, 1],
             [1, 1, 1],
         ], dtype=bool)
+
+
+def _separable_factors(structure):
+    """ Split a structure into a 1D factor along each axis.
+
+    Returns
+    -------
+    factors : list of array or None
+        The factors, whose outer product is the structure, possibly with the
+        central cell added, or None if there are no such factors.
+    without_centre : bool
+        Whether the central cell must be left out of the outer product.
+    """
+    centre = tuple(size // 2 for size in structure.shape)
+    without_centre = not structure[centre]
+    full = structure.copy()
+    full[centre] = True
+
+    factors = []
+    for axis in range(full.ndim):
+        others = tuple(i for i in range(full.ndim) if i != axis)
+        factors.append(full.any(axis=others))
+    product = factors[0]
+    for factor in factors[1:]:
+        product = np.multiply.outer(product, factor)
+    if not np.array_equal(product, full):
+        return None, without_centre
+    return factors, without_centre
+
+
+def _window_sums(values, size, axis, dtype):
+    """ Sum windows of the given size along an axis using cumulative sums.
+
+    The sums are computed in the given unsigned dtype.  Differences of the
+    cumulative sums are exact even if the cumulative sums overflow, as long
+    as the dtype can hold the sums of the windows.
+    """
+    values = np.moveaxis(values, axis, 0)
+    sums = np.cumsum(values, axis=0, dtype=dtype)
+    n_windows = len(values) - size + 1
+    result = sums[size - 1:]
+    result[1:] -= sums[:n_windows - 1]
+    return np.moveaxis(result, 0, axis)
+
+
+def _boundary_sources(coordinates, size, reach, boundary):
+    """ The positions along an axis which the boundary mode maps to each of
+    the given coordinates, within reach of the states.
+
+    Returns
+    -------
+    owners : array of int
+        The index of the coordinate that each position maps to.
+    positions : array of int
+        The positions, which may be outside the states.
+    """
+    owners = [np.arange(len(coordinates))]
+    positions = [coordinates]
+    if boundary in ('nearest', 'reflect'):
+        for distance in range(1, reach + 1):
+            if boundary == 'nearest':
+                low = coordinates == 0
+                high = coordinates == size - 1
+            else:
+                low = coordinates == distance - 1
+                high = coordinates == size - distance
+            owners.extend([np.flatnonzero(low), np.flatnonzero(high)])
+            positions.extend([
+                np.full(np.count_nonzero(low), -distance),
+                np.full(np.count_nonzero(high), size - 1 + distance),
+            ])
+    return np.concatenate(owners), np.concatenate(positions)
+
+
+def _expand(owners, coordinates, axis_owners, axis_coordinates):
+    """ Pair each combination of positions with each position on a new axis
+    which maps to the same changed cell.
+    """
+    order = np.argsort(axis_owners, kind='stable')
+    axis_owners = axis_owners[order]
+    axis_coordinates = axis_coordinates[order]
+    n_per_owner = np.bincount(axis_owners, minlength=len(owners))
+    starts = np.cumsum(n_per_owner) - n_per_owner
+
+    repeats = n_per_owner[owners]
+    entries = np.repeat(np.arange(len(owners)), repeats)
+    within = np.arange(len(entries)) - np.repeat(
+        np.cumsum(repeats) - repeats, repeats
+    )
+    new_owners = owners[entries]
+    new_coordinates = [coordinate[entries] for coordinate in coordinates]
+    new_coordinates.append(axis_coordinates[starts[new_owners] + within])
+    return new_owners, new_coordinates
@@ -11,7 +11,7 @@
 
 from scipy import ndimage
 
-from traits.api import Trait
+from traits.api import Constant, Property, Trait
 
 from cellular_automata.automata_traits import StateValue
 from .base_rules import StructureRule
@@ -39,6 +39,15 @@ class BinaryMorphologyRule(StructureRule):
         'fill_holes': ndimage.binary_fill_holes,
     })
 
+    # AbstractRule Traits ----------------------------------------------------
+
+    #: This rule modifies the states passed to it.
+    in_place = Constant(True)
+
+    #: The reach of the operation depends on the structure and how many
+    #: times it is applied.
+    halo = Property(depends_on='structure, operation')
+
     def step(self, states):
         """ Apply a binary morphology operation to "foreground" state cells.
 
@@ -56,14 +65,50 @@ class BinaryMorphologyRule(StructureRule):
             The new states of the automaton after the rule has been applied.
         """
         states = super(BinaryMorphologyRule, self).step(states)
+        return self._apply(states, self.structure)
+
+    def step_ensemble(self, states):
+        """ Apply the morphology operation to each replica of an ensemble.
+
+        Parameters
+        ----------
+        states : array
+            An array holding the current states of each replica, stacked
+            along the first axis.
 
+        Returns
+        -------
+        states : array
+            The same array, holding the new states of each replica.
+        """
+        self.check_ensemble_states(states)
+        return self._apply(states, self.ensemble_structure)
+
+    # ------------------------------------------------------------------------
+    # Private interface
+    # ------------------------------------------------------------------------
+
+    def _apply(self, states, structure):
+        """ Apply the operation with the given structure, in place. """
         foreground = (states == self.foreground_state)
         binary_mask = self.operation_(
             input=foreground,
-            structure=self.structure,
+            structure=structure,
         )
 
         states[binary_mask] = self.foreground_state
         states[foreground & ~binary_mask] = self.background_state
 
         return states
+
+    # Trait properties -------------------------------------------------------
+
+    def _get_halo(self):
+        radius = max(self.structure.shape) // 2
+        if self.operation in {'dilation', 'erosion'}:
+            return radius
+        elif self.operation in {'opening', 'closing'}:
+            return 2 * radius
+        else:
+            # propagation and hole filling are not local operations
+            return None
@@ -13,9 +13,14 @@ with some probability.
 """
 
 import numpy as np
+from traits.api import Constant, Property
 
-from cellular_automata.abstract_rule import AbstractRule
-from cellular_automata.automata_traits import Probability, StateValue
+from cellular_automata.abstract_rule import (
+    AbstractRule, is_random, replica_parameter, scalar_parameter
+)
+from cellular_automata.automata_traits import ReplicaProbability, StateValue
+from cellular_automata.sampling import bernoulli_hits
+from cellular_automata.states_cache import StatesCache
 
 
 class ChangeStateRule(AbstractRule):
@@ -33,20 +38,65 @@ class ChangeStateRule(AbstractRule):
     #: The state value to change to.
     to_state = StateValue(1)
 
-    #: The probability of a cell changing value.
-    p_change = Probability(1.0)
+    #: The probability of a cell changing value.  When used with an ensemble
+    #: this may be an array holding a probability for each replica.
+    p_change = ReplicaProbability(1.0)
+
+    # AbstractRule Traits ----------------------------------------------------
+
+    #: This rule modifies the states passed to it.
+    in_place = Constant(True)
+
+    #: Each cell only depends on its own state.
+    halo = Constant(0)
+
+    #: The rule is random unless the probabilities are all zero or one.
+    stochastic = Property(depends_on='p_change')
 
     # ------------------------------------------------------------------------
     # AbstractRule interface
     # ------------------------------------------------------------------------
 
     def step(self, states):
+        return self.step_cached(states, StatesCache(states))
+
+    def step_cached(self, states, cache):
         states = super(ChangeStateRule, self).step(states)
+        p_change = scalar_parameter(self.p_change)
+        return self._change_states(states, p_change, self.generator, cache)
 
-        mask = (states == self.from_state)
-        if self.p_change < 1.0:
-            mask &= (np.random.uniform(size=states.shape) < self.p_change)
+    def step_ensemble(self, states):
+        self.check_ensemble_states(states)
+        p_change = replica_parameter(self.p_change, states)
+        generators = self.child_generators(len(states))
+        return self._change_states(
+            states, p_change, generators, StatesCache(states)
+        )
 
-        states[mask] = self.to_state
+    def pointwise_transition(self):
+        table = np.arange(256, dtype='uint8')
+        table[self.from_state] = self.to_state
+        return table, self.p_change
 
+    # ------------------------------------------------------------------------
+    # Private interface
+    # ------------------------------------------------------------------------
+
+    def _change_states(self, states, p_change, generator, cache):
+        """ Change states with the given (broadcastable) probability. """
+        mask = cache.mask(self.from_state)
+        if np.any(p_change < 1.0):
+            hits = bernoulli_hits(mask, p_change, generator)
+            if len(hits) == 0:
+                return states
+            states.flat[hits] = self.to_state
+        else:
+            states[mask] = self.to_state
+
+        cache.invalidate([self.from_state, self.to_state])
         return states
+
+    # Trait properties -------------------------------------------------------
+
+    def _get_stochastic(self):
+        return is_random(self.p_change)
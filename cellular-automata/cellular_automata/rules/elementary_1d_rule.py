@@ -9,21 +9,26 @@
 # Thanks for using Enthought open source!
 
 import numpy as np
-from scipy import ndimage
-
-from traits.api import Array, Constant, Enum, Property, Range, cached_property
+from traits.api import (
+    Array, Bool, Constant, Enum, Property, Range, cached_property
+)
 
 from cellular_automata.automata_traits import StateValue
 from .base_rules import NDimRule
 
 REVERSE_PERMUTATION = [0, 4, 2, 6, 1, 5, 3, 7]
 
+#: The boundary modes for which additive rules can jump ahead.
+JUMP_BOUNDARIES = {'empty', 'wrap'}
+
 
 class Elementary1DRule(NDimRule):
     """ Rule implementing an elementary 1D cellular automata.
 
-    This uses Wolfram's rule numbering scheme to identify the rules and
-    scipy.ndimage to handle the boundary conditions.
+    This uses Wolfram's rule numbering scheme to identify the rules.  Each
+    tick, the three-bit neighbourhood of every cell is computed from shifted
+    slices of a padded copy of the line, and the new state is the bit of the
+    rule number at that index.
 
     Notes
     -----
@@ -51,11 +56,23 @@ class Elementary1DRule(NDimRule):
     #: The boundary mode to use.
     boundary = Enum('empty', 'filled', 'nearest', 'wrap', 'reflect')
 
+    #: Whether the rule is additive, so that the new cells are the
+    #: exclusive-or of some of the cells in the neighbourhood.
+    additive = Property(Bool, depends_on='rule_number')
+
+    #: Whether :py:meth:`jump` can be used with the rule and boundary.
+    can_jump = Property(Bool, depends_on='rule_number, boundary')
+
     # NDimRule Traits --------------------------------------------------------
 
     #: These are 1-dimensional only rules.
     ndim = Constant(1)
 
+    # AbstractRule Traits ----------------------------------------------------
+
+    #: Cells depend on their immediate neighbours.
+    halo = Constant(1)
+
     # ------------------------------------------------------------------------
     # Elementary1DRule interface
     # ------------------------------------------------------------------------
@@ -68,6 +85,54 @@ class Elementary1DRule(NDimRule):
         """ Complement the cellular automata replacing 1's with 0's throughout. """
         self.bit_mask = ~self.bit_mask[::-1]
 
+    def jump(self, states, n_ticks):
+        """ Apply an additive rule for many ticks at once.
+
+        An additive rule is a linear map over GF(2), which multiplies the
+        line, as a polynomial, by a fixed polynomial.  Over GF(2) the
+        ``2**k``-th power of that polynomial is the polynomial with its
+        offsets scaled by ``2**k``, so ``n_ticks`` ticks take one sparse
+        multiplication for each bit of ``n_ticks``.  With the 'wrap'
+        boundary the multiplication is cyclic.  With the 'empty' boundary,
+        symmetric rules are run on a cyclic line holding the line followed
+        by its mirror image, with an empty cell between them which stays
+        empty, and one-sided rules never carry cells back from past the end
+        of the line.
+
+        Parameters
+        ----------
+        states : array
+            An array holding the current states of the automata.
+        n_ticks : int
+            The number of ticks to advance.
+
+        Returns
+        -------
+        states : array
+            A new array holding the states after the ticks.
+
+        Raises
+        ------
+        ValueError
+            If the rule isn't additive, the boundary mode isn't 'empty'
+            or 'wrap', or the number of ticks is negative.
+        """
+        self.check_states(states)
+        if n_ticks < 0:
+            msg = "Can't advance by a negative number of ticks: {}."
+            raise ValueError(msg.format(n_ticks))
+        if not self.can_jump:
+            msg = "Rule {} with boundary {!r} can't jump ahead."
+            raise ValueError(msg.format(self.rule_number, self.boundary))
+
+        offsets = [term[0] for term in algebraic_normal_form(self.bit_mask)]
+        filled = _additive_jump(
+            states == self.filled_state, offsets, n_ticks, self.boundary
+        )
+        return np.where(
+            filled, self.filled_state, self.empty_state
+        ).astype(states.dtype)
+
     # ------------------------------------------------------------------------
     # AbstractRule interface
     # ------------------------------------------------------------------------
@@ -86,34 +151,70 @@ class Elementary1DRule(NDimRule):
             The new states of the automata after the rule has been applied.
         """
         states = super(NDimRule, self).step(states)
+        return self.step_into(states, np.empty_like(states))
 
-        wrap_args = {'mode': self.boundary}
-        if self.boundary == 'empty':
-            wrap_args['mode'] = 'constant'
-            wrap_args['cval'] = 0
-        elif self.boundary == 'filled':
-            wrap_args['mode'] = 'constant'
-            wrap_args['cval'] = 1
+    def step_into(self, states, out):
+        """ Apply the specified rule to the states, writing into out.
 
-        filled = (states == self.filled_state)
-        filled = ndimage.generic_filter1d(
-            filled, self._rule_filter, filter_size=3, **wrap_args)
+        Parameters
+        ----------
+        states : array
+            An array holding the current states of the automata.
+        out : array
+            An array of the same shape and dtype as states which will hold
+            the new states.
 
-        states = np.full(filled.shape, self.empty_state, dtype='uint8')
-        states[filled] = self.filled_state
-        return states
+        Returns
+        -------
+        out : array
+            The output array holding the new states of the automata.
+        """
+        self.check_states(states)
+        return self._apply(states, out)
+
+    def step_ensemble(self, states):
+        """ Apply the specified rule to each line in an ensemble.
+
+        Parameters
+        ----------
+        states : array
+            A 2D array holding the current states of each replica.
+
+        Returns
+        -------
+        states : array
+            The same array, holding the new states of each replica.
+        """
+        self.check_ensemble_states(states)
+        return self._apply(states, states)
 
     # ------------------------------------------------------------------------
     # Private interface
     # ------------------------------------------------------------------------
 
-    def _rule_filter(self, iline, oline):
-        """ Kernel to compute values in generic filter """
-        index = (iline[:-2] * 4 + iline[1:-1] * 2 + iline[2:]).astype('uint8')
-        oline[...] = self.bit_mask[index]
+    def _apply(self, states, out):
+        """ Apply the rule along the last axis of states, writing into out. """
+        index = neighbourhood_index(states == self.filled_state, self.boundary)
+
+        # the new state of each cell is the bit of the rule number at the
+        # index, which avoids gathering from a table
+        bits = np.right_shift(np.uint8(self.rule_number), index, out=index)
+        bits &= 1
+        difference = (self.filled_state - self.empty_state) % 256
+        np.multiply(bits, np.uint8(difference), out=out)
+        out += np.uint8(self.empty_state)
+        return out
 
     # Trait properties -------------------------------------------------------
 
+    @cached_property
+    def _get_additive(self):
+        terms = algebraic_normal_form(self.bit_mask)
+        return all(len(term) == 1 for term in terms)
+
+    def _get_can_jump(self):
+        return self.additive and self.boundary in JUMP_BOUNDARIES
+
     @cached_property
     def _get_bit_mask(self):
         bits = np.unpackbits(np.array([self.rule_number], dtype='uint8'))[::-1]
@@ -122,3 +223,122 @@ class Elementary1DRule(NDimRule):
     def _set_bit_mask(self, bits):
         bits = np.asarray(bits, dtype=bool)
         self.rule_number = int(np.packbits(bits[::-1])[0])
+
+
+def neighbourhood_index(filled, boundary):
+    """ The index of the neighbourhood of each cell in lines of cells.
+
+    Parameters
+    ----------
+    filled : array of bool
+        Which cells are filled, along the last axis.
+    boundary : str
+        The boundary mode, as for :py:attr:`Elementary1DRule.boundary`.
+
+    Returns
+    -------
+    index : array of uint8
+        The neighbourhood index ``4*left + 2*centre + right`` of each cell.
+    """
+    # pad each line by one cell according to the boundary mode
+    shape = filled.shape[:-1] + (filled.shape[-1] + 2,)
+    padded = np.empty(shape, dtype='uint8')
+    padded[..., 1:-1] = filled
+    if boundary == 'empty':
+        padded[..., [0, -1]] = 0
+    elif boundary == 'filled':
+        padded[..., [0, -1]] = 1
+    elif boundary == 'wrap':
+        padded[..., 0] = padded[..., -2]
+        padded[..., -1] = padded[..., 1]
+    else:
+        # 'nearest' and 'reflect' both repeat the end cells
+        padded[..., 0] = padded[..., 1]
+        padded[..., -1] = padded[..., -2]
+
+    index = np.left_shift(padded[..., :-2], 2)
+    index |= np.left_shift(padded[..., 1:-1], 1)
+    index |= padded[..., 2:]
+    return index
+
+
+def algebraic_normal_form(bit_mask):
+    """ The terms of the algebraic normal form of an elementary rule.
+
+    Every boolean function of the three cells in a neighbourhood can be
+    written as an exclusive-or of conjunctions of the cells.  Additive rules
+    such as rule 90 only have single-cell terms, and no rule has more than
+    eight terms.
+
+    Parameters
+    ----------
+    bit_mask : array of bool
+        The new state for each of the eight neighbourhoods, indexed by
+        ``4*left + 2*centre + right``.
+
+    Returns
+    -------
+    terms : list of tuples of int
+        The terms, each given by the offsets of the cells in the conjunction
+        from the centre cell.  An empty tuple is the constant True term.
+    """
+    coefficients = [bool(bit) for bit in bit_mask]
+    # the Moebius transform turns the truth table into the coefficients
+    for bit in range(3):
+        for index in range(8):
+            if index & (1 << bit):
+                coefficients[index] ^= coefficients[index ^ (1 << bit)]
+
+    offsets = [(4, -1), (2, 0), (1, 1)]
+    return [
+        tuple(offset for bit, offset in offsets if index & bit)
+        for index in range(8) if coefficients[index]
+    ]
+
+
+def _additive_jump(filled, offsets, n_ticks, boundary):
+    """ Advance lines of cells under an additive rule by many ticks.
+
+    Each tick, a cell becomes the exclusive-or of the cells at the offsets
+    from it.
+    """
+    n_cells = filled.shape[-1]
+    symmetric = sorted(-offset for offset in offsets) == sorted(offsets)
+    if boundary == 'wrap':
+        cyclic = True
+        line = filled.copy()
+    elif symmetric:
+        # the mirror image keeps the cells on either side of the line empty
+        cyclic = True
+        empty = np.zeros(filled.shape[:-1] + (1,), dtype=bool)
+        line = np.concatenate(
+            [filled, empty, filled[..., ::-1], empty], axis=-1
+        )
+    else:
+        cyclic = False
+        line = filled.copy()
+
+    size = line.shape[-1]
+    scale = 1
+    while n_ticks:
+        if n_ticks & 1:
+            new_line = np.zeros_like(line)
+            for offset in offsets:
+                shift = offset * scale
+                if cyclic:
+                    new_line ^= np.roll(line, -shift, axis=-1)
+                elif shift > 0:
+                    new_line[..., :size - shift] ^= line[..., shift:]
+                elif shift < 0:
+                    new_line[..., -shift:] ^= line[..., :size + shift]
+                else:
+                    new_line ^= line
+            line = new_line
+        n_ticks >>= 1
+        scale *= 2
+        if cyclic:
+            scale %= size
+        elif scale >= size:
+            # shifts past the end of the line leave nothing
+            scale = size
+    return line[..., :n_cells]
@@ -14,10 +14,16 @@ Rules that allow simple simulations of forest fire behaviour.
 import numpy as np
 from scipy import ndimage
 
-from traits.api import Int
-
-from cellular_automata.automata_traits import Probability, StateValue
+from traits.api import Any, Array, Bool, Constant, Int, Property, Range
+
+from cellular_automata.abstract_rule import (
+    is_random, replica_parameter, scalar_parameter
+)
+from cellular_automata.automata_traits import ReplicaProbability, StateValue
+from cellular_automata.sampling import bernoulli_hits
+from cellular_automata.states_cache import StatesCache
 from .base_rules import CountNeighboursRule, StructureRule
+from .grove_tracker import GroveTracker
 
 
 #: The default structure to use for fires.  The central cell is blank to model
@@ -45,6 +51,11 @@ class BurnRule(StructureRule):
     #: The state value for burning cells.
     burning_state = StateValue(2)
 
+    # AbstractRule Traits ----------------------------------------------------
+
+    #: Burn rules modify the states passed to them.
+    in_place = Constant(True)
+
     # ------------------------------------------------------------------------
     # Private interface
     # ------------------------------------------------------------------------
@@ -62,27 +73,86 @@ class SlowBurnRule(BurnRule):
 
     This rule models the evolution of a fire, where a particular fire may last
     many ticks.
+
+    While the fire front is small, the rule only looks at the neighbours of
+    the burning cells, rather than dilating the burning cells over the whole
+    grid.  Once the front covers a large enough fraction of the grid, it
+    switches to dilation, which is faster for dense fires.  Both give the
+    same results.
     """
 
+    # SlowBurnRule Traits ----------------------------------------------------
+
+    #: The rule dilates the burning cells over the whole grid when the
+    #: number of neighbours of burning cells is more than this fraction of
+    #: the number of cells.
+    max_frontier_fraction = Range(0.0, 1.0, 0.25)
+
     # ------------------------------------------------------------------------
     # AbstractRule interface
     # ------------------------------------------------------------------------
 
     def step(self, states):
-        states = super(SlowBurnRule, self).step(states)
+        return self.step_cached(states, StatesCache(states))
 
-        burning = (states == self.burning_state)
-        burnable_mask = (states == self.burnable_state)
+    def step_cached(self, states, cache):
+        states = super(SlowBurnRule, self).step(states)
+        return self._burn(states, self.structure, cache)
 
-        new_burning = ndimage.binary_dilation(
-            burning, self.structure, mask=burnable_mask, border_value=0,
+    def step_ensemble(self, states):
+        self.check_ensemble_states(states)
+        return self._burn(
+            states, self.ensemble_structure, StatesCache(states)
         )
 
-        states[new_burning] = self.burning_state
-        states[burning] = self.burnt_state
+    # ------------------------------------------------------------------------
+    # Private interface
+    # ------------------------------------------------------------------------
 
+    def _burn(self, states, structure, cache):
+        """ Spread fires to burnable cells using the given structure. """
+        burning = cache.mask(self.burning_state)
+        burning_cells = np.flatnonzero(burning)
+        n_neighbours = np.count_nonzero(structure)
+        frontier = len(burning_cells) * n_neighbours
+        if frontier <= self.max_frontier_fraction * states.size:
+            self._burn_frontier(states, structure, burning_cells)
+        else:
+            burnable_mask = cache.mask(self.burnable_state)
+            new_burning = ndimage.binary_dilation(
+                burning, structure, mask=burnable_mask, border_value=0,
+            )
+            states[new_burning] = self.burning_state
+            states[burning] = self.burnt_state
+
+        cache.invalidate(
+            [self.burnable_state, self.burning_state, self.burnt_state]
+        )
         return states
 
+    def _burn_frontier(self, states, structure, burning_cells):
+        """ Spread fires by looking at the neighbours of burning cells. """
+        shape = np.array(states.shape)
+        position = np.column_stack(
+            np.unravel_index(burning_cells, states.shape)
+        )
+
+        # binary_dilation sets the cells at each offset from the origin of
+        # the structure
+        offsets = np.argwhere(structure) - np.array(structure.shape) // 2
+        neighbours = [np.zeros(0, dtype=np.intp)]
+        for offset in offsets:
+            candidates = position + offset
+            inside = np.all((candidates >= 0) & (candidates < shape), axis=1)
+            neighbours.append(
+                np.ravel_multi_index(candidates[inside].T, states.shape)
+            )
+        neighbours = np.concatenate(neighbours)
+
+        catching = neighbours[states.flat[neighbours] == self.burnable_state]
+        states.flat[catching] = self.burning_state
+        states.flat[burning_cells] = self.burnt_state
+
 
 class BurnGrovesRule(BurnRule):
     """ A rule that burns down entire burnable connected components.
@@ -99,26 +169,121 @@ class BurnGrovesRule(BurnRule):
 
     # BurnGrovesRule Traits --------------------------------------------------
 
-    #: The probability of a fire starting in a particular cell.
-    p_fire = Probability(5e-6)
+    #: The probability of a fire starting in a particular cell.  When used
+    #: with an ensemble this may be an array holding a probability for each
+    #: replica.
+    p_fire = ReplicaProbability(5e-6)
+
+    #: The number of cells in each grove set on fire by the most recent
+    #: step.  For an ensemble these are the groves of every replica.
+    burnt_grove_sizes = Array(dtype=int, shape=(None,), transient=True)
+
+    #: Whether to keep track of the groves between steps, rather than
+    #: labelling every burnable cell each step.  The groves are updated
+    #: from the cells which have become burnable or stopped being burnable
+    #: since the last step, and burning a grove only touches the grove's
+    #: bounding box.  This is much faster when few cells change each tick,
+    #: and gives the same results.
+    incremental = Bool(False)
+
+    # AbstractRule Traits ----------------------------------------------------
+
+    #: Fires spread through entire connected components.
+    halo = Constant(None)
+
+    #: The rule is random unless the probabilities are all zero or one.
+    stochastic = Property(depends_on='p_fire')
+
+    # Private Traits ---------------------------------------------------------
+
+    #: The tracker of the groves when running incrementally.
+    _grove_tracker = Any(transient=True)
 
     # ------------------------------------------------------------------------
     # AbstractRule interface
     # ------------------------------------------------------------------------
 
     def step(self, states):
+        return self.step_cached(states, StatesCache(states))
+
+    def step_cached(self, states, cache):
         states = super(BurnGrovesRule, self).step(states)
+        p_fire = scalar_parameter(self.p_fire)
+        return self._burn_groves(
+            states, p_fire, None, self.generator, cache
+        )
 
-        burnable = (states == self.burnable_state)
-        strikes = (np.random.uniform(size=states.shape) < self.p_fire)
-        groves, num_groves = ndimage.label(burnable)
+    def step_ensemble(self, states):
+        self.check_ensemble_states(states)
 
-        burning_groves = np.unique(groves[strikes & burnable])
-        for grove in burning_groves:
-            states[groves == grove] = self.burning_state
+        # connect cells within each replica, but never across replicas
+        connectivity = ndimage.generate_binary_structure(states.ndim - 1, 1)
+        structure = np.zeros((3,) + connectivity.shape, dtype=bool)
+        structure[1] = connectivity
 
+        p_fire = replica_parameter(self.p_fire, states)
+        generators = self.child_generators(len(states))
+        return self._burn_groves(
+            states, p_fire, structure, generators, StatesCache(states)
+        )
+
+    # ------------------------------------------------------------------------
+    # Private interface
+    # ------------------------------------------------------------------------
+
+    def _burn_groves(self, states, p_fire, structure, generator, cache):
+        """ Set on fire the groves that are struck with the probability. """
+        burnable = cache.mask(self.burnable_state)
+        strikes = bernoulli_hits(burnable, p_fire, generator)
+        if len(strikes) == 0:
+            self.burnt_grove_sizes = np.zeros(0, dtype=int)
+            return states
+        if self.incremental:
+            tracker = self._tracker(burnable, structure)
+            burning, self.burnt_grove_sizes = tracker.burn(strikes)
+            states.flat[burning] = self.burning_state
+            cache.invalidate([self.burnable_state, self.burning_state])
+            return states
+
+        groves, num_groves = ndimage.label(burnable, structure)
+
+        # a table of the struck labels lets a single lookup in the label
+        # image find every burning cell, whatever the number of groves
+        struck = np.zeros(num_groves + 1, dtype=bool)
+        struck[groves.flat[strikes]] = True
+        burning = np.flatnonzero(struck[groves])
+        states.flat[burning] = self.burning_state
+
+        # the labels of the burning cells give the sizes of their groves
+        sizes = np.bincount(groves.flat[burning], minlength=num_groves + 1)
+        self.burnt_grove_sizes = sizes[struck]
+
+        cache.invalidate([self.burnable_state, self.burning_state])
         return states
 
+    def _tracker(self, burnable, structure):
+        """ The grove tracker, brought up to date with the burnable cells.
+        """
+        if structure is None:
+            structure = ndimage.generate_binary_structure(burnable.ndim, 1)
+        tracker = self._grove_tracker
+        if (tracker is None or tracker.mask.shape != burnable.shape or
+                not np.array_equal(tracker.structure, structure)):
+            tracker = self._grove_tracker = GroveTracker(burnable, structure)
+        else:
+            tracker.update(burnable)
+        return tracker
+
+    # Trait properties -------------------------------------------------------
+
+    def _get_stochastic(self):
+        return is_random(self.p_fire)
+
+    # Trait change handlers --------------------------------------------------
+
+    def _incremental_changed(self):
+        self._grove_tracker = None
+
 
 class MoldRule(CountNeighboursRule):
     """ A rule that kills overcrowded cells with some probability. """
@@ -134,30 +299,63 @@ class MoldRule(CountNeighboursRule):
     #: The number of neighbours required to make a tree susceptible to mold.
     critical_density = Int(3)
 
-    #: The probability of death if susceptible to mold.
-    p_mold = Probability(3e-3)
+    #: The probability of death if susceptible to mold.  When used with an
+    #: ensemble this may be an array holding a probability for each replica.
+    p_mold = ReplicaProbability(3e-3)
+
+    # AbstractRule Traits ----------------------------------------------------
+
+    #: This rule modifies the states passed to it.
+    in_place = Constant(True)
+
+    #: The rule is random unless the probabilities are all zero or one.
+    stochastic = Property(depends_on='p_mold')
 
     # ------------------------------------------------------------------------
     # AbstractRule interface
     # ------------------------------------------------------------------------
 
     def step(self, states):
-        states = super(MoldRule, self).step(states)
+        return self.step_cached(states, StatesCache(states))
 
-        live = (states == self.live_state)
-        count = self.count_neighbours(live)
+    def step_cached(self, states, cache):
+        states = super(MoldRule, self).step(states)
+        p_mold = scalar_parameter(self.p_mold)
+        return self._mold(states, p_mold, False, self.generator, cache)
+
+    def step_ensemble(self, states):
+        self.check_ensemble_states(states)
+        p_mold = replica_parameter(self.p_mold, states)
+        generators = self.child_generators(len(states))
+        return self._mold(
+            states, p_mold, True, generators, StatesCache(states)
+        )
 
-        mold = live & (count >= self.critical_density)
-        if self.p_mold < 1.0:
-            mold &= (np.random.uniform(size=states.shape) < self.p_mold)
+    # ------------------------------------------------------------------------
+    # Private interface
+    # ------------------------------------------------------------------------
 
-        states[mold] = self.dead_state
+    def _mold(self, states, p_mold, ensemble, generator, cache):
+        """ Kill crowded live cells with the given probability. """
+        live = cache.mask(self.live_state)
+        count = cache.neighbour_counts(self, self.live_state, ensemble)
 
+        mold = live & (count >= self.critical_density)
+        if np.any(p_mold < 1.0):
+            hits = bernoulli_hits(mold, p_mold, generator)
+            if len(hits) == 0:
+                return states
+            states.flat[hits] = self.dead_state
+        else:
+            states[mold] = self.dead_state
+
+        cache.invalidate([self.live_state, self.dead_state])
         return states
 
-    # ------------------------------------------------------------------------
-    # Private interface
-    # ------------------------------------------------------------------------
+    # Trait properties -------------------------------------------------------
+
+    def _get_stochastic(self):
+        return is_random(self.p_mold)
 
     # Trait defaults ---------------------------------------------------------
 
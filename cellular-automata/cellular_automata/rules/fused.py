@@ -0,0 +1,246 @@
+# Copyright (c) 2017, Enthought, Inc.
+# All rights reserved.
+#
+# This software is provided without warranty under the terms of the BSD
+# license included in LICENSE.txt and may be redistributed only
+# under the conditions described in the aforementioned license.  The license
+# is also available online at http://www.enthought.com/licenses/BSD.txt
+#
+# Thanks for using Enthought open source!
+"""
+This module provides a rule which applies a run of consecutive pointwise
+rules in a single pass over the states, and a function which fuses the
+pointwise rules in a list of rules.
+"""
+
+import numpy as np
+from traits.api import Constant, Instance, List, Property
+
+from cellular_automata.abstract_rule import (
+    AbstractRule, replica_parameter, scalar_parameter
+)
+from cellular_automata.sampling import bernoulli_positions
+from cellular_automata.states_cache import StatesCache
+
+#: The lookup table is applied with a masked assignment for each state that
+#: it changes when there are at most this many, since comparisons are much
+#: faster than gathering from the table.  Otherwise it is applied with
+#: :py:func:`numpy.take`.
+MAX_MASKED_STATES = 8
+
+
+class FusedPointwiseRule(AbstractRule):
+    """ Apply a run of pointwise rules with a single lookup table pass.
+
+    Applying each pointwise rule separately costs a comparison and a masked
+    assignment over the whole states array per rule.  Instead, the tables of
+    the rules which always apply are composed into a single 256-entry lookup
+    table, which is applied in one pass.
+
+    Each stochastic rule makes its random choices up front with its own
+    generator, which gives the cells that it may change, so it never needs
+    to compare the whole states array.  Only the chosen cells are put
+    through the full sequence of rules, so the results are exactly the same
+    as applying the rules one after another.
+    """
+
+    # FusedPointwiseRule Traits ----------------------------------------------
+
+    #: The pointwise rules, in the order that they are applied.
+    rules = List(Instance(AbstractRule))
+
+    # AbstractRule Traits ----------------------------------------------------
+
+    #: This rule modifies the states passed to it.
+    in_place = Constant(True)
+
+    #: Each cell only depends on its own state.
+    halo = Constant(0)
+
+    #: The rule is random if any of the fused rules are.
+    stochastic = Property
+
+    #: The generator of the first stochastic rule, from which the streams
+    #: for tiles are spawned.  The fused rules keep their own generators.
+    generator = Property
+
+    # ------------------------------------------------------------------------
+    # FusedPointwiseRule interface
+    # ------------------------------------------------------------------------
+
+    def lookup_table(self):
+        """ The table of new states for the cells which no random choice
+        picks, composed from the tables of the fused rules.
+
+        Returns
+        -------
+        table : array
+            A 256-entry uint8 array holding the new value for each state.
+        """
+        table = np.arange(256, dtype='uint8')
+        for rule in self.rules:
+            rule_table, p = rule.pointwise_transition()
+            if np.all(np.asarray(p) >= 1.0):
+                table = rule_table[table]
+        return table
+
+    # ------------------------------------------------------------------------
+    # AbstractRule interface
+    # ------------------------------------------------------------------------
+
+    def step(self, states):
+        return self.step_cached(states, StatesCache(states))
+
+    def step_cached(self, states, cache):
+        states = super(FusedPointwiseRule, self).step(states)
+        transitions = [rule.pointwise_transition() for rule in self.rules]
+        transitions = [
+            (table, scalar_parameter(p)) for table, p in transitions
+        ]
+        generators = [rule.generator for rule in self.rules]
+        return self._apply(states, transitions, generators, cache)
+
+    def step_ensemble(self, states):
+        self.check_ensemble_states(states)
+        transitions = [rule.pointwise_transition() for rule in self.rules]
+        transitions = [
+            (table, replica_parameter(p, states)) for table, p in transitions
+        ]
+        generators = [
+            rule.child_generators(len(states)) for rule in self.rules
+        ]
+        return self._apply(
+            states, transitions, generators, StatesCache(states)
+        )
+
+    def child_generators(self, n):
+        return self._stream_rule().child_generators(n)
+
+    def clone_with_generator(self, generator):
+        """ A copy of the rule whose fused rules draw from child streams of
+        a different generator.
+
+        Parameters
+        ----------
+        generator : Generator
+            The generator from which to spawn the streams for the copy.
+
+        Returns
+        -------
+        rule : FusedPointwiseRule
+            A copy of the rule with copies of the fused rules.
+        """
+        children = generator.spawn(len(self.rules))
+        return FusedPointwiseRule(rules=[
+            rule.clone_with_generator(child)
+            for rule, child in zip(self.rules, children)
+        ])
+
+    def check_states(self, states):
+        super(FusedPointwiseRule, self).check_states(states)
+        for rule in self.rules:
+            rule.check_states(states)
+
+    # ------------------------------------------------------------------------
+    # Private interface
+    # ------------------------------------------------------------------------
+
+    def _apply(self, states, transitions, generators, cache):
+        """ Apply the tables of the fused rules to the states in place. """
+        identity = np.arange(256, dtype='uint8')
+        table = identity
+        steps = []
+        changed = np.zeros(256, dtype=bool)
+        for (rule_table, p), generator in zip(transitions, generators):
+            if np.all(p <= 0.0):
+                continue
+            sources = rule_table != identity
+            changed[sources] = True
+            changed[rule_table[sources]] = True
+            if np.all(p >= 1.0):
+                table = rule_table[table]
+                steps.append((rule_table, None))
+            else:
+                positions = bernoulli_positions(states.shape, p, generator)
+                steps.append((rule_table, positions))
+
+        chosen = None
+        drawn = [
+            positions for _, positions in steps if positions is not None
+        ]
+        if drawn:
+            # replay the full sequence of rules for the randomly chosen cells
+            chosen = np.sort(np.concatenate(drawn))
+            if len(drawn) > 1:
+                chosen = chosen[np.r_[True, chosen[1:] != chosen[:-1]]]
+            values = states.flat[chosen]
+            for rule_table, positions in steps:
+                if positions is None:
+                    values = rule_table[values]
+                else:
+                    selected = np.searchsorted(chosen, positions)
+                    values[selected] = rule_table[values[selected]]
+
+        _apply_table(table, states, cache)
+        if chosen is not None:
+            states.flat[chosen] = values
+        cache.invalidate(np.flatnonzero(changed).tolist())
+        return states
+
+    def _stream_rule(self):
+        """ The rule whose generator is shared by the fused rule. """
+        for rule in self.rules:
+            if rule.stochastic:
+                return rule
+        return self.rules[0]
+
+    # Trait properties -------------------------------------------------------
+
+    def _get_stochastic(self):
+        return any(rule.stochastic for rule in self.rules)
+
+    def _get_generator(self):
+        return self._stream_rule().generator
+
+
+def _apply_table(table, states, cache):
+    """ Replace each state with its entry in a lookup table, in place. """
+    changed = np.flatnonzero(table != np.arange(256)).tolist()
+    if len(changed) > MAX_MASKED_STATES:
+        np.take(table, states, out=states, mode='clip')
+    else:
+        masks = [cache.mask(value) for value in changed]
+        for value, mask in zip(changed, masks):
+            states[mask] = table[value]
+
+
+def fuse_pointwise_rules(rules):
+    """ Replace runs of consecutive pointwise rules by fused rules.
+
+    Rules which are not pointwise, such as neighbourhood rules, are barriers
+    which are left as they are.  Single pointwise rules are also left alone.
+
+    Parameters
+    ----------
+    rules : list of AbstractRule
+        The rules to apply, in order.
+
+    Returns
+    -------
+    plan : list of AbstractRule
+        Rules which have the same effect when applied in order.
+    """
+    plan = []
+    run = []
+    for rule in list(rules) + [None]:
+        if rule is not None and rule.pointwise_transition() is not None:
+            run.append(rule)
+            continue
+        if len(run) > 1:
+            plan.append(FusedPointwiseRule(rules=run))
+        else:
+            plan.extend(run)
+        run = []
+        if rule is not None:
+            plan.append(rule)
+    return plan
@@ -0,0 +1,288 @@
+# Copyright (c) 2017, Enthought, Inc.
+# All rights reserved.
+#
+# This software is provided without warranty under the terms of the BSD
+# license included in LICENSE.txt and may be redistributed only
+# under the conditions described in the aforementioned license.  The license
+# is also available online at http://www.enthought.com/licenses/BSD.txt
+#
+# Thanks for using Enthought open source!
+"""
+This module provides a tracker which keeps the connected components of a
+mask up to date as cells are added and removed, so that rules which act on
+whole groves don't need to relabel the whole grid every tick.
+"""
+
+import numpy as np
+from scipy import ndimage
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+#: If more than this fraction of the cells change between updates, the
+#: components are relabelled from scratch.
+MAX_CHANGED_FRACTION = 0.1
+
+#: If the components which may have been split by removed cells cover more
+#: than this fraction of the grid, the components are relabelled from
+#: scratch rather than relabelling each of them.
+MAX_RELABEL_FRACTION = 0.5
+
+
+class GroveTracker(object):
+    """ Incrementally tracked connected components of a mask.
+
+    Each cell of the mask holds a label, and a union-find table maps labels
+    to the root label of their component, with every path fully compressed.
+    The size and bounding box of each component are kept at its root.
+
+    When cells are added, each is given a new label, and the labels which
+    the new cells connect are merged in one vectorized pass over the new
+    cells and their neighbours.  When cells are removed, components which
+    lose all their cells simply disappear, and components which may have
+    been split are relabelled within their bounding boxes.  Burning a
+    component only touches its bounding box.
+
+    Finding which cells changed still takes one cheap comparison of the
+    whole mask with the previous mask, since the rules which change the
+    states don't report their changes.
+
+    Parameters
+    ----------
+    mask : array of bool
+        The cells to label.
+    structure : array of bool
+        The connectivity structure, as for :py:func:`scipy.ndimage.label`.
+    """
+
+    def __init__(self, mask, structure):
+        #: The connectivity structure.
+        self.structure = np.asarray(structure, dtype=bool)
+
+        #: The offsets of the neighbours of a cell.
+        centre = np.array(self.structure.shape) // 2
+        offsets = np.argwhere(self.structure) - centre
+        self.offsets = offsets[np.any(offsets != 0, axis=1)]
+
+        self.rebuild(mask)
+
+    def rebuild(self, mask):
+        """ Label the components of a mask from scratch.
+
+        Parameters
+        ----------
+        mask : array of bool
+            The cells to label.
+        """
+        #: The tracked mask.
+        self.mask = np.array(mask, dtype=bool)
+
+        labels, n_components = ndimage.label(self.mask, self.structure)
+
+        #: The label of each cell, or 0 for cells outside the mask.
+        self.labels = labels
+
+        #: The root label of the component of each label.
+        self.roots = np.arange(n_components + 1)
+
+        #: The number of cells of each root's component.
+        self.sizes = np.bincount(labels.ravel(), minlength=n_components + 1)
+        self.sizes[0] = 0
+
+        #: The bounding box of each root's component, as lower and
+        #: exclusive upper corners.
+        self.lower = np.zeros((n_components + 1, labels.ndim), dtype=int)
+        self.upper = np.zeros((n_components + 1, labels.ndim), dtype=int)
+        for label, box in enumerate(ndimage.find_objects(labels), 1):
+            self.lower[label] = [index.start for index in box]
+            self.upper[label] = [index.stop for index in box]
+
+    def update(self, mask):
+        """ Bring the components up to date with a new mask.
+
+        Parameters
+        ----------
+        mask : array of bool
+            The new cells to label, with the same shape as the old mask.
+        """
+        mask = np.asarray(mask, dtype=bool)
+        changed = np.flatnonzero(mask != self.mask)
+        if len(changed) == 0:
+            return
+        if len(changed) > MAX_CHANGED_FRACTION * mask.size:
+            self.rebuild(mask)
+            return
+
+        now_set = mask.flat[changed]
+        self.mask.flat[changed] = now_set
+        if not self._remove(changed[~now_set]):
+            self.rebuild(self.mask)
+            return
+        self._add(changed[now_set])
+
+        # compact the table once it holds more labels than cells
+        if len(self.roots) > self.mask.size:
+            self.rebuild(self.mask)
+
+    def burn(self, cells):
+        """ Remove the components containing some cells from the mask.
+
+        Parameters
+        ----------
+        cells : array of int
+            Flat indices of cells.  Cells outside the mask are ignored.
+
+        Returns
+        -------
+        burnt : array of int
+            Flat indices of every cell in the components.
+        sizes : array of int
+            The number of cells in each component, in order of root label.
+        """
+        roots = np.unique(self.roots[self.labels.flat[cells]])
+        roots = roots[roots != 0]
+        sizes = self.sizes[roots]
+        if len(roots) == 0:
+            return np.zeros(0, dtype=np.intp), sizes
+
+        # scan either the box around all the components, or each box
+        lower = self.lower[roots]
+        upper = self.upper[roots]
+        union_area = np.prod(upper.max(axis=0) - lower.min(axis=0))
+        if union_area <= np.prod(upper - lower, axis=1).sum():
+            table = np.zeros(len(self.roots), dtype=bool)
+            table[roots] = True
+            regions = [(lower.min(axis=0), upper.max(axis=0), table)]
+        else:
+            regions = [
+                (lower[i], upper[i], root) for i, root in enumerate(roots)
+            ]
+
+        burnt = []
+        for low, high, selection in regions:
+            box = tuple(slice(start, stop) for start, stop in zip(low, high))
+            box_roots = self.roots[self.labels[box]]
+            if isinstance(selection, np.ndarray):
+                inside = selection[box_roots]
+            else:
+                inside = box_roots == selection
+            position = tuple(
+                index + start for index, start in zip(np.nonzero(inside), low)
+            )
+            burnt.append(np.ravel_multi_index(position, self.mask.shape))
+        burnt = np.concatenate(burnt)
+
+        self.labels.flat[burnt] = 0
+        self.mask.flat[burnt] = False
+        self.sizes[roots] = 0
+        return burnt, sizes
+
+    # ------------------------------------------------------------------------
+    # Private interface
+    # ------------------------------------------------------------------------
+
+    def _remove(self, cells):
+        """ Remove cells, relabelling components which may have split.
+
+        Returns False if relabelling would cover too much of the grid.
+        """
+        if len(cells) == 0:
+            return True
+        roots, counts = np.unique(
+            self.roots[self.labels.flat[cells]], return_counts=True
+        )
+        self.labels.flat[cells] = 0
+        self.sizes[roots] -= counts
+
+        # components which lost all their cells can't have split
+        split = roots[self.sizes[roots] > 0]
+        areas = np.prod(self.upper[split] - self.lower[split], axis=1)
+        if areas.sum() > MAX_RELABEL_FRACTION * self.mask.size:
+            return False
+        for root in split:
+            self._relabel(root)
+        return True
+
+    def _relabel(self, root):
+        """ Relabel the cells of a component within its bounding box. """
+        low = self.lower[root]
+        box = tuple(
+            slice(start, stop) for start, stop in zip(low, self.upper[root])
+        )
+        box_labels = self.labels[box]
+        inside = self.roots[box_labels] == root
+        pieces, n_pieces = ndimage.label(inside, self.structure)
+        if n_pieces <= 1:
+            return
+
+        sizes = np.bincount(pieces.ravel(), minlength=n_pieces + 1)[1:]
+        lower = np.empty((n_pieces, len(low)), dtype=int)
+        upper = np.empty((n_pieces, len(low)), dtype=int)
+        for i, piece_box in enumerate(ndimage.find_objects(pieces)):
+            lower[i] = [index.start for index in piece_box]
+            upper[i] = [index.stop for index in piece_box]
+        labels = self._new_labels(sizes, lower + low, upper + low)
+        box_labels[inside] = labels[pieces[inside] - 1]
+        self.sizes[root] = 0
+
+    def _add(self, cells):
+        """ Add cells, merging the components that they connect. """
+        if len(cells) == 0:
+            return
+        shape = np.array(self.mask.shape)
+        position = np.column_stack(np.unravel_index(cells, self.mask.shape))
+        labels = self._new_labels(
+            np.ones(len(cells), dtype=int), position, position + 1
+        )
+        self.labels.flat[cells] = labels
+
+        # link each new cell to the labelled cells around it
+        sources = []
+        targets = []
+        for offset in self.offsets:
+            neighbours = position + offset
+            valid = np.all((neighbours >= 0) & (neighbours < shape), axis=1)
+            neighbour_labels = self.labels.flat[
+                np.ravel_multi_index(neighbours[valid].T, self.mask.shape)
+            ]
+            linked = neighbour_labels != 0
+            sources.append(labels[valid][linked])
+            targets.append(neighbour_labels[linked])
+        sources = self.roots[np.concatenate(sources)]
+        targets = self.roots[np.concatenate(targets)]
+        if len(sources) == 0:
+            return
+
+        # merge the roots which are linked into the smallest of them
+        nodes, inverse = np.unique(
+            np.concatenate([sources, targets]), return_inverse=True
+        )
+        n_links = len(sources)
+        graph = coo_matrix(
+            (np.ones(n_links), (inverse[:n_links], inverse[n_links:])),
+            shape=(len(nodes), len(nodes)),
+        )
+        n_components, component = connected_components(graph, directed=False)
+        merged_roots = np.full(n_components, len(self.roots))
+        np.minimum.at(merged_roots, component, nodes)
+        new_roots = merged_roots[component]
+
+        moved = nodes != new_roots
+        old, new = nodes[moved], new_roots[moved]
+        np.add.at(self.sizes, new, self.sizes[old])
+        np.minimum.at(self.lower, new, self.lower[old])
+        np.maximum.at(self.upper, new, self.upper[old])
+        self.sizes[old] = 0
+
+        remap = np.arange(len(self.roots))
+        remap[nodes] = new_roots
+        self.roots = remap[self.roots]
+
+    def _new_labels(self, sizes, lower, upper):
+        """ Append labels which are their own roots, returning them. """
+        start = len(self.roots)
+        labels = np.arange(start, start + len(sizes))
+        self.roots = np.concatenate([self.roots, labels])
+        self.sizes = np.concatenate([self.sizes, sizes])
+        self.lower = np.concatenate([self.lower, lower])
+        self.upper = np.concatenate([self.upper, upper])
+        return labels
@@ -0,0 +1,207 @@
+# Copyright (c) 2017, Enthought, Inc.
+# All rights reserved.
+#
+# This software is provided without warranty under the terms of the BSD
+# license included in LICENSE.txt and may be redistributed only
+# under the conditions described in the aforementioned license.  The license
+# is also available online at http://www.enthought.com/licenses/BSD.txt
+#
+# Thanks for using Enthought open source!
+
+import numpy as np
+from traits.api import (
+    Array, Bool, Constant, Enum, Int, Property, Range, cached_property
+)
+
+from .base_rules import PAD_MODES, NDimRule
+
+#: The largest lookup table that a rule may use.
+MAX_TABLE_SIZE = 2**24
+
+
+class KColor1DRule(NDimRule):
+    """ Rule implementing a 1D cellular automaton with k colors and radius r.
+
+    The states hold the colors ``0`` to ``n_colors - 1`` directly.  This
+    uses Wolfram's numbering scheme: the digits of the rule number in base
+    ``n_colors``, least significant first, give the new color for each
+    neighbourhood index.  For a general rule, the index is the
+    neighbourhood's colors read as a base ``n_colors`` number with the
+    leftmost cell most significant, so with 2 colors and radius 1 the rules
+    are the same as :py:class:`Elementary1DRule`.  For a totalistic rule,
+    the index is the sum of the colors in the neighbourhood.
+
+    Each tick, the index of every cell is computed from shifted slices of a
+    padded copy of the line, and the new colors are gathered from a lookup
+    table which is only rebuilt when the rule changes.
+    """
+
+    # KColor1DRule Traits ----------------------------------------------------
+
+    #: The number of colors.
+    n_colors = Range(2, 256)
+
+    #: The number of cells on either side of a cell in its neighbourhood.
+    radius = Range(low=0, value=1)
+
+    #: Whether the new color only depends on the sum of the neighbourhood.
+    totalistic = Bool(False)
+
+    #: The number of the rule.
+    rule_number = Int(0)
+
+    #: The new color for each neighbourhood index.
+    lookup_table = Property(
+        Array(dtype='uint8', shape=(None,)),
+        depends_on='rule_number, n_colors, radius, totalistic',
+    )
+
+    #: The boundary mode to use.  Cells past the ends of the line are color
+    #: 0 for the 'empty' mode and color ``n_colors - 1`` for the 'filled'
+    #: mode.
+    boundary = Enum('empty', 'filled', 'nearest', 'wrap', 'reflect')
+
+    # NDimRule Traits --------------------------------------------------------
+
+    #: These are 1-dimensional only rules.
+    ndim = Constant(1)
+
+    # AbstractRule Traits ----------------------------------------------------
+
+    #: Cells depend on the cells within the radius.
+    halo = Property(depends_on='radius')
+
+    # ------------------------------------------------------------------------
+    # AbstractRule interface
+    # ------------------------------------------------------------------------
+
+    def step(self, states):
+        """ Apply the specified rule to the states.
+
+        Parameters
+        ----------
+        states : array
+            An array holding the current states of the automata.
+
+        Returns
+        -------
+        states : array
+            The new states of the automata after the rule has been applied.
+        """
+        states = super(NDimRule, self).step(states)
+        return self.step_into(states, np.empty_like(states))
+
+    def step_into(self, states, out):
+        """ Apply the specified rule to the states, writing into out.
+
+        Parameters
+        ----------
+        states : array
+            An array holding the current states of the automata.
+        out : array
+            An array of the same shape and dtype as states which will hold
+            the new states.
+
+        Returns
+        -------
+        out : array
+            The output array holding the new states of the automata.
+        """
+        self.check_states(states)
+        return self._apply(states, out)
+
+    def step_ensemble(self, states):
+        """ Apply the specified rule to each line in an ensemble.
+
+        Parameters
+        ----------
+        states : array
+            A 2D array holding the current states of each replica.
+
+        Returns
+        -------
+        states : array
+            The same array, holding the new states of each replica.
+        """
+        self.check_ensemble_states(states)
+        self._check_colors(states)
+        return self._apply(states, states)
+
+    def check_states(self, states):
+        """ Check that the states are a line of valid colors.
+
+        Parameters
+        ----------
+        states : array
+            An array holding the current states of the automata.
+
+        Raises
+        ------
+        ValueError
+            If the states are not 1-dimensional, or hold values which are
+            not colors.
+        """
+        super(KColor1DRule, self).check_states(states)
+        self._check_colors(states)
+
+    # ------------------------------------------------------------------------
+    # Private interface
+    # ------------------------------------------------------------------------
+
+    def _apply(self, states, out):
+        """ Apply the rule along the last axis of states, writing into out. """
+        table = self.lookup_table
+        r = self.radius
+        width = 2 * r + 1
+        n_cells = states.shape[-1]
+
+        padding = [(0, 0)] * (states.ndim - 1) + [(r, r)]
+        mode = PAD_MODES[self.boundary]
+        if mode == 'constant':
+            value = 0 if self.boundary == 'empty' else self.n_colors - 1
+            padded = np.pad(states, padding, mode=mode, constant_values=value)
+        else:
+            padded = np.pad(states, padding, mode=mode)
+
+        # the smallest dtype which holds every index
+        dtype = np.min_scalar_type(len(table) - 1)
+        index = padded[..., :n_cells].astype(dtype)
+        for j in range(1, width):
+            if not self.totalistic:
+                index *= dtype.type(self.n_colors)
+            index += padded[..., j:j + n_cells]
+
+        np.take(table, index, out=out)
+        return out
+
+    def _check_colors(self, states):
+        """ Raise a ValueError if the states hold values which aren't colors.
+        """
+        if states.size > 0 and states.max() >= self.n_colors:
+            msg = "States must be colors less than {}, but found {}."
+            raise ValueError(msg.format(self.n_colors, states.max()))
+
+    # Trait properties -------------------------------------------------------
+
+    @cached_property
+    def _get_lookup_table(self):
+        width = 2 * self.radius + 1
+        if self.totalistic:
+            size = width * (self.n_colors - 1) + 1
+        else:
+            size = self.n_colors ** width
+        if size > MAX_TABLE_SIZE:
+            msg = "Lookup table of {} entries is larger than the maximum {}."
+            raise ValueError(msg.format(size, MAX_TABLE_SIZE))
+        if not 0 <= self.rule_number < self.n_colors ** size:
+            msg = "Rule number must be between 0 and {}**{} - 1."
+            raise ValueError(msg.format(self.n_colors, size))
+
+        table = np.empty(size, dtype='uint8')
+        number = self.rule_number
+        for i in range(size):
+            number, table[i] = divmod(number, self.n_colors)
+        return table
+
+    def _get_halo(self):
+        return self.radius
@@ -14,9 +14,10 @@ Rules for implementing Conway's Game of Life and related cellular automata.
 
 import numpy as np
 
-from traits.api import Int, Set
+from traits.api import Constant, Int, Set
 
 from cellular_automata.automata_traits import StateValue
+from cellular_automata.states_cache import StatesCache
 from .base_rules import CountNeighboursRule
 
 
@@ -41,16 +42,35 @@ class LifeRule(CountNeighboursRule):
     #: The neighbour counts for a cell to survive.
     survive_counts = Set(Int, {2, 3})
 
+    # AbstractRule Traits ----------------------------------------------------
+
+    #: Neighbour counts are computed before any cells are changed, so the rule
+    #: can safely modify the states passed to it.
+    in_place = Constant(True)
+
     # ------------------------------------------------------------------------
     # AbstractRule interface
     # ------------------------------------------------------------------------
 
     def step(self, states):
-        states = super(LifeRule, self).step(states.copy())
+        return self.step_cached(states, StatesCache(states))
+
+    def step_cached(self, states, cache):
+        states = super(LifeRule, self).step(states)
+        return self._life(states, False, cache)
 
-        live = (states == self.live_state)
+    def step_ensemble(self, states):
+        self.check_ensemble_states(states)
+        return self._life(states, True, StatesCache(states))
+
+    # ------------------------------------------------------------------------
+    # Private interface
+    # ------------------------------------------------------------------------
 
-        counts = self.count_neighbours(live)
+    def _life(self, states, ensemble, cache):
+        """ Compute births and deaths and update the states in place. """
+        live = cache.mask(self.live_state)
+        counts = cache.neighbour_counts(self, self.live_state, ensemble)
         count_masks = {}
 
         born = np.zeros(states.shape, dtype=bool)
@@ -70,4 +90,6 @@ class LifeRule(CountNeighboursRule):
         states[born] = self.live_state
         states[died] = self.dead_state
 
+        # cells of any state may be born
+        cache.invalidate()
         return states
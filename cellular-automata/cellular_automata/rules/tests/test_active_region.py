@@ -0,0 +1,106 @@
+# Copyright (c) 2017, Enthought, Inc.
+# All rights reserved.
+#
+# This software is provided without warranty under the terms of the BSD
+# license included in LICENSE.txt and may be redistributed only
+# under the conditions described in the aforementioned license.  The license
+# is also available online at http://www.enthought.com/licenses/BSD.txt
+#
+# Thanks for using Enthought open source!
+
+from unittest import TestCase
+
+import numpy as np
+from numpy.testing import assert_array_equal
+
+from traits.testing.unittest_tools import UnittestTools
+
+from ..active_region import ActiveRegionRule
+from ..binary_morphology import BinaryMorphologyRule
+from ..change_state_rule import ChangeStateRule
+from ..forest import SlowBurnRule
+from ..life import LifeRule
+
+
+class TestActiveRegionRule(TestCase, UnittestTools):
+
+    def assert_matches(self, rule, states, n_steps, tile_size=8):
+        active_rule = ActiveRegionRule(
+            rule=rule, tile_size=tile_size, max_active_fraction=1.0,
+        )
+        expected = states.copy()
+        actual = states.copy()
+        for i in range(n_steps):
+            expected = rule.step(expected)
+            actual = active_rule.step(actual)
+            assert_array_equal(actual, expected)
+
+            # disturb the states, as another rule would
+            if i == n_steps // 2:
+                expected[5, 5] = actual[5, 5] = 1 - expected[5, 5]
+
+    def test_sparse_life(self):
+        np.random.seed(1)
+        states = np.zeros(shape=(40, 37), dtype='uint8')
+        states[2:10, 25:35] = np.random.uniform(size=(8, 10)) < 0.4
+        states[30:33, 1:4] = [[0, 1, 0], [0, 0, 1], [1, 1, 1]]
+
+        for boundary in ['empty', 'filled', 'nearest', 'wrap', 'reflect']:
+            rule = LifeRule(boundary=boundary)
+            self.assert_matches(rule, states, 30)
+
+    def test_slow_burn(self):
+        np.random.seed(2)
+        states = (np.random.uniform(size=(50, 50)) < 0.6).astype('uint8')
+        states[25, 25] = 2
+
+        self.assert_matches(SlowBurnRule(), states, 40, tile_size=5)
+
+    def test_morphology_halo(self):
+        states = np.zeros(shape=(30, 30), dtype='uint8')
+        states[10:20, 12:14] = 1
+        rule = BinaryMorphologyRule(operation='closing')
+
+        self.assert_matches(rule, states, 3, tile_size=4)
+
+    def test_wrapped_rule_changed(self):
+        np.random.seed(11)
+        states = (np.random.uniform(size=(48, 48)) < 0.4).astype('uint8')
+        rule = LifeRule()
+        active_rule = ActiveRegionRule(
+            rule=rule, tile_size=4, max_active_fraction=1.0,
+        )
+        for i in range(100):
+            states = active_rule.step(states)
+
+        # settled tiles must be updated with the new parameters
+        rule.survive_counts = {2}
+        expected = states.copy()
+        actual = states.copy()
+        for i in range(5):
+            expected = rule.step(expected)
+            actual = active_rule.step(actual)
+
+        assert_array_equal(actual, expected)
+
+    def test_requires_deterministic_local_rule(self):
+        states = np.zeros(shape=(10, 10), dtype='uint8')
+
+        with self.assertRaises(ValueError):
+            ActiveRegionRule(rule=ChangeStateRule(p_change=0.5)).step(states)
+
+        with self.assertRaises(ValueError):
+            rule = BinaryMorphologyRule(operation='fill_holes')
+            ActiveRegionRule(rule=rule).step(states)
+
+    def test_only_active_tiles(self):
+        states = np.zeros(shape=(64, 64), dtype='uint8')
+        states[1:4, 1:4] = [[0, 1, 0], [0, 0, 1], [1, 1, 1]]
+        rule = ActiveRegionRule(rule=LifeRule(), tile_size=16)
+
+        rule.step(states)
+        active = rule.active_tiles(states)
+
+        self.assertEqual(active.shape, (4, 4))
+        self.assertEqual(active.sum(), 4)
+        self.assertTrue(active[:2, :2].all())
@@ -8,6 +8,7 @@
 #
 # Thanks for using Enthought open source!
 
+import threading
 from unittest import TestCase
 
 import numpy as np
@@ -28,3 +29,130 @@ class TestCountNeighboursRule(TestCase, UnittestTools):
         counts = rule.count_neighbours(mask)
 
         assert_array_equal(counts, [[3, 5, 3], [5, 8, 5], [3, 5, 3]])
+
+    def assert_incremental_matches(self, structure, shape, ensemble=False):
+        generator = np.random.default_rng(5)
+        mask = generator.random(shape) < 0.3
+        for boundary in ['empty', 'filled', 'nearest', 'wrap', 'reflect']:
+            full = CountNeighboursRule(structure=structure, boundary=boundary)
+            incremental = CountNeighboursRule(
+                structure=structure, boundary=boundary, incremental=True,
+                resync_interval=1000, max_changed_fraction=1.0,
+            )
+            current = mask.copy()
+            for i in range(20):
+                counts = incremental.count_neighbours(current, ensemble)
+                assert_array_equal(
+                    counts, full.count_neighbours(current, ensemble)
+                )
+                # flip a few cells, including some on the edges
+                flips = generator.integers(0, current.size, size=5)
+                current.flat[flips] = ~current.flat[flips]
+                current[(0,) * current.ndim] ^= True
+                current[(-1,) * current.ndim] ^= bool(i % 2)
+
+    def test_incremental(self):
+        self.assert_incremental_matches(np.ones((3, 3), dtype=bool), (9, 11))
+
+    def test_incremental_asymmetric_structure(self):
+        structure = np.zeros((5, 4), dtype=bool)
+        structure[0, 3] = structure[4, 0] = structure[2, 1] = True
+        self.assert_incremental_matches(structure, (12, 10))
+
+    def test_incremental_ensemble(self):
+        self.assert_incremental_matches(
+            np.ones((3, 3), dtype=bool), (3, 8, 7), ensemble=True,
+        )
+
+    def test_incremental_resync(self):
+        rule = CountNeighboursRule(incremental=True, resync_interval=2)
+        mask = np.zeros((6, 6), dtype=bool)
+        rule.count_neighbours(mask)
+        key = (threading.get_ident(), None, False)
+        tracked = rule._incremental_counts[key]
+
+        mask[2, 2] = True
+        counts = rule.count_neighbours(mask)
+        self.assertIs(rule._incremental_counts[key], tracked)
+        self.assertEqual(counts[1, 1], 1)
+        with self.assertRaises(ValueError):
+            counts[1, 1] = 0
+
+        rule.count_neighbours(mask)
+        rule.count_neighbours(mask)
+        self.assertIsNot(rule._incremental_counts[key], tracked)
+
+        # changing the boundary forgets the counts
+        rule.boundary = 'wrap'
+        self.assertIsNone(rule._incremental_counts)
+
+    def assert_strategies_match(self, structure, shape=(23, 19), **traits):
+        generator = np.random.default_rng(6)
+        mask = generator.random(shape) < 0.4
+        ensemble = len(shape) > structure.ndim
+        for boundary in ['empty', 'filled', 'nearest', 'wrap', 'reflect']:
+            expected = CountNeighboursRule(
+                structure=structure, boundary=boundary, strategy='direct',
+            ).count_neighbours(mask, ensemble).astype(int)
+            for strategy in ['auto', 'fft'] + traits.get('strategies', []):
+                rule = CountNeighboursRule(
+                    structure=structure, boundary=boundary, strategy=strategy,
+                )
+                counts = rule.count_neighbours(mask, ensemble)
+                self.assertEqual(counts.dtype, rule.count_dtype)
+                assert_array_equal(counts, expected)
+
+    def test_strategies_box(self):
+        self.assert_strategies_match(
+            np.ones((5, 7), dtype=bool), strategies=['separable', 'box'],
+        )
+        structure = np.ones((3, 3), dtype=bool)
+        structure[1, 1] = False
+        self.assert_strategies_match(
+            structure, strategies=['separable', 'box'],
+        )
+        self.assert_strategies_match(
+            np.ones((4, 2), dtype=bool), strategies=['separable', 'box'],
+        )
+
+    def test_strategies_separable(self):
+        structure = np.multiply.outer(
+            np.array([1, 1, 0], dtype=bool), np.array([1, 0, 1, 1], bool)
+        )
+        self.assert_strategies_match(structure, strategies=['separable'])
+        structure[1, 2] = False
+        self.assert_strategies_match(structure, strategies=['separable'])
+
+    def test_strategies_ensemble(self):
+        self.assert_strategies_match(
+            np.ones((3, 3), dtype=bool), shape=(3, 9, 8),
+            strategies=['separable', 'box'],
+        )
+
+    def test_strategies_not_separable(self):
+        y, x = np.mgrid[-5:6, -5:6]
+        disc = x**2 + y**2 <= 25
+        self.assert_strategies_match(disc)
+
+        rule = CountNeighboursRule(structure=disc, strategy='separable')
+        with self.assertRaises(ValueError):
+            rule.count_neighbours(np.zeros((4, 4), dtype=bool))
+
+    def test_auto_strategy(self):
+        rule = CountNeighboursRule()
+        self.assertEqual(rule.selected_strategy, 'box')
+        self.assertEqual(rule.count_dtype, np.uint8)
+
+        rule.structure = np.eye(3, dtype=bool)
+        self.assertEqual(rule.selected_strategy, 'direct')
+
+        rule.structure = np.ones((21, 21), dtype=bool)
+        self.assertEqual(rule.selected_strategy, 'box')
+        self.assertEqual(rule.count_dtype, np.uint16)
+
+        counts = rule.count_neighbours(np.ones((30, 30), dtype=bool))
+        self.assertEqual(counts[15, 15], 441)
+
+        y, x = np.mgrid[-10:11, -10:11]
+        rule.structure = x**2 + y**2 <= 100
+        self.assertEqual(rule.selected_strategy, 'fft')
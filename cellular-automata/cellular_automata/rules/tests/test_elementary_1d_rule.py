@@ -12,12 +12,50 @@ from unittest import TestCase
 
 import numpy as np
 from numpy.testing import assert_array_equal
+from scipy import ndimage
 from traits.testing.unittest_tools import UnittestTools
 
 from ..elementary_1d_rule import Elementary1DRule
 
+
+def reference_step(rule, states):
+    """ Apply the rule using a generic filter over each neighbourhood. """
+    mode, cval = rule.boundary, 0
+    if rule.boundary == 'empty':
+        mode = 'constant'
+    elif rule.boundary == 'filled':
+        mode, cval = 'constant', 1
+
+    def kernel(iline, oline):
+        index = iline[:-2] * 4 + iline[1:-1] * 2 + iline[2:]
+        oline[...] = rule.bit_mask[index.astype('uint8')]
+
+    filled = ndimage.generic_filter1d(
+        states == rule.filled_state, kernel, filter_size=3, mode=mode,
+        cval=cval,
+    )
+    return np.where(filled, rule.filled_state, rule.empty_state)
+
+
 class TestElementary1DRule(TestCase, UnittestTools):
 
+    def test_matches_reference(self):
+        generator = np.random.default_rng(1)
+        states = generator.integers(0, 3, size=(4, 37), dtype='uint8')
+        for boundary in ['empty', 'filled', 'nearest', 'wrap', 'reflect']:
+            for rule_number in range(256):
+                rule = Elementary1DRule(
+                    rule_number=rule_number, boundary=boundary,
+                    empty_state=2, filled_state=1,
+                )
+                expected = [reference_step(rule, line) for line in states]
+
+                for line, expected_line in zip(states, expected):
+                    assert_array_equal(rule.step(line.copy()), expected_line)
+                ensemble = states.copy()
+                rule.step_ensemble(ensemble)
+                assert_array_equal(ensemble, expected)
+
     def test_check_states(self):
         rule = Elementary1DRule()
 
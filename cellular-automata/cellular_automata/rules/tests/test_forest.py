@@ -0,0 +1,158 @@
+# Copyright (c) 2017, Enthought, Inc.
+# All rights reserved.
+#
+# This software is provided without warranty under the terms of the BSD
+# license included in LICENSE.txt and may be redistributed only
+# under the conditions described in the aforementioned license.  The license
+# is also available online at http://www.enthought.com/licenses/BSD.txt
+#
+# Thanks for using Enthought open source!
+
+from unittest import TestCase
+
+import numpy as np
+from numpy.testing import assert_array_equal
+from scipy import ndimage
+
+from traits.testing.unittest_tools import UnittestTools
+
+from cellular_automata.cellular_automaton import CellularAutomaton
+from cellular_automata.sampling import bernoulli_hits
+from ..change_state_rule import ChangeStateRule
+from ..forest import BurnGrovesRule, MoldRule, SlowBurnRule
+
+
+def reference_burn_groves(states, p_fire, generator):
+    """ Burn each struck grove in turn, returning the states and sizes. """
+    burnable = states == 1
+    strikes = bernoulli_hits(burnable, p_fire, generator)
+    groves, num_groves = ndimage.label(burnable)
+    sizes = []
+    for grove in np.unique(groves.flat[strikes]):
+        sizes.append(np.sum(groves == grove))
+        states[groves == grove] = 2
+    return states, sizes
+
+
+class TestSlowBurnRule(TestCase, UnittestTools):
+
+    def setUp(self):
+        generator = np.random.default_rng(2)
+        self.states = generator.choice(
+            4, size=(40, 50), p=[0.3, 0.6, 0.02, 0.08]
+        ).astype('uint8')
+
+    def assert_frontier_matches_dense(self, states, n_steps, ensemble=False,
+                                      **traits):
+        results = []
+        for fraction in [0.0, 1.0]:
+            rule = SlowBurnRule(max_frontier_fraction=fraction, **traits)
+            result = states.copy()
+            for i in range(n_steps):
+                if ensemble:
+                    result = rule.step_ensemble(result)
+                else:
+                    result = rule.step(result)
+            results.append(result)
+
+        self.assertFalse(np.array_equal(results[0], states))
+        assert_array_equal(results[1], results[0])
+
+    def test_frontier_matches_dense(self):
+        self.assert_frontier_matches_dense(self.states, 15)
+
+    def test_asymmetric_structure(self):
+        structure = np.array([
+            [0, 1, 1, 0],
+            [0, 0, 0, 1],
+            [1, 0, 0, 0],
+        ], dtype=bool)
+
+        self.assert_frontier_matches_dense(
+            self.states, 10, structure=structure
+        )
+
+    def test_ensemble(self):
+        states = np.stack([self.states, self.states[::-1]])
+
+        self.assert_frontier_matches_dense(states, 10, ensemble=True)
+
+    def test_switch_to_dense(self):
+        rule = SlowBurnRule(max_frontier_fraction=0.05)
+        expected_rule = SlowBurnRule(max_frontier_fraction=0.0)
+        states = self.states.copy()
+        expected = self.states.copy()
+        states[10:30, 10:30] = 2
+        expected[10:30, 10:30] = 2
+
+        for i in range(10):
+            states = rule.step(states)
+            expected = expected_rule.step(expected)
+
+        assert_array_equal(states, expected)
+
+
+class TestBurnGrovesRule(TestCase, UnittestTools):
+
+    def setUp(self):
+        generator = np.random.default_rng(0)
+        self.states = (generator.random((60, 80)) < 0.55).astype('uint8')
+
+    def test_burn_groves(self):
+        for p_fire in [0.001, 0.01, 0.5, 1.0]:
+            rule = BurnGrovesRule(
+                p_fire=p_fire, generator=np.random.default_rng(1)
+            )
+            expected, sizes = reference_burn_groves(
+                self.states.copy(), p_fire, np.random.default_rng(1)
+            )
+
+            result = rule.step(self.states.copy())
+
+            assert_array_equal(result, expected)
+            assert_array_equal(rule.burnt_grove_sizes, sizes)
+        self.assertGreater(len(sizes), 1)
+
+    def test_no_strikes(self):
+        rule = BurnGrovesRule(p_fire=0.0)
+
+        result = rule.step(self.states.copy())
+
+        assert_array_equal(result, self.states)
+        self.assertEqual(len(rule.burnt_grove_sizes), 0)
+
+    def test_ensemble_sizes(self):
+        states = np.ones((2, 5, 5), dtype='uint8')
+        states[:, 2, :] = 0
+        rule = BurnGrovesRule(p_fire=np.array([1.0, 0.0]))
+
+        rule.step_ensemble(states)
+
+        # the groves of the second replica are never struck
+        assert_array_equal(rule.burnt_grove_sizes, [10, 10])
+        assert_array_equal(states[0], np.where(states[0] == 0, 0, 2))
+        self.assertFalse(np.any(states[1] == 2))
+
+    def test_incremental(self):
+        rules = [
+            ChangeStateRule(from_state=2, to_state=0),
+            ChangeStateRule(from_state=0, to_state=1, p_change=0.02),
+            BurnGrovesRule(p_fire=0.0005),
+            MoldRule(p_mold=0.01),
+        ]
+        results = []
+        for incremental in [False, True]:
+            rules[2].incremental = incremental
+            automaton = CellularAutomaton(
+                states=self.states.copy(), rules=rules, seed=5,
+            )
+            automaton.start()
+            sizes = []
+            for i in range(60):
+                automaton.step()
+                sizes.append(sorted(rules[2].burnt_grove_sizes))
+            results.append((automaton.states, sizes))
+
+        assert_array_equal(results[1][0], results[0][0])
+        self.assertEqual(results[1][1], results[0][1])
+        self.assertTrue(any(results[0][1]))
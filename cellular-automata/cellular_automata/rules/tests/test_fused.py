@@ -0,0 +1,124 @@
+# Copyright (c) 2017, Enthought, Inc.
+# All rights reserved.
+#
+# This software is provided without warranty under the terms of the BSD
+# license included in LICENSE.txt and may be redistributed only
+# under the conditions described in the aforementioned license.  The license
+# is also available online at http://www.enthought.com/licenses/BSD.txt
+#
+# Thanks for using Enthought open source!
+
+from unittest import TestCase
+
+import numpy as np
+from numpy.testing import assert_array_equal
+
+from traits.testing.unittest_tools import UnittestTools
+
+from cellular_automata.cellular_automaton import CellularAutomaton
+from cellular_automata.ensemble_automaton import EnsembleAutomaton
+from ..change_state_rule import ChangeStateRule
+from ..forest import BurnGrovesRule, MoldRule, SlowBurnRule
+from ..fused import FusedPointwiseRule, fuse_pointwise_rules
+
+
+def forest_rules():
+    """ The rules of the moldy forest example. """
+    return [
+        ChangeStateRule(from_state=3, to_state=0, p_change=1.0),
+        ChangeStateRule(from_state=2, to_state=0, p_change=1.0),
+        ChangeStateRule(from_state=0, to_state=1, p_change=0.05),
+        BurnGrovesRule(p_fire=0.01),
+        MoldRule(dead_state=3, p_mold=0.1),
+    ]
+
+
+class TestFusedPointwiseRule(TestCase, UnittestTools):
+
+    def assert_matches_unfused(self, rules, automaton_class, **traits):
+        results = []
+        for fuse_rules in [False, True]:
+            automaton = automaton_class(
+                rules=rules, fuse_rules=fuse_rules, seed=12, **traits
+            )
+            automaton.start()
+            automaton.run(20)
+            results.append(automaton.states)
+        self.assertTrue(np.any(results[0] != 0))
+        assert_array_equal(results[1], results[0])
+
+    def test_plan(self):
+        rules = forest_rules()
+
+        plan = fuse_pointwise_rules(rules)
+
+        self.assertEqual(len(plan), 3)
+        self.assertIsInstance(plan[0], FusedPointwiseRule)
+        self.assertEqual(plan[0].rules, rules[:3])
+        self.assertEqual(plan[1:], rules[3:])
+        self.assertTrue(plan[0].stochastic)
+
+        # the deterministic rules are composed into the lookup table
+        table = plan[0].lookup_table()
+        assert_array_equal(table[:5], [0, 1, 0, 0, 4])
+
+    def test_automaton_plan(self):
+        rules = [
+            ChangeStateRule(from_state=0, to_state=1),
+            SlowBurnRule(),
+            ChangeStateRule(from_state=1, to_state=2),
+            ChangeStateRule(from_state=2, to_state=3, p_change=0.5),
+        ]
+        automaton = CellularAutomaton(shape=(4, 4), rules=rules)
+
+        self.assertEqual(automaton.plan[:2], rules[:2])
+        self.assertIsInstance(automaton.plan[2], FusedPointwiseRule)
+
+        automaton.fuse_rules = False
+        self.assertEqual(automaton.plan, rules)
+
+        automaton.rules = rules[2:]
+        self.assertEqual(automaton.plan, rules[2:])
+        automaton.fuse_rules = True
+        self.assertEqual(len(automaton.plan), 1)
+
+    def test_deterministic(self):
+        states = np.arange(256, dtype='uint8').reshape(16, 16)
+        rule = FusedPointwiseRule(rules=[
+            ChangeStateRule(from_state=1, to_state=2),
+            ChangeStateRule(from_state=2, to_state=5),
+            ChangeStateRule(from_state=5, to_state=1),
+        ])
+
+        result = rule.step(states)
+
+        self.assertIs(result, states)
+        expected = np.arange(256, dtype='uint8')
+        # the rules are applied in order, so everything ends up as 1
+        expected[[2, 5]] = 1
+        assert_array_equal(result.ravel(), expected)
+
+    def test_matches_unfused(self):
+        self.assert_matches_unfused(
+            forest_rules(), CellularAutomaton, shape=(64, 64)
+        )
+
+    def test_matches_unfused_sparse_and_dense(self):
+        rules = [
+            ChangeStateRule(from_state=0, to_state=1, p_change=0.3),
+            ChangeStateRule(from_state=1, to_state=2, p_change=1e-3),
+            ChangeStateRule(from_state=2, to_state=0, p_change=0.5),
+            ChangeStateRule(from_state=1, to_state=3, p_change=1.0),
+            ChangeStateRule(from_state=3, to_state=1, p_change=0.02),
+        ]
+        self.assert_matches_unfused(rules, CellularAutomaton, shape=(50, 40))
+        self.assert_matches_unfused(
+            rules, CellularAutomaton, shape=(50, 40), double_buffered=True,
+        )
+
+    def test_matches_unfused_ensemble(self):
+        rules = forest_rules()
+        rules[2].p_change = np.array([0.0, 0.05, 1.0])
+        self.assert_matches_unfused(
+            rules, EnsembleAutomaton, n_replicas=3, replica_shape=(32, 32)
+        )
@@ -0,0 +1,104 @@
+# Copyright (c) 2017, Enthought, Inc.
+# All rights reserved.
+#
+# This software is provided without warranty under the terms of the BSD
+# license included in LICENSE.txt and may be redistributed only
+# under the conditions described in the aforementioned license.  The license
+# is also available online at http://www.enthought.com/licenses/BSD.txt
+#
+# Thanks for using Enthought open source!
+
+from unittest import TestCase
+
+import numpy as np
+from numpy.testing import assert_array_equal
+from scipy import ndimage
+
+from ..grove_tracker import GroveTracker
+
+#: The connectivity structure of the groves.
+STRUCTURE = ndimage.generate_binary_structure(2, 1)
+
+
+class TestGroveTracker(TestCase):
+
+    def setUp(self):
+        self.generator = np.random.default_rng(0)
+
+    def assert_components(self, tracker, mask):
+        expected, n_components = ndimage.label(mask, STRUCTURE)
+        roots = tracker.roots[tracker.labels]
+
+        assert_array_equal(tracker.mask, mask)
+        assert_array_equal(roots != 0, mask)
+        # the tracked components are the same partition of the cells
+        pairs = np.unique(
+            np.column_stack([roots[mask], expected[mask]]), axis=0
+        )
+        self.assertEqual(len(pairs), n_components)
+        self.assertEqual(len(np.unique(roots[mask])), n_components)
+
+        for root, label in pairs:
+            self.assertEqual(tracker.sizes[root], np.sum(expected == label))
+            cells = np.argwhere(expected == label)
+            self.assertTrue(np.all(cells >= tracker.lower[root]))
+            self.assertTrue(np.all(cells < tracker.upper[root]))
+
+    def test_rebuild(self):
+        mask = self.generator.random((30, 40)) < 0.5
+
+        tracker = GroveTracker(mask, STRUCTURE)
+
+        self.assert_components(tracker, mask)
+
+    def test_add_cells(self):
+        mask = self.generator.random((30, 40)) < 0.4
+        tracker = GroveTracker(mask, STRUCTURE)
+
+        for i in range(10):
+            mask = mask | (self.generator.random(mask.shape) < 0.01)
+            tracker.update(mask)
+
+            self.assert_components(tracker, mask)
+
+    def test_remove_cells(self):
+        mask = self.generator.random((30, 40)) < 0.6
+        tracker = GroveTracker(mask, STRUCTURE)
+
+        for i in range(10):
+            mask = mask & (self.generator.random(mask.shape) > 0.01)
+            tracker.update(mask)
+
+            self.assert_components(tracker, mask)
+
+    def test_burn(self):
+        mask = self.generator.random((30, 40)) < 0.55
+        tracker = GroveTracker(mask, STRUCTURE)
+        cells = self.generator.choice(mask.size, size=5, replace=False)
+        expected, n_components = ndimage.label(mask, STRUCTURE)
+        struck = np.unique(expected.flat[cells])
+        struck = struck[struck != 0]
+
+        burnt, sizes = tracker.burn(cells)
+
+        burning = np.isin(expected, struck)
+        assert_array_equal(np.sort(burnt), np.flatnonzero(burning))
+        expected_sizes = [np.sum(expected == grove) for grove in struck]
+        self.assertEqual(sorted(sizes), sorted(expected_sizes))
+        self.assert_components(tracker, mask & ~burning)
+
+    def test_mixed_changes(self):
+        mask = self.generator.random((50, 50)) < 0.5
+        tracker = GroveTracker(mask, STRUCTURE)
+
+        for i in range(20):
+            grown = self.generator.random(mask.shape) < 0.02
+            died = self.generator.random(mask.shape) < 0.005
+            mask = (mask | grown) & ~died
+            tracker.update(mask)
+            burnt, sizes = tracker.burn(
+                self.generator.choice(mask.size, size=2)
+            )
+            mask.flat[burnt] = False
+
+            self.assert_components(tracker, mask)
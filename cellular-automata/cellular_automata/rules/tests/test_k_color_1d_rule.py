@@ -0,0 +1,143 @@
+# Copyright (c) 2017, Enthought, Inc.
+# All rights reserved.
+#
+# This software is provided without warranty under the terms of the BSD
+# license included in LICENSE.txt and may be redistributed only
+# under the conditions described in the aforementioned license.  The license
+# is also available online at http://www.enthought.com/licenses/BSD.txt
+#
+# Thanks for using Enthought open source!
+
+from unittest import TestCase
+
+import numpy as np
+from numpy.testing import assert_array_equal
+from traits.testing.unittest_tools import UnittestTools
+
+from ..elementary_1d_rule import Elementary1DRule
+from ..k_color_1d_rule import KColor1DRule
+
+BOUNDARIES = ['empty', 'filled', 'nearest', 'wrap', 'reflect']
+
+
+def reference_step(rule, states):
+    """ Apply the rule one cell at a time. """
+    r = rule.radius
+    k = rule.n_colors
+    n_cells = len(states)
+    if rule.boundary == 'empty':
+        padded = np.pad(states, r, mode='constant', constant_values=0)
+    elif rule.boundary == 'filled':
+        padded = np.pad(states, r, mode='constant', constant_values=k - 1)
+    else:
+        mode = {'nearest': 'edge', 'wrap': 'wrap', 'reflect': 'symmetric'}
+        padded = np.pad(states, r, mode=mode[rule.boundary])
+
+    result = np.empty_like(states)
+    for i in range(n_cells):
+        neighbourhood = [int(value) for value in padded[i:i + 2 * r + 1]]
+        if rule.totalistic:
+            index = sum(neighbourhood)
+        else:
+            index = 0
+            for value in neighbourhood:
+                index = index * k + value
+        result[i] = (rule.rule_number // k**index) % k
+    return result
+
+
+def random_rule_number(generator, n_colors, size):
+    """ A random rule number with a number of base n_colors digits. """
+    rule_number = 0
+    for digit in generator.integers(0, n_colors, size=size):
+        rule_number = rule_number * n_colors + int(digit)
+    return rule_number
+
+
+class TestKColor1DRule(TestCase, UnittestTools):
+
+    def setUp(self):
+        self.generator = np.random.default_rng(0)
+
+    def test_lookup_table(self):
+        rule = KColor1DRule(n_colors=3, totalistic=True, rule_number=777)
+
+        # 777 = 1*3**6 + 1*3**3 + 2*3**2 + 1*3**1 + 0
+        assert_array_equal(rule.lookup_table, [0, 1, 2, 1, 0, 0, 1])
+
+        with self.assertTraitChanges(rule, 'lookup_table'):
+            rule.rule_number = 1
+        assert_array_equal(rule.lookup_table, [1, 0, 0, 0, 0, 0, 0])
+
+    def test_halo(self):
+        rule = KColor1DRule(radius=3)
+
+        self.assertEqual(rule.halo, 3)
+
+    def test_matches_elementary(self):
+        states = self.generator.integers(0, 2, size=50, dtype='uint8')
+        for boundary in BOUNDARIES:
+            for rule_number in range(256):
+                elementary = Elementary1DRule(
+                    rule_number=rule_number, boundary=boundary
+                )
+                rule = KColor1DRule(
+                    rule_number=rule_number, boundary=boundary
+                )
+
+                assert_array_equal(
+                    rule.step(states.copy()), elementary.step(states.copy())
+                )
+
+    def test_general(self):
+        states = self.generator.integers(0, 3, size=40, dtype='uint8')
+        for boundary in BOUNDARIES:
+            for radius in [0, 1, 2]:
+                size = 3**(2 * radius + 1)
+                rule_number = random_rule_number(self.generator, 3, size)
+                rule = KColor1DRule(
+                    n_colors=3, radius=radius, rule_number=rule_number,
+                    boundary=boundary,
+                )
+
+                assert_array_equal(
+                    rule.step(states.copy()), reference_step(rule, states)
+                )
+
+    def test_totalistic(self):
+        states = self.generator.integers(0, 4, size=40, dtype='uint8')
+        for boundary in BOUNDARIES:
+            for radius in [1, 3, 5]:
+                size = 3 * (2 * radius + 1) + 1
+                rule_number = random_rule_number(self.generator, 4, size)
+                rule = KColor1DRule(
+                    n_colors=4, radius=radius, totalistic=True,
+                    rule_number=rule_number, boundary=boundary,
+                )
+
+                assert_array_equal(
+                    rule.step(states.copy()), reference_step(rule, states)
+                )
+
+    def test_step_ensemble(self):
+        states = self.generator.integers(0, 3, size=(4, 30), dtype='uint8')
+        rule = KColor1DRule(
+            n_colors=3, radius=2, totalistic=True, rule_number=1635,
+            boundary='wrap',
+        )
+        expected = [rule.step(line.copy()) for line in states]
+
+        result = rule.step_ensemble(states)
+
+        self.assertIs(result, states)
+        assert_array_equal(result, expected)
+
+    def test_invalid(self):
+        rule = KColor1DRule(n_colors=3)
+
+        with self.assertRaises(ValueError):
+            rule.step(np.array([0, 1, 3], dtype='uint8'))
+
+        rule.rule_number = 3**27
+        with self.assertRaises(ValueError):
+            rule.step(np.array([0, 1, 2], dtype='uint8'))
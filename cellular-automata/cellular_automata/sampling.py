@@ -0,0 +1,174 @@
+# Copyright (c) 2017, Enthought, Inc.
+# All rights reserved.
+#
+# This software is provided without warranty under the terms of the BSD
+# license included in LICENSE.txt and may be redistributed only
+# under the conditions described in the aforementioned license.  The license
+# is also available online at http://www.enthought.com/licenses/BSD.txt
+#
+# Thanks for using Enthought open source!
+"""
+This module provides routines for choosing cells at random, where each cell
+is chosen independently with some probability.
+
+Drawing a uniform float for every cell costs 8 bytes per cell and a full
+pass over the states, which is wasteful when the probability is low and
+only a handful of cells are chosen.  For low probabilities the chosen cells
+are instead found directly by drawing the gaps between them from a
+geometric distribution, which takes time proportional to the number of
+cells chosen.  For higher probabilities a uint32 is drawn for every cell
+and compared with an integer threshold.
+"""
+
+import numpy as np
+
+#: Probabilities at or below this are sampled by drawing the gaps between
+#: chosen cells rather than drawing a value for every cell.
+SPARSE_PROBABILITY = 0.02
+
+#: The number of distinct values of the uint32 draws used for dense sampling.
+DENSE_RESOLUTION = 2**32
+
+
+def bernoulli_hits(candidates, p, generator):
+    """ Choose candidate cells at random with some probability.
+
+    Parameters
+    ----------
+    candidates : array of bool
+        The cells which may be chosen.
+    p : float or array
+        The probability of each candidate cell being chosen.  For an
+        ensemble, this may be an array with one probability per replica
+        which broadcasts along the first axis.
+    generator : Generator or list of Generator
+        The random number generator to draw from.  For an ensemble, this
+        may be a list holding a separate generator for each replica.
+
+    Returns
+    -------
+    hits : array of int
+        The sorted flat indices of the chosen cells.
+    """
+    return _sample(np.ravel(candidates), np.shape(candidates), p, generator)
+
+
+def bernoulli_positions(shape, p, generator):
+    """ Choose cells at random with some probability.
+
+    This draws exactly the same random numbers as :py:func:`bernoulli_hits`
+    does for candidates of the same shape, so the cells chosen by
+    :py:func:`bernoulli_hits` are the positions returned here which are
+    candidates.  This allows the random choices to be made before the
+    candidates are known.
+
+    Parameters
+    ----------
+    shape : tuple of int
+        The shape of the states.
+    p : float or array
+        The probability of each cell being chosen.  For an ensemble, this
+        may be an array with one probability per replica which broadcasts
+        along the first axis.
+    generator : Generator or list of Generator
+        The random number generator to draw from.  For an ensemble, this
+        may be a list holding a separate generator for each replica.
+
+    Returns
+    -------
+    positions : array of int
+        The sorted flat indices of the chosen cells.
+    """
+    return _sample(None, tuple(shape), p, generator)
+
+
+def geometric_positions(n_cells, p, generator):
+    """ Choose positions at random with some probability.
+
+    The gaps between successive chosen positions follow a geometric
+    distribution, so drawing the gaps gives exactly the same distribution as
+    choosing each position independently.
+
+    Parameters
+    ----------
+    n_cells : int
+        The number of positions.
+    p : float
+        The probability of each position being chosen.  This must be
+        strictly between 0 and 1.
+    generator : Generator
+        The random number generator to draw from.
+
+    Returns
+    -------
+    positions : array of int
+        The sorted chosen positions.
+    """
+    expected = n_cells * p
+    n_draws = int(expected + 4 * np.sqrt(expected) + 16)
+    chunks = []
+    last = -1
+    while True:
+        positions = last + np.cumsum(generator.geometric(p, size=n_draws))
+        if positions[-1] >= n_cells:
+            chunks.append(positions[positions < n_cells])
+            break
+        chunks.append(positions)
+        last = positions[-1]
+        n_draws = int((n_cells - last) * p + 16)
+    return np.concatenate(chunks)
+
+
+# ----------------------------------------------------------------------------
+# Private functions
+# ----------------------------------------------------------------------------
+
+def _sample(flat, shape, p, generator):
+    """ Choose cells from a flat candidate mask, or from all cells if the
+    mask is None, splitting the draws between replicas if needed.
+    """
+    n_cells = int(np.prod(shape))
+    p = np.asarray(p, dtype=float)
+    if p.size == 1 and isinstance(generator, np.random.Generator):
+        return _hits(flat, n_cells, p.item(), generator)
+
+    n_replicas = shape[0]
+    replica_size = n_cells // n_replicas
+    if flat is None:
+        replicas = [None] * n_replicas
+    else:
+        replicas = flat.reshape(n_replicas, replica_size)
+    p = np.broadcast_to(p.reshape(-1), (n_replicas,))
+    if isinstance(generator, np.random.Generator):
+        generator = [generator] * n_replicas
+    return np.concatenate([
+        _hits(replica, replica_size, replica_p, replica_generator)
+        + index * replica_size
+        for index, (replica, replica_p, replica_generator)
+        in enumerate(zip(replicas, p, generator))
+    ])
+
+
+def _hits(candidates, n_cells, p, generator):
+    """ Choose cells from a flat candidate mask with a scalar probability.
+    """
+    if p <= 0.0:
+        return np.zeros(0, dtype=np.intp)
+    elif p >= 1.0:
+        if candidates is None:
+            return np.arange(n_cells, dtype=np.intp)
+        return np.flatnonzero(candidates)
+    elif p <= SPARSE_PROBABILITY:
+        positions = geometric_positions(n_cells, p, generator)
+        if candidates is None:
+            return positions
+        return positions[candidates[positions]]
+    else:
+        threshold = np.uint64(round(p * DENSE_RESOLUTION))
+        draws = generator.integers(
+            0, DENSE_RESOLUTION, size=n_cells, dtype=np.uint32
+        )
+        chosen = draws < threshold
+        if candidates is not None:
+            chosen &= candidates
+        return np.flatnonzero(chosen)
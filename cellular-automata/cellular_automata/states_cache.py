@@ -0,0 +1,114 @@
+# Copyright (c) 2017, Enthought, Inc.
+# All rights reserved.
+#
+# This software is provided without warranty under the terms of the BSD
+# license included in LICENSE.txt and may be redistributed only
+# under the conditions described in the aforementioned license.  The license
+# is also available online at http://www.enthought.com/licenses/BSD.txt
+#
+# Thanks for using Enthought open source!
+"""
+This module provides a cache of arrays derived from the states, such as the
+mask of cells with a given state, which rules share during a tick.
+
+Many rules start by comparing the whole states array with a state value, and
+neighbourhood rules go on to count the neighbours in that mask.  When several
+rules in a chain need the same mask or counts, the cache lets them compute it
+once.  Rules which write to the states tell the cache which state values they
+may have changed, and anything derived from those values is discarded.
+"""
+
+
+class StatesCache(object):
+    """ Masks and neighbour counts derived from a states array.
+
+    The cached arrays are read-only, since they are shared between rules.
+
+    Parameters
+    ----------
+    states : array
+        The states from which the arrays are derived.
+    """
+
+    def __init__(self, states):
+        #: The states from which the arrays are derived.
+        self.states = states
+
+        #: The masks of cells with each state value.
+        self._masks = {}
+
+        #: The neighbour counts, keyed by state value then by the rule's
+        #: structure, boundary and whether the states are an ensemble.
+        self._counts = {}
+
+    def mask(self, value):
+        """ The mask of cells with the given state.
+
+        Parameters
+        ----------
+        value : int
+            The state value.
+
+        Returns
+        -------
+        mask : array of bool
+            A read-only array which is True where the states equal the value.
+        """
+        mask = self._masks.get(value)
+        if mask is None:
+            mask = self.states == value
+            mask.flags.writeable = False
+            self._masks[value] = mask
+        return mask
+
+    def neighbour_counts(self, rule, value, ensemble=False):
+        """ The counts of neighbours with the given state.
+
+        Parameters
+        ----------
+        rule : CountNeighboursRule
+            The rule whose structure and boundary define the neighbours.
+        value : int
+            The state value of the neighbours to count.
+        ensemble : bool
+            Whether the states hold an ensemble of replicas stacked along the
+            first axis.
+
+        Returns
+        -------
+        counts : array
+            A read-only array of the number of neighbours of each cell which
+            have the state.
+        """
+        structure = rule.structure
+        key = (
+            structure.shape, structure.tobytes(), rule.boundary, ensemble
+        )
+        counts_by_key = self._counts.setdefault(value, {})
+        counts = counts_by_key.get(key)
+        if counts is None:
+            counts = rule.count_neighbours(
+                self.mask(value), ensemble, key=value
+            )
+            counts.flags.writeable = False
+            counts_by_key[key] = counts
+        return counts
+
+    def invalidate(self, values=None):
+        """ Discard the arrays derived from some state values.
+
+        Rules must call this after writing to the states.
+
+        Parameters
+        ----------
+        values : iterable of int or None
+            The state values which cells may have been changed from or to.
+            If None, everything is discarded.
+        """
+        if values is None:
+            self._masks.clear()
+            self._counts.clear()
+            return
+        for value in values:
+            self._masks.pop(value, None)
+            self._counts.pop(value, None)
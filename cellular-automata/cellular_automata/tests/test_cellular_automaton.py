@@ -0,0 +1,181 @@
+# Copyright (c) 2017, Enthought, Inc.
+# All rights reserved.
+#
+# This software is provided without warranty under the terms of the BSD
+# license included in LICENSE.txt and may be redistributed only
+# under the conditions described in the aforementioned license.  The license
+# is also available online at http://www.enthought.com/licenses/BSD.txt
+#
+# Thanks for using Enthought open source!
+
+from unittest import TestCase
+
+import numpy as np
+from numpy.testing import assert_array_equal
+
+from traits.testing.unittest_tools import UnittestTools
+
+from ..abstract_rule import AbstractRule
+from ..automata_recorder import AutomataRecorder
+from ..cellular_automaton import CellularAutomaton
+from ..rules.change_state_rule import ChangeStateRule
+from ..rules.elementary_1d_rule import Elementary1DRule
+from ..rules.forest import SlowBurnRule
+from ..rules.life import LifeRule
+
+GLIDER = np.array([
+    [0, 1, 0],
+    [0, 0, 1],
+    [1, 1, 1],
+], dtype='uint8')
+
+
+class IncrementRule(AbstractRule):
+    """ An old-style rule which returns a new array. """
+
+    def step(self, states):
+        return states + 1
+
+
+def glider_states():
+    states = np.zeros(shape=(12, 12), dtype='uint8')
+    states[1:4, 1:4] = GLIDER
+    return states
+
+
+class TestCellularAutomaton(TestCase, UnittestTools):
+
+    def test_double_buffered_matches(self):
+        rules = [
+            LifeRule(boundary='wrap'),
+            ChangeStateRule(from_state=1, to_state=2),
+            IncrementRule(),
+            ChangeStateRule(from_state=3, to_state=1),
+            ChangeStateRule(from_state=2, to_state=0),
+        ]
+        automaton = CellularAutomaton(states=glider_states(), rules=rules)
+        buffered = CellularAutomaton(
+            states=glider_states(), rules=rules, double_buffered=True,
+        )
+
+        for i in range(20):
+            automaton.step()
+            buffered.step()
+            assert_array_equal(buffered.states, automaton.states)
+        self.assertEqual(buffered.tick, automaton.tick)
+
+    def test_double_buffered_reuses_buffers(self):
+        automaton = CellularAutomaton(
+            states=glider_states(),
+            rules=[LifeRule()],
+            double_buffered=True,
+        )
+
+        automaton.step()
+        first = automaton.states
+        automaton.step()
+        second = automaton.states
+        automaton.step()
+
+        self.assertIsNot(first, second)
+        self.assertIs(automaton.states, first)
+
+    def test_double_buffered_step_into(self):
+        states = np.zeros(shape=8, dtype='uint8')
+        states[4] = 1
+        automaton = CellularAutomaton(
+            states=states,
+            rules=[Elementary1DRule(rule_number=30)],
+            double_buffered=True,
+        )
+
+        automaton.step()
+
+        assert_array_equal(automaton.states, [0, 0, 0, 1, 1, 1, 0, 0])
+        assert_array_equal(states, [0, 0, 0, 0, 1, 0, 0, 0])
+
+    def test_double_buffered_recording(self):
+        automaton = CellularAutomaton(
+            states=glider_states(),
+            rules=[LifeRule()],
+            double_buffered=True,
+        )
+        recorder = AutomataRecorder(automaton)
+
+        for i in range(4):
+            automaton.step()
+
+        self.assertEqual(len(recorder.record), 5)
+        assert_array_equal(recorder.record[0], glider_states())
+        assert_array_equal(recorder.record[4][2:5, 2:5], GLIDER)
+
+    def test_run_matches_step(self):
+        rules = [
+            ChangeStateRule(from_state=0, to_state=1, p_change=0.05),
+            ChangeStateRule(from_state=1, to_state=2, p_change=0.01),
+            SlowBurnRule(),
+        ]
+        automaton = CellularAutomaton(shape=(16, 16), rules=rules, seed=42)
+        runner = CellularAutomaton(shape=(16, 16), rules=rules, seed=42)
+        automaton.start()
+        runner.start()
+
+        for i in range(25):
+            automaton.step()
+        runner.run(25, notify_every=10)
+
+        self.assertEqual(runner.tick, 25)
+        assert_array_equal(runner.states, automaton.states)
+
+    def test_seed(self):
+        rules = [
+            ChangeStateRule(from_state=0, to_state=1, p_change=0.3),
+            ChangeStateRule(from_state=1, to_state=2, p_change=0.01),
+        ]
+        automaton = CellularAutomaton(shape=(16, 16), rules=rules, seed=7)
+        automaton.start()
+        automaton.run(5)
+        states = automaton.states.copy()
+
+        # the same seed gives the same run, even with the rules shared
+        other = CellularAutomaton(shape=(16, 16), rules=rules, seed=7)
+        other.start()
+        other.run(5)
+        assert_array_equal(other.states, states)
+
+        # resetting replays the run
+        automaton.reset()
+        automaton.start()
+        automaton.run(5)
+        assert_array_equal(automaton.states, states)
+
+        # each rule has its own stream
+        self.assertIsNot(rules[0].generator, rules[1].generator)
+
+        # a different seed gives a different run
+        other = CellularAutomaton(shape=(16, 16), rules=rules, seed=8)
+        other.start()
+        other.run(5)
+        self.assertTrue(np.any(other.states != states))
+
+    def test_run_notifications(self):
+        automaton = CellularAutomaton(
+            states=glider_states(),
+            rules=[LifeRule()],
+            double_buffered=True,
+        )
+        recorder = AutomataRecorder(automaton)
+        automaton.start()
+
+        with self.assertTraitChanges(automaton, 'tick', 3):
+            automaton.run(10, notify_every=4)
+
+        self.assertEqual(len(recorder.record), 5)
+        assert_array_equal(recorder.record[2][2:5, 2:5], GLIDER)
+        self.assertEqual(automaton.tick, 10)
+
+        with self.assertTraitChanges(automaton, 'tick', 1):
+            automaton.run(10)
+
+        with self.assertRaises(ValueError):
+            automaton.run(10, notify_every=0)
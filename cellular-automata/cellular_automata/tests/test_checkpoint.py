@@ -0,0 +1,101 @@
+# Copyright (c) 2017, Enthought, Inc.
+# All rights reserved.
+#
+# This software is provided without warranty under the terms of the BSD
+# license included in LICENSE.txt and may be redistributed only
+# under the conditions described in the aforementioned license.  The license
+# is also available online at http://www.enthought.com/licenses/BSD.txt
+#
+# Thanks for using Enthought open source!
+
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from numpy.testing import assert_array_equal
+
+from traits.testing.unittest_tools import UnittestTools
+
+from ..cellular_automaton import CellularAutomaton
+from ..ensemble_automaton import EnsembleAutomaton
+from ..initializers.constant import Constant
+from ..io.checkpoint import load_checkpoint
+from ..rules.change_state_rule import ChangeStateRule
+from ..rules.forest import BurnGrovesRule, MoldRule, SlowBurnRule
+
+
+def forest_rules():
+    return [
+        ChangeStateRule(from_state=0, to_state=1, p_change=0.05),
+        BurnGrovesRule(p_fire=0.01),
+        MoldRule(),
+        SlowBurnRule(),
+        ChangeStateRule(from_state=3, to_state=0, p_change=0.1),
+    ]
+
+
+class TestCheckpoint(TestCase, UnittestTools):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'checkpoint.npz')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_resume_matches_uninterrupted(self):
+        expected = CellularAutomaton(
+            shape=(32, 32), rules=forest_rules(), seed=10,
+        )
+        expected.start()
+        expected.run(20)
+        expected.checkpoint(self.path)
+        expected.run(20)
+
+        # use a different seed to check that the streams are restored
+        resumed = CellularAutomaton(shape=(1, 1), seed=0)
+        resumed.restore(self.path)
+        self.assertEqual(resumed.tick, 20)
+        self.assertEqual(len(resumed.rules), 5)
+        resumed.run(20)
+
+        self.assertEqual(resumed.tick, 40)
+        assert_array_equal(resumed.states, expected.states)
+
+    def test_background(self):
+        automaton = CellularAutomaton(
+            shape=(16, 16),
+            initializers=[Constant(initial_value=2)],
+            rules=forest_rules(),
+        )
+        automaton.start()
+        states = automaton.states.copy()
+
+        future = automaton.checkpoint(self.path, background=True)
+        automaton.run(5)
+        future.result()
+
+        checkpoint = load_checkpoint(self.path)
+        self.assertEqual(checkpoint['tick'], 0)
+        assert_array_equal(checkpoint['states'], states)
+        self.assertEqual(checkpoint['initializers'][0].initial_value, 2)
+        self.assertFalse(os.path.exists(self.path + '.tmp'))
+
+    def test_ensemble(self):
+        automaton = EnsembleAutomaton(
+            n_replicas=3, replica_shape=(8, 8), rules=forest_rules(), seed=11,
+        )
+        automaton.start()
+        automaton.run(3)
+        automaton.checkpoint(self.path)
+
+        restored = EnsembleAutomaton(n_replicas=1, replica_shape=(1, 1))
+        restored.restore(self.path)
+
+        self.assertEqual(restored.n_replicas, 3)
+        assert_array_equal(restored.states, automaton.states)
+
+        automaton.run(3)
+        restored.run(3)
+        assert_array_equal(restored.states, automaton.states)
@@ -0,0 +1,141 @@
+# Copyright (c) 2017, Enthought, Inc.
+# All rights reserved.
+#
+# This software is provided without warranty under the terms of the BSD
+# license included in LICENSE.txt and may be redistributed only
+# under the conditions described in the aforementioned license.  The license
+# is also available online at http://www.enthought.com/licenses/BSD.txt
+#
+# Thanks for using Enthought open source!
+
+from unittest import TestCase
+
+import numpy as np
+from numpy.testing import assert_array_equal
+
+from traits.testing.unittest_tools import UnittestTools
+
+from ..automata_recorder import AutomataRecorder
+from ..cellular_automaton import CellularAutomaton
+from ..cycle_detector import CycleDetector
+from ..rules.change_state_rule import ChangeStateRule
+from ..rules.elementary_1d_rule import Elementary1DRule
+from ..rules.life import LifeRule
+
+
+def blinker_states():
+    """ A blinker, plus a lone cell which dies on the first tick. """
+    states = np.zeros(shape=(10, 10), dtype='uint8')
+    states[4, 3:6] = 1
+    states[0, 0] = 1
+    return states
+
+
+class TestCycleDetector(TestCase, UnittestTools):
+
+    def test_fast_forward(self):
+        detector = CycleDetector()
+        automaton = CellularAutomaton(
+            states=blinker_states(), rules=[LifeRule()],
+            cycle_detector=detector,
+        )
+        expected = CellularAutomaton(
+            states=blinker_states(), rules=[LifeRule()],
+        )
+        automaton.start()
+        expected.start()
+
+        automaton.run(1001)
+        expected.run(1001)
+
+        self.assertEqual(automaton.tick, 1001)
+        assert_array_equal(automaton.states, expected.states)
+        self.assertEqual(detector.transient_length, 1)
+        self.assertEqual(detector.period, 2)
+
+        # detection carries on seamlessly afterwards
+        for i in range(3):
+            automaton.step()
+            expected.step()
+        automaton.run(10, notify_every=3)
+        expected.run(10)
+        assert_array_equal(automaton.states, expected.states)
+        self.assertEqual(detector.transient_length, 1)
+
+    def test_stop(self):
+        detector = CycleDetector(action='stop')
+        automaton = CellularAutomaton(
+            states=blinker_states(), rules=[LifeRule()],
+            cycle_detector=detector,
+        )
+        automaton.start()
+        recorder = AutomataRecorder(automaton=automaton)
+
+        automaton.run(1000, notify_every=1)
+
+        self.assertEqual(automaton.tick, 3)
+        self.assertEqual(len(recorder.record), 4)
+
+    def test_fixed_point_1d(self):
+        states = np.zeros(shape=16, dtype='uint8')
+        states[5] = 1
+        detector = CycleDetector()
+        automaton = CellularAutomaton(
+            states=states,
+            rules=[Elementary1DRule(rule_number=4)],
+            cycle_detector=detector,
+        )
+        automaton.start()
+
+        automaton.run(50)
+
+        self.assertEqual(automaton.tick, 50)
+        self.assertEqual(detector.transient_length, 0)
+        self.assertEqual(detector.period, 1)
+        assert_array_equal(automaton.states, states)
+
+    def test_disabled_for_stochastic_rules(self):
+        detector = CycleDetector()
+        automaton = CellularAutomaton(
+            states=blinker_states(),
+            rules=[LifeRule(), ChangeStateRule(p_change=0.5)],
+            cycle_detector=detector,
+        )
+        automaton.start()
+
+        automaton.run(20)
+
+        self.assertEqual(automaton.tick, 20)
+        self.assertIsNone(detector.period)
+
+    def test_reset_on_new_states(self):
+        detector = CycleDetector()
+        automaton = CellularAutomaton(
+            states=blinker_states(), rules=[LifeRule()],
+            cycle_detector=detector,
+        )
+        automaton.start()
+        automaton.run(5)
+        self.assertEqual(detector.period, 2)
+
+        states = np.zeros(shape=(10, 10), dtype='uint8')
+        states[1:3, 1:3] = 1
+        automaton.states = states
+        automaton.step()
+
+        self.assertEqual(detector.transient_length, 5)
+        self.assertEqual(detector.period, 1)
+
+    def test_long_period_not_detected(self):
+        states = np.zeros(shape=(10, 10), dtype='uint8')
+        states[4, 3:6] = 1
+        detector = CycleDetector(max_history=1)
+        automaton = CellularAutomaton(
+            states=states, rules=[LifeRule()], cycle_detector=detector,
+        )
+        automaton.start()
+
+        automaton.run(10)
+
+        self.assertEqual(automaton.tick, 10)
+        self.assertIsNone(detector.period)
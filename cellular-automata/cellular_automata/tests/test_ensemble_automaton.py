@@ -0,0 +1,163 @@
+# Copyright (c) 2017, Enthought, Inc.
+# All rights reserved.
+#
+# This software is provided without warranty under the terms of the BSD
+# license included in LICENSE.txt and may be redistributed only
+# under the conditions described in the aforementioned license.  The license
+# is also available online at http://www.enthought.com/licenses/BSD.txt
+#
+# Thanks for using Enthought open source!
+
+from unittest import TestCase
+
+import numpy as np
+from numpy.testing import assert_array_equal
+
+from traits.api import TraitError
+from traits.testing.unittest_tools import UnittestTools
+
+from ..automata_recorder import AutomataRecorder, count_replica_states
+from ..cellular_automaton import CellularAutomaton
+from ..ensemble_automaton import EnsembleAutomaton
+from ..initializers.random_overlay import RandomOverlay
+from ..rules.change_state_rule import ChangeStateRule
+from ..rules.elementary_1d_rule import Elementary1DRule
+from ..rules.forest import BurnGrovesRule, MoldRule, SlowBurnRule
+from ..rules.life import LifeRule
+
+
+class TestEnsembleAutomaton(TestCase, UnittestTools):
+
+    def test_shape(self):
+        ensemble = EnsembleAutomaton(n_replicas=4, replica_shape=(8, 6))
+
+        self.assertEqual(ensemble.shape, (4, 8, 6))
+        self.assertEqual(ensemble.n_replicas, 4)
+        self.assertEqual(ensemble.replica_shape, (8, 6))
+
+        with self.assertRaises(ValueError):
+            EnsembleAutomaton(n_replicas=4)
+
+    def test_life_matches_separate_automata(self):
+        np.random.seed(0)
+        states = (np.random.uniform(size=(3, 16, 16)) < 0.3).astype('uint8')
+        rules = [LifeRule(boundary='wrap'), SlowBurnRule()]
+
+        ensemble = EnsembleAutomaton(states=states.copy(), rules=rules)
+        automata = [
+            CellularAutomaton(states=replica.copy(), rules=rules)
+            for replica in states
+        ]
+
+        for i in range(10):
+            ensemble.step()
+            for automaton in automata:
+                automaton.step()
+
+        for replica, automaton in zip(ensemble.states, automata):
+            assert_array_equal(replica, automaton.states)
+
+    def test_elementary_1d_ensemble(self):
+        states = np.zeros(shape=(2, 8), dtype='uint8')
+        states[0, 4] = 1
+        states[1, 0] = 1
+        rule = Elementary1DRule(rule_number=30, boundary='wrap')
+        ensemble = EnsembleAutomaton(states=states, rules=[rule])
+
+        ensemble.step()
+
+        assert_array_equal(ensemble.states[0], [0, 0, 0, 1, 1, 1, 0, 0])
+        assert_array_equal(ensemble.states[1], [1, 1, 0, 0, 0, 0, 0, 1])
+
+    def test_replica_streams(self):
+        rules = [ChangeStateRule(p_change=0.1)]
+        results = []
+        for n_replicas in [2, 3]:
+            ensemble = EnsembleAutomaton(
+                n_replicas=n_replicas, replica_shape=(12, 12), rules=rules,
+                seed=3,
+            )
+            ensemble.start()
+            ensemble.run(5)
+            results.append(ensemble.states)
+
+        # replicas draw from their own streams, so they differ from each
+        # other but do not depend on the number of replicas
+        assert_array_equal(results[0], results[1][:2])
+        self.assertTrue(np.any(results[1][0] != results[1][1]))
+
+    def test_seeded_initializers(self):
+        results = []
+        for i in range(2):
+            ensemble = EnsembleAutomaton(
+                n_replicas=3, replica_shape=(10, 10), seed=1,
+                initializers=[RandomOverlay(overlay_value=1, p_value=0.5)],
+            )
+            ensemble.start()
+            results.append(ensemble.states)
+
+        assert_array_equal(results[0], results[1])
+        self.assertTrue(np.any(results[0] == 1))
+        self.assertTrue(np.any(results[0] == 0))
+
+    def test_per_replica_probability(self):
+        grow = ChangeStateRule(p_change=np.array([0.0, 1.0, 0.0]))
+        ensemble = EnsembleAutomaton(
+            n_replicas=3, replica_shape=(5, 5), rules=[grow],
+        )
+
+        ensemble.step()
+
+        assert_array_equal(count_replica_states(ensemble)[:, :2], [
+            [25, 0],
+            [0, 25],
+            [25, 0],
+        ])
+
+        with self.assertRaises(ValueError):
+            grow.step(np.zeros(shape=(5, 5), dtype='uint8'))
+
+        grow.p_change = np.array([0.5, 0.5])
+        with self.assertRaises(ValueError):
+            ensemble.step()
+
+        # each probability is checked, as for a single probability
+        for p_change in [1.7, [0.5, 1.7, 0.0], [0.5, -0.2], [np.nan]]:
+            with self.assertRaises(TraitError):
+                grow.p_change = p_change
+            with self.assertRaises(TraitError):
+                ChangeStateRule(p_change=np.array(p_change))
+
+    def test_groves_do_not_cross_replicas(self):
+        burn = BurnGrovesRule(p_fire=np.array([1.0, 0.0]))
+        states = np.ones(shape=(2, 4, 4), dtype='uint8')
+
+        burn.step_ensemble(states)
+
+        assert_array_equal(states[0], 2)
+        assert_array_equal(states[1], 1)
+
+    def test_mold_counts_within_replicas(self):
+        mold = MoldRule(dead_state=3, p_mold=1.0, critical_density=1)
+        states = np.zeros(shape=(2, 3, 3), dtype='uint8')
+        states[0, 1, 1] = 1
+        states[1, 1, 1] = 1
+
+        mold.step_ensemble(states)
+
+        # no live cell has a live neighbour within its own replica
+        assert_array_equal(states[:, 1, 1], [1, 1])
+
+    def test_count_replica_states_recording(self):
+        ensemble = EnsembleAutomaton(
+            n_replicas=2, replica_shape=(4, 4),
+            rules=[ChangeStateRule(p_change=np.array([1.0, 0.0]))],
+        )
+        recorder = AutomataRecorder(ensemble, transform=count_replica_states)
+
+        ensemble.start()
+        ensemble.step()
+
+        counts = recorder.as_array()
+        self.assertEqual(counts.shape, (3, 2, 256))
+        assert_array_equal(counts[-1, :, :2], [[0, 16], [16, 0]])
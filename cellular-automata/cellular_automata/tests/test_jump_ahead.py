@@ -0,0 +1,114 @@
+# Copyright (c) 2017, Enthought, Inc.
+# All rights reserved.
+#
+# This software is provided without warranty under the terms of the BSD
+# license included in LICENSE.txt and may be redistributed only
+# under the conditions described in the aforementioned license.  The license
+# is also available online at http://www.enthought.com/licenses/BSD.txt
+#
+# Thanks for using Enthought open source!
+
+from unittest import TestCase
+
+import numpy as np
+from numpy.testing import assert_array_equal
+
+from traits.testing.unittest_tools import UnittestTools
+
+from ..cellular_automaton import CellularAutomaton
+from ..jump_ahead import advance, can_jump
+from ..rules.elementary_1d_rule import Elementary1DRule
+
+#: The additive elementary rules.
+ADDITIVE_RULES = [0, 60, 90, 102, 150, 170, 204, 240]
+
+
+class TestJumpAhead(TestCase, UnittestTools):
+
+    def setUp(self):
+        generator = np.random.default_rng(0)
+        self.states = (generator.random(37) < 0.5).astype('uint8')
+
+    def assert_matches_stepping(self, rule, n_ticks, states=None):
+        if states is None:
+            states = self.states
+        stepped = CellularAutomaton(states=states.copy(), rules=[rule])
+        jumped = CellularAutomaton(states=states.copy(), rules=[rule])
+        stepped.start()
+        jumped.start()
+
+        stepped.run(n_ticks)
+        with self.assertTraitChanges(jumped, 'states', count=1):
+            advance(jumped, n_ticks)
+
+        self.assertEqual(jumped.tick, n_ticks)
+        assert_array_equal(jumped.states, stepped.states)
+
+    def test_additive(self):
+        additive = [
+            rule_number for rule_number in range(256)
+            if Elementary1DRule(rule_number=rule_number).additive
+        ]
+
+        self.assertEqual(additive, ADDITIVE_RULES)
+
+    def test_jump_matches_stepping(self):
+        for boundary in ['wrap', 'empty']:
+            for rule_number in ADDITIVE_RULES:
+                rule = Elementary1DRule(
+                    rule_number=rule_number, boundary=boundary
+                )
+                self.assertTrue(rule.can_jump)
+                for n_ticks in [0, 1, 2, 5, 36, 37, 38, 100, 1000]:
+                    self.assert_matches_stepping(rule, n_ticks)
+
+    def test_custom_states(self):
+        states = np.where(self.states, 7, 3).astype('uint8')
+        rule = Elementary1DRule(
+            rule_number=150, boundary='empty', empty_state=3, filled_state=7
+        )
+
+        self.assert_matches_stepping(rule, 77, states)
+
+    def test_long_jump(self):
+        states = np.zeros(101, dtype='uint8')
+        states[50] = 1
+        rule = Elementary1DRule(rule_number=90, boundary='wrap')
+
+        result = rule.jump(states, 2**40)
+
+        # after a power of two ticks, a single cell under rule 90 becomes
+        # the two cells that far away on either side
+        shift = 2**40 % 101
+        expected = np.zeros(101, dtype='uint8')
+        expected[(50 + shift) % 101] ^= 1
+        expected[(50 - shift) % 101] ^= 1
+        assert_array_equal(result, expected)
+
+    def test_negative_ticks(self):
+        for rule_number in [90, 30]:
+            rule = Elementary1DRule(rule_number=rule_number, boundary='wrap')
+            automaton = CellularAutomaton(
+                states=self.states.copy(), rules=[rule]
+            )
+            automaton.start()
+
+            with self.assertRaises(ValueError):
+                advance(automaton, -1)
+            self.assertEqual(automaton.tick, 0)
+
+        with self.assertRaises(ValueError):
+            Elementary1DRule(rule_number=90).jump(self.states, -1)
+
+    def test_fallback(self):
+        rule = Elementary1DRule(rule_number=30, boundary='wrap')
+        automaton = CellularAutomaton(states=self.states.copy(), rules=[rule])
+
+        self.assertFalse(can_jump(automaton))
+        with self.assertRaises(ValueError):
+            rule.jump(self.states, 5)
+        self.assert_matches_stepping(rule, 20)
+
+        rule = Elementary1DRule(rule_number=90, boundary='reflect')
+        self.assertFalse(rule.can_jump)
+        self.assert_matches_stepping(rule, 20)
@@ -0,0 +1,126 @@
+# Copyright (c) 2017, Enthought, Inc.
+# All rights reserved.
+#
+# This software is provided without warranty under the terms of the BSD
+# license included in LICENSE.txt and may be redistributed only
+# under the conditions described in the aforementioned license.  The license
+# is also available online at http://www.enthought.com/licenses/BSD.txt
+#
+# Thanks for using Enthought open source!
+
+from unittest import TestCase, mock
+
+import numpy as np
+from numpy.testing import assert_allclose, assert_array_equal
+
+from ..cellular_automaton import CellularAutomaton
+from ..rule_survey import RuleSurvey, equivalence_classes
+from ..rules.elementary_1d_rule import Elementary1DRule
+
+
+def run_rule(rule_number, states, n_ticks, boundary):
+    """ The space-time diagram of a rule run by a cellular automaton. """
+    rule = Elementary1DRule(rule_number=rule_number, boundary=boundary)
+    automaton = CellularAutomaton(states=states.copy(), rules=[rule])
+    diagram = [automaton.states.copy()]
+    for i in range(n_ticks):
+        automaton.step()
+        diagram.append(automaton.states.copy())
+    return np.array(diagram, dtype=bool)
+
+
+class TestRuleSurvey(TestCase):
+
+    def setUp(self):
+        generator = np.random.default_rng(0)
+        self.states = (generator.random(41) < 0.5).astype('uint8')
+
+    def test_equivalence_classes(self):
+        classes = equivalence_classes(range(256))
+
+        self.assertEqual(len({entry[0] for entry in classes.values()}), 88)
+        self.assertEqual(classes[30], (30, False, False))
+        self.assertEqual(classes[86], (30, True, False))
+        self.assertEqual(classes[135], (30, False, True))
+        self.assertEqual(classes[149], (30, True, True))
+        self.assertEqual(classes[124], (110, True, False))
+
+        reflections = equivalence_classes(range(256), complement=False)
+        self.assertEqual(
+            len({entry[0] for entry in reflections.values()}), 160
+        )
+
+    def test_space_time_uncollapsed(self):
+        for boundary in ['wrap', 'empty', 'filled', 'nearest', 'reflect']:
+            survey = RuleSurvey(boundary=boundary)
+
+            diagrams = survey.space_time(self.states, 10)
+
+            self.assertEqual(diagrams.shape, (256, 11, 41))
+            for rule_number in range(256):
+                assert_array_equal(
+                    diagrams[rule_number],
+                    run_rule(rule_number, self.states, 10, boundary),
+                )
+
+    def test_space_time_ignores_collapse(self):
+        survey = RuleSurvey(rule_numbers=[30, 86, 135, 149], collapse=True)
+
+        diagrams = survey.space_time(self.states, 10)
+
+        for row, rule_number in enumerate(survey.rule_numbers):
+            assert_array_equal(
+                diagrams[row], run_rule(rule_number, self.states, 10, 'wrap')
+            )
+
+    def test_statistics(self):
+        survey = RuleSurvey(block_size=2)
+
+        statistics = survey.statistics(self.states, 12)
+
+        diagrams = survey.space_time(self.states, 12)
+        assert_allclose(statistics['density'], diagrams.mean(axis=-1))
+        self.assertEqual(statistics['entropy'].shape, (256, 13))
+        # rule 0 empties the line, and rule 204 is the identity
+        assert_array_equal(statistics['entropy'][0, 1:], 0.0)
+        assert_allclose(
+            statistics['entropy'][204], statistics['entropy'][204, 0]
+        )
+
+        blocks = self.states[:-1] * 2 + self.states[1:]
+        p = np.bincount(blocks, minlength=4) / 40.0
+        p = p[p > 0]
+        expected = -np.sum(p * np.log2(p)) / 2
+        assert_allclose(statistics['entropy'][:, 0], expected)
+
+    def test_statistics_collapsed(self):
+        survey = RuleSurvey(collapse=True)
+
+        with mock.patch.object(
+            RuleSurvey, '_step', autospec=True, side_effect=RuleSurvey._step
+        ) as step:
+            collapsed = survey.statistics(self.states, 8)
+
+        # one run per class
+        self.assertEqual(step.call_count, 8)
+        for call in step.call_args_list:
+            self.assertEqual(len(call[0][2]), 88)
+        self.assertEqual(collapsed['density'].shape, (256, 9))
+        for rule_number in [30, 86, 135, 149, 110, 124]:
+            _, reflect, complement = survey.classes[rule_number]
+            line = self.states.astype(bool)
+            if reflect:
+                line = line[::-1]
+            if complement:
+                line = ~line
+            full = RuleSurvey(rule_numbers=[rule_number]).statistics(line, 8)
+            assert_allclose(
+                collapsed['density'][rule_number], full['density'][0]
+            )
+            assert_allclose(
+                collapsed['entropy'][rule_number], full['entropy'][0]
+            )
+
+    def test_states_must_be_1d(self):
+        with self.assertRaises(ValueError):
+            RuleSurvey().space_time(np.zeros((3, 4)), 2)
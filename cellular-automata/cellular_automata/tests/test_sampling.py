@@ -0,0 +1,93 @@
+# Copyright (c) 2017, Enthought, Inc.
+# All rights reserved.
+#
+# This software is provided without warranty under the terms of the BSD
+# license included in LICENSE.txt and may be redistributed only
+# under the conditions described in the aforementioned license.  The license
+# is also available online at http://www.enthought.com/licenses/BSD.txt
+#
+# Thanks for using Enthought open source!
+
+from unittest import TestCase
+
+import numpy as np
+from numpy.testing import assert_array_equal
+
+from ..sampling import bernoulli_hits, geometric_positions
+
+
+class TestSampling(TestCase):
+
+    def assert_rate(self, hits, n_cells, p):
+        # the number of hits should be within 5 standard deviations
+        expected = n_cells * p
+        tolerance = 5 * np.sqrt(n_cells * p * (1 - p))
+        self.assertLess(abs(len(hits) - expected), tolerance)
+
+    def test_geometric_positions(self):
+        generator = np.random.default_rng(20)
+        n_cells = 10**6
+
+        for p in [1e-5, 1e-3, 0.02]:
+            positions = geometric_positions(n_cells, p, generator)
+
+            self.assertTrue(np.all(np.diff(positions) > 0))
+            self.assertTrue(np.all((positions >= 0) & (positions < n_cells)))
+            self.assert_rate(positions, n_cells, p)
+
+    def test_positions_uniform(self):
+        generator = np.random.default_rng(21)
+        counts = np.zeros(10, dtype=int)
+        for i in range(2000):
+            positions = geometric_positions(10, 0.01, generator)
+            counts += np.bincount(positions, minlength=10)
+
+        # each position is hit about 20 times
+        self.assertTrue(np.all(counts > 2))
+        self.assertTrue(np.all(counts < 50))
+
+    def test_candidates(self):
+        generator = np.random.default_rng(22)
+        candidates = np.zeros((500, 500), dtype=bool)
+        candidates[::2] = True
+
+        for p in [1e-3, 0.3]:
+            hits = bernoulli_hits(candidates, p, generator)
+
+            self.assertTrue(np.all(candidates.flat[hits]))
+            self.assert_rate(hits, candidates.sum(), p)
+
+    def test_certain_probabilities(self):
+        candidates = np.zeros((10, 10), dtype=bool)
+        candidates[3, 4:7] = True
+        generator = np.random.default_rng(0)
+
+        assert_array_equal(bernoulli_hits(candidates, 0.0, generator), [])
+        assert_array_equal(
+            bernoulli_hits(candidates, 1.0, generator), [34, 35, 36]
+        )
+
+    def test_replicas(self):
+        generator = np.random.default_rng(23)
+        candidates = np.ones((3, 200, 200), dtype=bool)
+        p = np.array([0.0, 1e-3, 0.5]).reshape(3, 1, 1)
+
+        hits = bernoulli_hits(candidates, p, generator)
+
+        replicas = hits // 40000
+        self.assertEqual(np.sum(replicas == 0), 0)
+        self.assert_rate(hits[replicas == 1], 40000, 1e-3)
+        self.assert_rate(hits[replicas == 2], 40000, 0.5)
+
+    def test_replica_generators(self):
+        candidates = np.ones((2, 100, 100), dtype=bool)
+        generators = np.random.default_rng(24).spawn(2)
+        expected = [
+            bernoulli_hits(candidates[0], 0.01, generators[0]),
+            bernoulli_hits(candidates[1], 0.01, generators[1]) + 10000,
+        ]
+
+        generators = np.random.default_rng(24).spawn(2)
+        hits = bernoulli_hits(candidates, 0.01, generators)
+
+        assert_array_equal(hits, np.concatenate(expected))
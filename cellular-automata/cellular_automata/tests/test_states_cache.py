@@ -0,0 +1,96 @@
+# Copyright (c) 2017, Enthought, Inc.
+# All rights reserved.
+#
+# This software is provided without warranty under the terms of the BSD
+# license included in LICENSE.txt and may be redistributed only
+# under the conditions described in the aforementioned license.  The license
+# is also available online at http://www.enthought.com/licenses/BSD.txt
+#
+# Thanks for using Enthought open source!
+
+from unittest import TestCase
+
+import numpy as np
+from numpy.testing import assert_array_equal
+
+from ..rules.change_state_rule import ChangeStateRule
+from ..rules.forest import MoldRule, SlowBurnRule
+from ..rules.life import LifeRule
+from ..states_cache import StatesCache
+
+
+class TestStatesCache(TestCase):
+
+    def setUp(self):
+        generator = np.random.default_rng(0)
+        self.states = generator.integers(0, 4, size=(20, 30), dtype='uint8')
+
+    def test_mask(self):
+        cache = StatesCache(self.states)
+
+        mask = cache.mask(2)
+
+        assert_array_equal(mask, self.states == 2)
+        self.assertIs(cache.mask(2), mask)
+        with self.assertRaises(ValueError):
+            mask[0, 0] = True
+
+    def test_invalidate(self):
+        cache = StatesCache(self.states)
+        masks = [cache.mask(value) for value in range(4)]
+
+        cache.invalidate([1, 2])
+
+        self.assertIs(cache.mask(0), masks[0])
+        self.assertIsNot(cache.mask(1), masks[1])
+        self.assertIs(cache.mask(3), masks[3])
+
+        cache.invalidate()
+        self.assertIsNot(cache.mask(0), masks[0])
+
+    def test_neighbour_counts(self):
+        cache = StatesCache(self.states)
+        rule = LifeRule(boundary='wrap')
+
+        counts = cache.neighbour_counts(rule, 1)
+
+        assert_array_equal(counts, rule.count_neighbours(self.states == 1))
+        self.assertIs(
+            cache.neighbour_counts(LifeRule(boundary='wrap'), 1), counts
+        )
+        self.assertIsNot(
+            cache.neighbour_counts(LifeRule(boundary='empty'), 1), counts
+        )
+        self.assertIsNot(cache.neighbour_counts(MoldRule(), 1), counts)
+
+        cache.invalidate([1])
+        self.assertIsNot(cache.neighbour_counts(rule, 1), counts)
+
+    def test_rules_invalidate(self):
+        cache = StatesCache(self.states)
+        unrelated = cache.mask(3)
+        rule = ChangeStateRule(from_state=0, to_state=1)
+
+        rule.step_cached(self.states, cache)
+
+        assert_array_equal(cache.mask(0), self.states == 0)
+        assert_array_equal(cache.mask(1), self.states == 1)
+        self.assertIs(cache.mask(3), unrelated)
+
+    def test_chain_matches_uncached(self):
+        rules = [
+            SlowBurnRule(),
+            ChangeStateRule(from_state=3, to_state=0),
+            MoldRule(p_mold=1.0),
+            LifeRule(),
+            ChangeStateRule(from_state=0, to_state=2),
+        ]
+        expected = self.states.copy()
+        actual = self.states.copy()
+        cache = StatesCache(actual)
+        for i in range(5):
+            for rule in rules:
+                expected = rule.step(expected)
+                actual = rule.step_cached(actual, cache)
+
+        assert_array_equal(actual, expected)
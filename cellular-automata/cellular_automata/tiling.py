@@ -0,0 +1,180 @@
+# Copyright (c) 2017, Enthought, Inc.
+# All rights reserved.
+#
+# This software is provided without warranty under the terms of the BSD
+# license included in LICENSE.txt and may be redistributed only
+# under the conditions described in the aforementioned license.  The license
+# is also available online at http://www.enthought.com/licenses/BSD.txt
+#
+# Thanks for using Enthought open source!
+"""
+This module provides helper functions for applying rules to rectangular
+regions of the states array rather than the whole array at once.
+
+A local rule only needs to read cells within its :py:attr:`halo` of a region
+to correctly compute the new states in that region.  On sides of the region
+which touch the edge of the states array the rule's own boundary handling
+applies, except when the rule wraps around, in which case the halo is
+filled in from the opposite side of the array.
+"""
+
+import numpy as np
+
+
+def rule_wraps(rule):
+    """ Whether a rule treats the states as wrapping around at the edges.
+
+    Parameters
+    ----------
+    rule : AbstractRule
+        The rule to test.
+
+    Returns
+    -------
+    wraps : bool
+        True if the rule uses the 'wrap' boundary mode.
+    """
+    return getattr(rule, 'boundary', None) == 'wrap'
+
+
+def tile_grid_shape(shape, tile_size):
+    """ The number of tiles along each axis of an array.
+
+    Parameters
+    ----------
+    shape : tuple of int
+        The shape of the states array.
+    tile_size : int
+        The length of each side of a tile.  Tiles at the end of an axis may be
+        shorter.
+
+    Returns
+    -------
+    grid_shape : tuple of int
+        The number of tiles along each axis.
+    """
+    return tuple(-(-n // tile_size) for n in shape)
+
+
+def tile_region(index, shape, tile_size):
+    """ The region of the states array covered by a tile.
+
+    Parameters
+    ----------
+    index : tuple of int
+        The index of the tile in the grid of tiles.
+    shape : tuple of int
+        The shape of the states array.
+    tile_size : int
+        The length of each side of a tile.
+
+    Returns
+    -------
+    region : tuple of slices
+        Slices which select the tile from the states array.
+    """
+    return tuple(
+        slice(i * tile_size, min((i + 1) * tile_size, n))
+        for i, n in zip(index, shape)
+    )
+
+
+def reduce_tiles(mask, tile_size):
+    """ Compute which tiles contain at least one True value of a mask.
+
+    Parameters
+    ----------
+    mask : array of bool
+        The mask to reduce.
+    tile_size : int
+        The length of each side of a tile.
+
+    Returns
+    -------
+    tiles : array of bool
+        An array with one value per tile.
+    """
+    grid_shape = tile_grid_shape(mask.shape, tile_size)
+    padding = [(0, m * tile_size - n) for m, n in zip(grid_shape, mask.shape)]
+    if any(after for before, after in padding):
+        mask = np.pad(mask, padding, mode='constant')
+
+    # split each axis into (tile, offset within tile) and reduce the offsets
+    blocked_shape = []
+    for m in grid_shape:
+        blocked_shape.extend([m, tile_size])
+    offset_axes = tuple(range(1, 2 * mask.ndim, 2))
+    return mask.reshape(blocked_shape).any(axis=offset_axes)
+
+
+def padded_block(states, region, halo, wrap=False):
+    """ Extract a region of the states, together with a surrounding halo.
+
+    Where the halo would extend past the edge of the states array it is
+    clipped, so that the rule's own boundary handling applies at the edges,
+    unless ``wrap`` is True, in which case the halo is taken from the
+    opposite side of the array.
+
+    Parameters
+    ----------
+    states : array
+        The states array.
+    region : tuple of slices
+        Slices with explicit start and stop values selecting the region.
+    halo : int
+        The number of extra cells needed on each side of the region.
+    wrap : bool
+        Whether the states wrap around at the edges.
+
+    Returns
+    -------
+    block : array
+        The region and its halo.  This is a view of the states where
+        possible, and a copy otherwise.
+    inner : tuple of slices
+        Slices which select the region from the block.
+    """
+    block = states
+    inner = []
+    for axis, (region_slice, n) in enumerate(zip(region, states.shape)):
+        start = region_slice.start - halo
+        stop = region_slice.stop + halo
+        if wrap and (start < 0 or stop > n):
+            indices = np.arange(start, stop) % n
+            block = np.take(block, indices, axis=axis)
+        else:
+            start = max(start, 0)
+            stop = min(stop, n)
+            index = [slice(None)] * states.ndim
+            index[axis] = slice(start, stop)
+            block = block[tuple(index)]
+        inner.append(slice(
+            region_slice.start - start,
+            region_slice.stop - start,
+        ))
+    return block, tuple(inner)
+
+
+def band_regions(shape, n_bands):
+    """ Split an array into bands of roughly equal size along the first axis.
+
+    Parameters
+    ----------
+    shape : tuple of int
+        The shape of the states array.
+    n_bands : int
+        The number of bands to split into.  If there are fewer rows than
+        bands, then fewer bands are returned.
+
+    Returns
+    -------
+    regions : list of tuples of slices
+        Slices which select each band from the states array.
+    """
+    n_rows = shape[0]
+    n_bands = max(min(n_bands, n_rows), 1)
+    bounds = [(i * n_rows) // n_bands for i in range(n_bands + 1)]
+    return [
+        (slice(start, stop),) + tuple(slice(0, n) for n in shape[1:])
+        for start, stop in zip(bounds[:-1], bounds[1:])
+    ]
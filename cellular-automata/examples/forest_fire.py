@@ -60,7 +60,7 @@ RED = [255, 0, 0]
 WHITE = [255, 255, 255]
 
 
-def simulation(size, steps):
+def simulation(size, steps, seed=None):
     """ Perform a simulation of a forest fire, outputting a GIF.
 
     Parameters
@@ -69,9 +69,9 @@ def simulation(size, steps):
         The number of cells in each direction for the simulation.
     steps : int
         The number of ticks to run the simulation for.
+    seed : int or None
+        The seed for the random choices, or None to use fresh entropy.
     """
-    np.random.seed(None)
-
     grow = ChangeStateRule(
         from_state=EMPTY,
         to_state=TREE,
@@ -87,6 +87,7 @@ def simulation(size, steps):
     forest = CellularAutomaton(
         shape=size,
         rules=[grow, lightning, burn],
+        seed=seed,
     )
     recorder = AutomataRecorder(automaton=forest)
 
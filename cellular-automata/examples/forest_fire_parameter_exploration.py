@@ -12,9 +12,11 @@
 Forest Fire Parameter Exploration
 =================================
 
-This example shows parallel execution of multiple forest fire
+This example shows vectorized execution of multiple forest fire
 simulations with parameters swept over a range of values to
-collect and display statistics about the model.
+collect and display statistics about the model.  The simulations are
+run as the replicas of a single ensemble automaton, so each rule is
+applied to every simulation in one operation.
 
 In this example, we use a modified version of a forest fire
 simulation with the following states:
@@ -40,8 +42,10 @@ less-connected groves, making it harder for fire to spread.
 
 import numpy as np
 
-from cellular_automata.automata_recorder import AutomataRecorder, count_states
-from cellular_automata.cellular_automaton import CellularAutomaton
+from cellular_automata.automata_recorder import (
+    AutomataRecorder, count_replica_states
+)
+from cellular_automata.ensemble_automaton import EnsembleAutomaton
 from cellular_automata.rules.change_state_rule import ChangeStateRule
 from cellular_automata.rules.forest import BurnGrovesRule, MoldRule
 
@@ -53,26 +57,27 @@ FIRE = 2
 MOLD = 3
 
 
-def simulation(p_mold, size, steps):
-    """ Perform a simulation of a moldy forest, returning statistics.
+def simulation(p_mold, size, steps, seed=None):
+    """ Perform simulations of a moldy forest, returning statistics.
 
     Parameters
     ----------
-    p_mold : probability
-        The probability that a crowded tree dies of mold.
+    p_mold : array of probabilities
+        The probability that a crowded tree dies of mold.  One simulation
+        is run for each value.
     size : size tuple
         The number of cells in each direction for the simulation.
     steps : int
         The number of ticks to run the simulation for.
+    seed : int or None
+        The seed for the random choices, or None to use fresh entropy.
 
     Returns
     -------
     counts : array
-        Array with shape (4, steps) of counts of each state at
-        each tick.
+        Array with shape (steps + 1, len(p_mold), 256) of counts of each
+        state in each simulation at each tick.
     """
-    np.random.seed(None)
-
     # trees grow
     grow = ChangeStateRule(
         from_state=EMPTY,
@@ -100,13 +105,17 @@ def simulation(p_mold, size, steps):
         p_change=1.0
     )
 
-    forest = CellularAutomaton(
-        shape=size,
+    forest = EnsembleAutomaton(
+        n_replicas=len(p_mold),
+        replica_shape=size,
         rules=[mold_die, fire_out, grow, burn_groves, mold],
+        seed=seed,
     )
 
     # record the number of each state
-    recorder = AutomataRecorder(automaton=forest, transform=count_states)
+    recorder = AutomataRecorder(
+        automaton=forest, transform=count_replica_states
+    )
 
     forest.start()
     for i in range(steps):
@@ -116,28 +125,27 @@ def simulation(p_mold, size, steps):
 
 
 if __name__ == '__main__':
-    from joblib import Parallel, delayed
     import matplotlib.pyplot as plt
 
     SHAPE = (256, 256)
     N_STEPS = 4096
     N_SIMULATIONS = 16
 
-    results = Parallel(n_jobs=4)(
-        delayed(simulation)(p_mold, SHAPE, N_STEPS, count_states)
-        for p_mold in np.logspace(-4, -1, N_SIMULATIONS)
-    )
+    results = simulation(np.logspace(-4, -1, N_SIMULATIONS), SHAPE, N_STEPS)
+
+    for i in range(N_SIMULATIONS):
+        result = results[:, i, :]
 
-    for i, result in enumerate(results):
         # plot count of each non-empty state over time
         plt.subplot(N_SIMULATIONS, 2, 2*i+1)
         for state, color in [(TREE, 'g'), (FIRE, 'r'), (MOLD, 'c')]:
-            plt.plot(result[state, :], c=color)
+            plt.plot(result[:, state], c=color)
 
-        # plot histogram
+        # plot histogram of fire sizes
         plt.subplot(N_SIMULATIONS, 2, 2*i+2)
+        fires = result[:, FIRE]
         plt.hist(
-            np.log(result[result[1] != 0, 1]),
+            np.log(fires[fires != 0]),
             bins=np.linspace(0, 10, 21)
         )
     plt.show()